@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from search_cache import normalize_query
+
+
+def document_fingerprint(file_hashes: Iterable[str]) -> str:
+    """Content fingerprint of a set of documents, independent of thread and order."""
+    return hashlib.sha256("\n".join(sorted(file_hashes)).encode("utf-8")).hexdigest()
+
+
+class AnswerCache:
+    """
+    Answers to earlier questions about the same documents, found by
+    embedding similarity of the normalized question.
+
+    Entries are keyed by document fingerprint, so an answer is only reused
+    for the exact set of documents it was produced from, whichever thread
+    asked. A lookup hits when the cosine similarity to a cached question is
+    at least ``threshold`` and the entry is younger than ``ttl`` seconds;
+    the least recently used entries are dropped beyond ``max_entries``.
+    """
+
+    def __init__(
+        self,
+        embeddings: Any,
+        threshold: float = 0.95,
+        ttl: float = 86400.0,
+        max_entries: int = 1024,
+    ):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        # key -> (fingerprint, unit vector, question, answer, stored_at)
+        self._entries: "OrderedDict[int, Tuple[str, np.ndarray, str, str, float]]" = OrderedDict()
+        self._next_key = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _unit(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype="float32")
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+    def _search(self, fingerprint: str, vector: np.ndarray) -> Optional[Tuple[str, Dict[str, Any]]]:
+        now = time.time()
+        best_key, best_score = None, -1.0
+        with self._lock:
+            for key, (fp, cached, _, _, stored_at) in list(self._entries.items()):
+                if now - stored_at > self.ttl:
+                    del self._entries[key]
+                    continue
+                if fp != fingerprint:
+                    continue
+                score = float(cached @ vector)
+                if score > best_score:
+                    best_key, best_score = key, score
+            if best_key is None or best_score < self.threshold:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(best_key)
+            _, _, question, answer, stored_at = self._entries[best_key]
+        return answer, {
+            "hit": True,
+            "similarity": round(best_score, 4),
+            "cached_question": question,
+            "age_seconds": round(now - stored_at, 1),
+            "fingerprint": fingerprint,
+        }
+
+    def lookup(self, fingerprint: str, question: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """``(answer, provenance)`` for a similar cached question, or None."""
+        vector = self._unit(self.embeddings.embed_query(normalize_query(question)))
+        return self._search(fingerprint, vector)
+
+    async def alookup(self, fingerprint: str, question: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        vector = self._unit(await self.embeddings.aembed_query(normalize_query(question)))
+        return self._search(fingerprint, vector)
+
+    def store(self, fingerprint: str, question: str, answer: str) -> None:
+        # The query embedding was just computed by lookup, so this is usually
+        # served by the embedding cache.
+        vector = self._unit(self.embeddings.embed_query(normalize_query(question)))
+        self._remember(fingerprint, vector, question, answer)
+
+    async def astore(self, fingerprint: str, question: str, answer: str) -> None:
+        vector = self._unit(await self.embeddings.aembed_query(normalize_query(question)))
+        self._remember(fingerprint, vector, question, answer)
+
+    def _remember(self, fingerprint: str, vector: np.ndarray, question: str, answer: str) -> None:
+        with self._lock:
+            self._entries[self._next_key] = (fingerprint, vector, question, answer, time.time())
+            self._next_key += 1
+            self.stores += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "hit_ratio": self.hits / total if total else 0.0,
+            "entries": len(self._entries),
+        }
@@ -0,0 +1,326 @@
+"""
+HTTP API for the chatbot, as a plain ASGI app, for clients other than the
+Streamlit page.
+
+    python api_server.py --port 8000 --workers 4
+    uvicorn api_server:app --workers 4
+
+    POST /threads                              new thread -> {"thread_id": ...}
+    GET  /threads?limit=50&cursor=...          threads, most recently updated first
+    GET  /threads/{id}?limit=20&before=N       title, a page of messages, documents
+    POST /threads/{id}/messages                {"content": "..."} -> text/event-stream
+    POST /threads/{id}/documents?filename=x.pdf   the PDF as the raw body -> summary
+    GET  /healthz
+
+Thread ids are 1-64 characters from [A-Za-z0-9_-], and a thread must have
+been created (or used by the chat page) before messages or documents are
+posted to it; unknown ids get 404.
+
+A message is answered as server-sent events: ``token`` events carrying
+``{"text": ...}`` as the answer streams (coalesced like the chat page),
+then one ``done`` event with timings and the worker's pid, or an ``error``
+event.
+
+Each worker process runs the async chatbot on its own event loop. Workers
+share chatbot.db, in WAL mode, and the indexes under INDEX_DIR: index
+updates take a per-thread file lock, and a worker notices an index another
+worker replaced on its next search. CHATBOT_METRICS_PORT can only be used
+with one worker, since every process would bind it.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import traceback
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from langchain_core.messages import HumanMessage
+from pypdf.errors import PyPdfError
+
+import async_backend
+import langgraph_backend as backend
+from chat_stream import CoalescedStream
+
+MAX_UPLOAD_BYTES = int(float(os.getenv("CHATBOT_API_MAX_UPLOAD_MB", "50")) * 1024 * 1024)
+MAX_JSON_BYTES = 1024 * 1024
+# Thread ids in paths: UUIDs as created here, or any other short safe token.
+THREAD_ID = r"(?P<thread_id>[A-Za-z0-9_-]{1,64})"
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class Request:
+    def __init__(self, scope: dict, receive: Callable[[], Awaitable[dict]], params: Dict[str, str]):
+        self.scope = scope
+        self.receive = receive
+        self.params = params
+        self.query = {k: v[-1] for k, v in parse_qs(scope.get("query_string", b"").decode()).items()}
+
+    async def body(self, limit: int) -> bytes:
+        chunks: List[bytes] = []
+        size = 0
+        while True:
+            message = await self.receive()
+            if message["type"] == "http.disconnect":
+                raise HTTPError(400, "Client disconnected.")
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > limit:
+                raise HTTPError(413, f"Body larger than {limit} bytes.")
+            chunks.append(chunk)
+            if not message.get("more_body"):
+                return b"".join(chunks)
+
+    async def json(self) -> dict:
+        try:
+            payload = json.loads(await self.body(MAX_JSON_BYTES) or b"{}")
+        except ValueError:
+            raise HTTPError(400, "Body is not valid JSON.")
+        if not isinstance(payload, dict):
+            raise HTTPError(400, "Body must be a JSON object.")
+        return payload
+
+    def int_param(self, name: str, default: Optional[int], low: int = 0, high: int = 500) -> Optional[int]:
+        value = self.query.get(name)
+        if value is None:
+            return default
+        try:
+            number = int(value)
+        except ValueError:
+            raise HTTPError(400, f"{name} must be an integer.")
+        if not low <= number <= high:
+            raise HTTPError(400, f"{name} must be between {low} and {high}.")
+        return number
+
+
+async def send_json(send, status: int, payload: Any) -> None:
+    body = json.dumps(payload).encode("utf-8")
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+def sse(event: str, data: Any) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8")
+
+
+def _message_json(message) -> dict:
+    return {"role": "user" if isinstance(message, HumanMessage) else "assistant", "content": message.content}
+
+
+# -------------------
+# Handlers
+# -------------------
+async def healthz(request: Request, send) -> None:
+    await send_json(send, 200, {"ok": True, "pid": os.getpid()})
+
+
+async def create_thread(request: Request, send) -> None:
+    thread_id = await asyncio.to_thread(backend.create_thread)
+    await send_json(send, 201, {"thread_id": thread_id})
+
+
+async def list_threads(request: Request, send) -> None:
+    limit = request.int_param("limit", 50, low=1)
+    cursor = None
+    if "cursor" in request.query:
+        # "<updated_at>:<thread_id>", as returned in next_cursor
+        updated_at, _, thread_id = request.query["cursor"].partition(":")
+        try:
+            cursor = (float(updated_at), thread_id)
+        except ValueError:
+            raise HTTPError(400, "Malformed cursor.")
+    rows, next_cursor = await asyncio.to_thread(backend.list_threads, limit, cursor)
+    await send_json(
+        send,
+        200,
+        {
+            "threads": rows,
+            "next_cursor": f"{next_cursor[0]!r}:{next_cursor[1]}" if next_cursor else None,
+        },
+    )
+
+
+def _thread_state(thread_id: str, limit: int, before: Optional[int]) -> Optional[dict]:
+    row = backend.get_checkpointer().get_thread(thread_id)
+    if row is None:
+        return None
+    messages, earlier = backend.conversation_page(thread_id, limit=limit, before=before)
+    return {
+        **row,
+        "title": backend.thread_title(thread_id),
+        "messages": [_message_json(m) for m in messages],
+        "before": earlier,
+        "documents": backend.thread_documents(thread_id),
+    }
+
+
+async def get_thread(request: Request, send) -> None:
+    thread_id = request.params["thread_id"]
+    limit = request.int_param("limit", 20, low=1)
+    before = request.int_param("before", None, high=10**9)
+    state = await asyncio.to_thread(_thread_state, thread_id, limit, before)
+    if state is None:
+        raise HTTPError(404, f"No thread {thread_id!r}.")
+    await send_json(send, 200, state)
+
+
+async def _require_thread(thread_id: str) -> None:
+    """Threads are made with POST /threads; other ids are not created implicitly."""
+    if await asyncio.to_thread(backend.get_checkpointer().get_thread, thread_id) is None:
+        raise HTTPError(404, f"No thread {thread_id!r}.")
+
+
+async def upload_document(request: Request, send) -> None:
+    thread_id = request.params["thread_id"]
+    await _require_thread(thread_id)
+    filename = os.path.basename(request.query.get("filename", "")) or "document.pdf"
+    data = await request.body(MAX_UPLOAD_BYTES)
+    if not data.startswith(b"%PDF"):
+        raise HTTPError(415, "Send the PDF itself as the request body.")
+    try:
+        summary = await asyncio.to_thread(backend.ingest_pdf, data, thread_id, filename, None, True)
+    except ValueError as exc:
+        raise HTTPError(400, str(exc))
+    except PyPdfError as exc:
+        # Truncated or corrupt files that still start with %PDF.
+        raise HTTPError(422, f"Could not read the PDF: {exc}")
+    await send_json(send, 200, {"thread_id": thread_id, **summary})
+
+
+async def _disconnected(receive) -> None:
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def post_message(request: Request, send) -> None:
+    thread_id = request.params["thread_id"]
+    await _require_thread(thread_id)
+    content = (await request.json()).get("content")
+    if not isinstance(content, str) or not content.strip():
+        raise HTTPError(400, '"content" must be a non-empty string.')
+
+    chatbot = await async_backend.get_async_chatbot()
+    config = {
+        "configurable": {"thread_id": thread_id},
+        "metadata": {"thread_id": thread_id},
+        "run_name": "chat_run",
+    }
+    stream = CoalescedStream(
+        chatbot.astream({"messages": [HumanMessage(content=content)]}, config=config, stream_mode="messages")
+    )
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/event-stream"),
+                (b"cache-control", b"no-cache"),
+                (b"x-accel-buffering", b"no"),
+            ],
+        }
+    )
+    # A client that goes away stops the turn instead of letting it run on.
+    gone = asyncio.ensure_future(_disconnected(request.receive))
+    pieces = stream.__aiter__()
+    try:
+        async for piece in pieces:
+            if gone.done():
+                return
+            await send({"type": "http.response.body", "body": sse("token", {"text": piece}), "more_body": True})
+        final = sse("done", {"thread_id": thread_id, "worker": os.getpid(), **stream.stats()})
+    except Exception as exc:
+        traceback.print_exc()
+        final = sse("error", {"error": str(exc) or type(exc).__name__})
+    finally:
+        gone.cancel()
+        await pieces.aclose()
+    await send({"type": "http.response.body", "body": final})
+
+
+# -------------------
+# ASGI app
+# -------------------
+ROUTES: List[Tuple[str, "re.Pattern[str]", Callable]] = [
+    ("GET", re.compile(r"/healthz"), healthz),
+    ("POST", re.compile(r"/threads"), create_thread),
+    ("GET", re.compile(r"/threads"), list_threads),
+    ("GET", re.compile(rf"/threads/{THREAD_ID}"), get_thread),
+    ("POST", re.compile(rf"/threads/{THREAD_ID}/messages"), post_message),
+    ("POST", re.compile(rf"/threads/{THREAD_ID}/documents"), upload_document),
+]
+
+
+def _route(method: str, path: str) -> Tuple[Optional[Callable], Dict[str, str]]:
+    allowed = False
+    for route_method, pattern, handler in ROUTES:
+        match = pattern.fullmatch(path.rstrip("/") or "/")
+        if match:
+            if route_method == method:
+                # The server has already percent-decoded the path.
+                return handler, match.groupdict()
+            allowed = True
+    if allowed:
+        raise HTTPError(405, f"{method} is not allowed here.")
+    raise HTTPError(404, f"No route for {path}.")
+
+
+async def _lifespan(receive, send) -> None:
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await async_backend.aclose()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope: dict, receive, send) -> None:
+    if scope["type"] == "lifespan":
+        return await _lifespan(receive, send)
+    if scope["type"] != "http":
+        return
+    try:
+        handler, params = _route(scope["method"], scope["path"])
+        await handler(Request(scope, receive, params), send)
+    except HTTPError as exc:
+        await send_json(send, exc.status, {"error": exc.message})
+    except Exception:
+        traceback.print_exc()
+        await send_json(send, 500, {"error": "Internal server error."})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the chatbot over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1, help="worker processes sharing chatbot.db")
+    parser.add_argument("--no-access-log", action="store_true")
+    args = parser.parse_args()
+    if args.workers > 1 and int(os.getenv("CHATBOT_METRICS_PORT", "0")) > 0:
+        parser.error("CHATBOT_METRICS_PORT would be bound by every worker; unset it or use --workers 1.")
+
+    import uvicorn
+
+    uvicorn.run(
+        "api_server:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        access_log=not args.no_access_log,
+    )
@@ -0,0 +1,183 @@
+"""
+Async variant of the chatbot graph.
+
+The compiled graph checkpoints through AsyncThreadCatalogSaver on the same
+database as the sync chatbot. Its nodes await the model, and the stock tool
+shares one pooled httpx client, so many conversations can run on one event
+loop without a thread per request.
+
+    chatbot = await get_async_chatbot()
+    await chatbot.ainvoke({"messages": [...]}, config=...)
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Optional
+
+import aiosqlite
+import httpx
+from langchain_core.tools import tool
+
+from context_window import summary_request
+from metrics import instrument_checkpointer, timed_node
+from langgraph_backend import (
+    ALPHA_VANTAGE_URL,
+    DB_PATH,
+    HTTP_TIMEOUT,
+    PROMPT_CACHE_KEY,
+    SQLITE_SYNCHRONOUS,
+    SYSTEM_MESSAGE,
+    ChatState,
+    _cache_query,
+    _cached_reply,
+    _grounded_question,
+    _quote_params,
+    _thread_fingerprint,
+    build_graph,
+    calculator,
+    context_window,
+    get_answer_cache,
+    get_llm,
+    get_summarizer_llm,
+    metrics_callback,
+    quote_cache,
+    rag_tool,
+    search_tool,
+    tool_executor,
+)
+from pooled_saver import SYNCHRONOUS_MODES
+from retention import init_incremental_vacuum
+from thread_catalog import AsyncThreadCatalogSaver
+
+_http_client: Optional[httpx.AsyncClient] = None
+_chatbot = None
+_conn: Optional[aiosqlite.Connection] = None
+_init_lock: Optional[asyncio.Lock] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """The process-wide pooled client used by async tools."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=HTTP_TIMEOUT,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        )
+    return _http_client
+
+
+async def _afetch_quote(symbol: str) -> dict:
+    r = await get_http_client().get(ALPHA_VANTAGE_URL, params=_quote_params(symbol))
+    return r.json()
+
+
+# Shares the sync tool's cache entries, so a quote fetched by either graph serves both.
+quote_cache.afetch = _afetch_quote
+
+
+@tool("get_stock_price")
+async def aget_stock_price(symbol: str) -> dict:
+    """
+    Fetch latest stock price for a given symbol (e.g. 'AAPL', 'TSLA')
+    using Alpha Vantage with API key in the URL.
+    """
+    quote, cached = await quote_cache.aget(symbol)
+    return {**quote, "cached": cached}
+
+
+@tool("get_stock_prices")
+async def aget_stock_prices(symbols: list[str]) -> dict:
+    """
+    Fetch latest stock prices for several symbols at once (e.g. ['AAPL', 'TSLA']).
+    Prefer this over repeated get_stock_price calls when comparing tickers.
+    """
+    quotes = await quote_cache.aget_many(symbols)
+    return {
+        "quotes": {
+            symbol: {**quote, "cached": cached} for symbol, (quote, cached) in quotes.items()
+        }
+    }
+
+
+# search_tool, calculator and rag_tool have no native async path; ToolNode
+# runs them in the default executor when the graph is awaited.
+async_tools = [search_tool, aget_stock_price, aget_stock_prices, calculator, rag_tool]
+for _tool in (aget_stock_price, aget_stock_prices):
+    _tool.callbacks = [metrics_callback]
+_llm_with_async_tools = None
+
+
+def get_llm_with_async_tools():
+    global _llm_with_async_tools
+    if _llm_with_async_tools is None:
+        _llm_with_async_tools = get_llm().bind_tools(async_tools, prompt_cache_key=PROMPT_CACHE_KEY)
+    return _llm_with_async_tools
+
+
+async def _asummarize(previous, messages) -> str:
+    return (await get_summarizer_llm().ainvoke(summary_request(previous, messages))).content
+
+
+@timed_node("chat_node")
+async def achat_node(state: ChatState, config=None):
+    """LLM node that may answer or request a tool call, without blocking the loop."""
+    query = None
+    if get_answer_cache() is not None:
+        # The thread's fingerprint reads its index metadata from disk.
+        query = await asyncio.to_thread(_cache_query, state, config)
+    if query:
+        hit = await get_answer_cache().alookup(*query)
+        if hit:
+            return _cached_reply(*hit)
+
+    history, update = await context_window.aprepare(
+        state["messages"], state.get("summary"), state.get("summary_upto", 0), _asummarize
+    )
+    messages = [SYSTEM_MESSAGE, *history]
+    response = await get_llm_with_async_tools().ainvoke(messages, config=config)
+
+    question = _grounded_question(state["messages"], response)
+    fingerprint = await asyncio.to_thread(_thread_fingerprint, config) if question else None
+    if fingerprint:
+        await get_answer_cache().astore(fingerprint, question, response.content)
+        response.response_metadata["answer_cache"] = {"hit": False, "stored": True}
+    return {"messages": [response], **update}
+
+
+async def build_async_chatbot(db_path: str = DB_PATH):
+    """Compile a new async chatbot on its own aiosqlite connection."""
+    # Same busy timeout and durability as the sync checkpointer, which may be
+    # writing to the file from other threads or worker processes.
+    if SQLITE_SYNCHRONOUS not in SYNCHRONOUS_MODES:
+        raise ValueError(f"synchronous must be one of {SYNCHRONOUS_MODES}, got {SQLITE_SYNCHRONOUS!r}")
+    await asyncio.to_thread(init_incremental_vacuum, db_path)
+    conn = await aiosqlite.connect(db_path, timeout=30)
+    await conn.execute("PRAGMA journal_mode=WAL")
+    await conn.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    checkpointer = instrument_checkpointer(AsyncThreadCatalogSaver(conn))
+    graph = build_graph(achat_node, tool_executor.tool_node(async_tools))
+    return graph.compile(checkpointer=checkpointer), conn
+
+
+async def get_async_chatbot():
+    """The shared async chatbot for this event loop, built on first use."""
+    global _chatbot, _conn, _init_lock
+    if _chatbot is None:
+        if _init_lock is None:
+            _init_lock = asyncio.Lock()
+        async with _init_lock:
+            if _chatbot is None:
+                _chatbot, _conn = await build_async_chatbot()
+    return _chatbot
+
+
+async def aclose() -> None:
+    """Close the pooled HTTP client and the checkpoint connection."""
+    global _http_client, _chatbot, _conn
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+    if _conn is not None:
+        await _conn.close()
+        _conn = None
+    _chatbot = None
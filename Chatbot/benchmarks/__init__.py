@@ -0,0 +1,7 @@
+"""
+Offline benchmarks for the chatbot backend.
+
+Run from the ``Chatbot`` directory, e.g. ``python -m benchmarks.bench_index_load``.
+``python -m benchmarks.suite`` runs the headline measurements end to end
+against local fakes and writes them to a JSON file for comparison.
+"""
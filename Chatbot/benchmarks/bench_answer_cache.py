@@ -0,0 +1,85 @@
+"""
+Latency of a document question answered by the full chat -> rag_tool ->
+chat loop versus one answered from the semantic answer cache, against a
+local fake OpenAI endpoint that always consults the document first.
+
+    python -m benchmarks.bench_answer_cache --questions 20 --latency 0.4
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+import uuid
+
+from benchmarks.fake_openai import FakeOpenAIServer
+from benchmarks.fakes import HashingEmbeddings, synthetic_pdf
+
+QUESTIONS = [
+    "What's the notice period?",
+    "Which clause covers termination?",
+    "Who signs off on maintenance?",
+    "What is the warranty limit?",
+]
+
+
+def _variants(question: str):
+    """The same question as different users type it."""
+    return [question, question.lower().rstrip("?"), f"  {question.upper()} "]
+
+
+def run(questions: int, latency: float):
+    with FakeOpenAIServer(latency=latency, tool_call="rag_tool") as server, tempfile.TemporaryDirectory() as root:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        os.environ["OPENAI_API_KEY"] = "fake"
+        os.environ["CHATBOT_DB_PATH"] = os.path.join(root, "bench.db")
+        os.environ["CHATBOT_RETENTION_KEEP"] = "0"
+        os.environ["CHATBOT_ANSWER_CACHE"] = "1"
+        from langchain_core.messages import HumanMessage
+
+        import langgraph_backend
+
+        embeddings = HashingEmbeddings()
+        langgraph_backend.embeddings = embeddings
+        langgraph_backend.answer_cache.embeddings = embeddings
+        pdf = synthetic_pdf(10)
+
+        full, cached = [], []
+        for n in range(questions):
+            question = QUESTIONS[n % len(QUESTIONS)]
+            for text in _variants(question):
+                # A fresh thread with the same PDF, as in a shared-document setup.
+                thread_id = str(uuid.uuid4())
+                langgraph_backend.ingest_pdf(pdf, thread_id, filename="contract.pdf")
+                start = time.perf_counter()
+                result = langgraph_backend.chatbot.invoke(
+                    {"messages": [HumanMessage(text)]},
+                    config={"configurable": {"thread_id": thread_id}},
+                )
+                elapsed = time.perf_counter() - start
+                provenance = result["messages"][-1].response_metadata.get("answer_cache", {})
+                (cached if provenance.get("hit") else full).append(elapsed)
+        return full, cached, langgraph_backend.answer_cache_stats(), server.requests
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.4, help="seconds per model call")
+    args = parser.parse_args()
+
+    full, cached, stats, requests = run(args.questions, args.latency)
+    print(f"{'path':<8} {'turns':>6} {'p50 ms':>8} {'max ms':>8}")
+    for label, times in (("full", full), ("cached", cached)):
+        if times:
+            print(
+                f"{label:<8} {len(times):>6} {statistics.median(times) * 1000:>8.1f} "
+                f"{max(times) * 1000:>8.1f}"
+            )
+    print(f"model calls: {requests}, cache: {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Load test for api_server: concurrent SSE chat streams against a fake model.
+
+The server runs as a subprocess (``api_server.py --workers N``) on a scratch
+database; chat completions come from a local fake OpenAI server that
+streams one word per ``--token-delay``. Every stream is a fresh thread:
+POST /threads, then POST /threads/{id}/messages, read to the ``done`` event.
+
+    python -m benchmarks.bench_api_server --workers 1 2 4 --concurrency 8 32 64 --streams 128
+
+Reports streams/sec, SSE events/sec, p50/p99 time to first token event and
+to the end of the stream, errors, and how many worker pids served streams.
+To load a server that is already running, pass --url instead.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Optional
+
+import httpx
+
+from benchmarks.fake_openai import FakeOpenAIServer
+from benchmarks.suite import percentiles
+
+CHATBOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers: int, root: str, model_url: str) -> tuple:
+    port = _free_port()
+    env = dict(
+        os.environ,
+        OPENAI_BASE_URL=model_url,
+        OPENAI_API_KEY="fake",
+        CHATBOT_DB_PATH=os.path.join(root, "bench.db"),
+        CHATBOT_SEARCH_CACHE=os.path.join(root, "search_cache.db"),
+        CHATBOT_EMBEDDING_CACHE=os.path.join(root, "embedding_cache.db"),
+        CHATBOT_RETENTION_KEEP="0",
+        CHATBOT_ANSWER_CACHE="0",
+        CHATBOT_METRICS_PORT="0",
+    )
+    log_path = os.path.join(root, "server.log")
+    with open(log_path, "wb") as log:
+        process = subprocess.Popen(
+            [sys.executable, "api_server.py", "--port", str(port), "--workers", str(workers), "--no-access-log"],
+            cwd=CHATBOT_DIR,
+            env=env,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{url}/healthz", timeout=1).status_code == 200:
+                return process, url
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.kill()
+    with open(log_path, encoding="utf-8", errors="replace") as log:
+        raise RuntimeError(f"api_server did not come up within 60 seconds:\n{log.read()[-2000:]}")
+
+
+async def one_stream(client: httpx.AsyncClient, question: str) -> dict:
+    start = time.perf_counter()
+    thread_id = (await client.post("/threads")).json()["thread_id"]
+    first: Optional[float] = None
+    events = 0
+    done = None
+    event = None
+    async with client.stream("POST", f"/threads/{thread_id}/messages", json={"content": question}) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                events += 1
+                if event == "token" and first is None:
+                    first = time.perf_counter() - start
+                elif event == "done":
+                    done = json.loads(line[len("data: "):])
+                elif event == "error":
+                    raise RuntimeError(line)
+    if done is None:
+        raise RuntimeError("stream ended without a done event")
+    return {"ttft": first or 0.0, "total": time.perf_counter() - start, "events": events, "worker": done["worker"]}
+
+
+async def run_level(url: str, concurrency: int, streams: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=url, timeout=120, limits=limits) as client:
+
+        async def guarded(n: int):
+            async with semaphore:
+                try:
+                    return await one_stream(client, f"question {n}: what is new?")
+                except Exception as exc:
+                    return exc
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(guarded(n) for n in range(streams)))
+        elapsed = time.perf_counter() - start
+
+    ok = [r for r in results if isinstance(r, dict)]
+    return {
+        "concurrency": concurrency,
+        "streams": streams,
+        "errors": len(results) - len(ok),
+        "streams_per_sec": round(len(ok) / elapsed, 2),
+        "events_per_sec": round(sum(r["events"] for r in ok) / elapsed, 1),
+        "ttft": percentiles([r["ttft"] for r in ok]) if ok else {},
+        "total": percentiles([r["total"] for r in ok]) if ok else {},
+        "workers_seen": len({r["worker"] for r in ok}),
+    }
+
+
+def report(label: str, row: dict) -> None:
+    print(
+        f"{label:>8} {row['concurrency']:>5} {row['streams_per_sec']:>10.1f} {row['events_per_sec']:>9.0f} "
+        f"{row['ttft'].get('p50_ms', 0):>8.0f} {row['ttft'].get('p99_ms', 0):>8.0f} "
+        f"{row['total'].get('p50_ms', 0):>9.0f} {row['total'].get('p99_ms', 0):>9.0f} "
+        f"{row['errors']:>6} {row['workers_seen']:>5}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[8, 32])
+    parser.add_argument("--streams", type=int, default=64, help="streams per concurrency level")
+    parser.add_argument("--latency", type=float, default=0.2, help="fake model latency before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.01)
+    parser.add_argument("--words", type=int, default=60, help="words in each answer")
+    parser.add_argument("--tool-call", action="store_true", help="have the model call rag_tool before answering")
+    parser.add_argument("--url", help="load this running server instead of starting one")
+    parser.add_argument("--output", help="write the results as JSON")
+    args = parser.parse_args()
+
+    reply = " ".join(f"word{i}" for i in range(args.words))
+    results = []
+    print(f"{'workers':>8} {'conc':>5} {'streams/s':>10} {'events/s':>9} {'TTFT p50':>8} {'TTFT p99':>8} "
+          f"{'total p50':>9} {'total p99':>9} {'errors':>6} {'pids':>5}")
+    with FakeOpenAIServer(
+        latency=args.latency,
+        token_delay=args.token_delay,
+        reply=reply,
+        tool_call="rag_tool" if args.tool_call else "",
+    ) as model:
+        for workers in ([None] if args.url else args.workers):
+            with tempfile.TemporaryDirectory() as root:
+                process, url = (None, args.url) if args.url else start_server(workers, root, model.base_url)
+                try:
+                    asyncio.run(run_level(url, 1, 1))  # warm-up: model clients, graph, database
+                    for concurrency in args.concurrency:
+                        row = asyncio.run(run_level(url, concurrency, args.streams))
+                        row["workers"] = workers
+                        results.append(row)
+                        report(str(workers or "-"), row)
+                finally:
+                    if process is not None:
+                        process.terminate()
+                        process.wait(timeout=30)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"settings": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Requests/sec of the sync chatbot (a thread per conversation) versus the
+async chatbot (one event loop) against a local fake OpenAI endpoint.
+
+    python -m benchmarks.bench_async_concurrency --concurrency 1 8 32 64
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fake_openai import FakeOpenAIServer
+
+
+def _config():
+    return {"configurable": {"thread_id": str(uuid.uuid4())}}
+
+
+def run(concurrency_levels, turns: int, latency: float):
+    with FakeOpenAIServer(latency=latency) as server, tempfile.TemporaryDirectory() as root:
+        # The backend reads its settings at import, so point it at the fake
+        # server and a scratch database first.
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        os.environ["OPENAI_API_KEY"] = "fake"
+        os.environ["CHATBOT_DB_PATH"] = os.path.join(root, "bench.db")
+        from langchain_core.messages import HumanMessage
+
+        import async_backend
+        import langgraph_backend
+
+        # Build the lazily created model clients outside the timed runs.
+        langgraph_backend.get_chatbot()
+        async_backend.get_llm_with_async_tools()
+
+        def sync_turn(_):
+            langgraph_backend.chatbot.invoke(
+                {"messages": [HumanMessage("hello")]}, config=_config()
+            )
+
+        async def async_level(level: int) -> float:
+            chatbot = await async_backend.get_async_chatbot()
+            semaphore = asyncio.Semaphore(level)
+
+            async def turn():
+                async with semaphore:
+                    await chatbot.ainvoke({"messages": [HumanMessage("hello")]}, config=_config())
+
+            start = time.perf_counter()
+            await asyncio.gather(*(turn() for _ in range(turns)))
+            return time.perf_counter() - start
+
+        async def async_all():
+            try:
+                return {level: await async_level(level) for level in concurrency_levels}
+            finally:
+                await async_backend.aclose()
+
+        async_times = asyncio.run(async_all())
+
+        print(f"{turns} turns, {latency * 1000:.0f} ms model latency")
+        print(f"{'concurrency':>12} {'sync req/s':>11} {'async req/s':>12}")
+        for level in concurrency_levels:
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=level) as pool:
+                list(pool.map(sync_turn, range(turns)))
+            sync_time = time.perf_counter() - start
+            print(f"{level:>12} {turns / sync_time:>11.1f} {turns / async_times[level]:>12.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument("--turns", type=int, default=128)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+    run(args.concurrency, args.turns, args.latency)
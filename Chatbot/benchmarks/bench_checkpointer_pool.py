@@ -0,0 +1,122 @@
+"""
+Checkpointer throughput with many concurrent sessions: the single shared
+connection (ThreadCatalogSaver) versus WAL with a reader pool and a
+batching single writer (PooledThreadCatalogSaver).
+
+Each session runs graph-like steps (read the latest checkpoint, store the
+step's writes, store the next checkpoint) on its own thread id; a second
+phase only reads, as sessions reloading their history do.
+
+    python -m benchmarks.bench_checkpointer_pool --sessions 1 4 16 64 --synchronous NORMAL FULL
+
+--window-ms takes several values to compare batch windows; the default, 0,
+matches CHATBOT_WRITE_BATCH_MS.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.base import empty_checkpoint
+
+from pooled_saver import PooledThreadCatalogSaver
+from thread_catalog import ThreadCatalogSaver
+
+
+def _messages(turns: int):
+    messages = []
+    for n in range(turns):
+        messages += [HumanMessage(f"question {n} " * 10), AIMessage(f"answer {n} " * 40)]
+    return messages
+
+
+def _session(saver, thread_id: str, steps: int, messages) -> list:
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    latencies = []
+    for step in range(steps):
+        start = time.perf_counter()
+        saver.get_tuple(config)
+        checkpoint = empty_checkpoint()
+        checkpoint["channel_values"] = {"messages": messages}
+        saver.put_writes(
+            {"configurable": {**config["configurable"], "checkpoint_id": checkpoint["id"]}},
+            [("messages", messages[-1:])],
+            f"task-{step}",
+        )
+        config = saver.put(config, checkpoint, {"source": "loop", "step": step}, {})
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def _reads(saver, thread_id: str, reads: int) -> None:
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    for _ in range(reads):
+        saver.get_tuple(config)
+
+
+def measure(make_saver, sessions: int, steps: int, reads: int, messages):
+    with tempfile.TemporaryDirectory() as root:
+        saver = make_saver(os.path.join(root, "bench.db"))
+        threads = [f"session-{s}" for s in range(sessions)]
+        with ThreadPoolExecutor(max_workers=sessions) as pool:
+            start = time.perf_counter()
+            latencies = [l for ls in pool.map(lambda t: _session(saver, t, steps, messages), threads) for l in ls]
+            write_elapsed = time.perf_counter() - start
+
+            start = time.perf_counter()
+            list(pool.map(lambda t: _reads(saver, t, reads), threads))
+            read_elapsed = time.perf_counter() - start
+        stats = saver.write_stats() if hasattr(saver, "write_stats") else None
+        if hasattr(saver, "close"):
+            saver.close()
+        else:
+            saver.conn.close()
+    latencies.sort()
+    return {
+        "steps_per_sec": len(latencies) / write_elapsed,
+        "p99_ms": latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))] * 1000,
+        "reads_per_sec": sessions * reads / read_elapsed,
+        "writes_per_batch": stats["writes_per_batch"] if stats else 1.0,
+    }
+
+
+def run(session_counts, steps: int, reads: int, synchronous_modes, windows, readers: int):
+    messages = _messages(10)
+    print(f"{'sync':>6} {'sessions':>8} {'saver':>12} {'steps/s':>9} {'p99 ms':>8} {'reads/s':>9} {'batch':>6}")
+    for synchronous in synchronous_modes:
+
+        def single(path):
+            conn = sqlite3.connect(path, check_same_thread=False)
+            conn.execute(f"PRAGMA synchronous={synchronous}")
+            return ThreadCatalogSaver(conn)
+
+        def pooled(window):
+            return lambda path: PooledThreadCatalogSaver(
+                path, readers=readers, synchronous=synchronous, batch_window=window
+            )
+
+        savers = [("single", single)] + [(f"pooled/{w * 1000:g}ms", pooled(w)) for w in windows]
+        for sessions in session_counts:
+            for label, make in savers:
+                r = measure(make, sessions, steps, reads, messages)
+                print(
+                    f"{synchronous:>6} {sessions:>8} {label:>12} {r['steps_per_sec']:>9.0f} "
+                    f"{r['p99_ms']:>8.1f} {r['reads_per_sec']:>9.0f} {r['writes_per_batch']:>6.1f}"
+                )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--steps", type=int, default=50, help="graph steps per session")
+    parser.add_argument("--reads", type=int, default=200, help="checkpoint reads per session")
+    parser.add_argument("--synchronous", nargs="+", default=["NORMAL", "FULL"])
+    parser.add_argument("--window-ms", type=float, nargs="+", default=[0.0])
+    parser.add_argument("--readers", type=int, default=8)
+    args = parser.parse_args()
+    run(args.sessions, args.steps, args.reads, args.synchronous, [w / 1000 for w in args.window_ms], args.readers)
@@ -0,0 +1,76 @@
+"""
+Model input tokens and simulated latency per turn over a long synthetic
+conversation, sending the full history versus the token-budgeted window.
+
+    python -m benchmarks.bench_context_window --turns 200
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from context_window import ContextWindow, message_tokens
+
+# Rough prefill cost of a hosted model: fixed overhead plus time per input token.
+BASE_LATENCY = 0.3
+SECONDS_PER_TOKEN = 0.00002
+
+
+def _turn(n: int):
+    messages = [HumanMessage(f"Question {n}: what does section {n} of the manual say about limits?")]
+    if n % 3 == 0:
+        messages.append(
+            AIMessage(
+                "",
+                tool_calls=[{"name": "rag_tool", "args": {"query": f"section {n}"}, "id": f"call{n}"}],
+            )
+        )
+        messages.append(ToolMessage("retrieved context " * 600, tool_call_id=f"call{n}"))
+    messages.append(AIMessage(f"Section {n} sets the limit to {n * 10} units. " * 10))
+    return messages
+
+
+def _summarize(previous, messages):
+    return ((previous or "") + f" Covered {len(messages)} more messages.")[-1500:]
+
+
+def run(turns: int, window: ContextWindow):
+    history = []
+    summary, summary_upto = None, 0
+    rows = []
+    for n in range(turns):
+        history.extend(_turn(n)[:1])
+        full_tokens = sum(message_tokens(m) for m in history)
+
+        start = time.perf_counter()
+        model_input, update = window.prepare(history, summary, summary_upto, _summarize)
+        overhead = time.perf_counter() - start
+        summary = update.get("summary", summary)
+        summary_upto = update.get("summary_upto", summary_upto)
+        windowed_tokens = sum(message_tokens(m) for m in model_input)
+
+        history.extend(_turn(n)[1:])
+        rows.append((n + 1, full_tokens, windowed_tokens, overhead))
+
+    print(f"{'turn':>5} {'full tok':>9} {'window tok':>11} {'full s':>7} {'window s':>9} {'prep ms':>8}")
+    for turn, full, windowed, overhead in rows:
+        if turn in (1, 10, 25, 50, 100, 150, 200) or turn == turns:
+            print(
+                f"{turn:>5} {full:>9} {windowed:>11} "
+                f"{BASE_LATENCY + full * SECONDS_PER_TOKEN:>7.2f} "
+                f"{BASE_LATENCY + windowed * SECONDS_PER_TOKEN + overhead:>9.2f} {overhead * 1000:>8.1f}"
+            )
+    print(
+        f"total input tokens: full {sum(r[1] for r in rows)}, windowed {sum(r[2] for r in rows)}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--max-tokens", type=int, default=12000)
+    parser.add_argument("--keep-turns", type=int, default=6)
+    args = parser.parse_args()
+    run(args.turns, ContextWindow(max_tokens=args.max_tokens, keep_turns=args.keep_turns))
@@ -0,0 +1,41 @@
+"""
+Embedding calls and wall time for a first upload versus a re-upload of the
+same chunks through the content-addressed embedding cache.
+
+    python -m benchmarks.bench_embedding_cache --chunks 2000
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.fakes import SlowFakeEmbeddings, synthetic_chunks
+from embedding_cache import CachedEmbeddings
+
+
+def run(chunks: int, dtype: str):
+    texts = synthetic_chunks(chunks)
+    underlying = SlowFakeEmbeddings(size=1536)
+    with tempfile.TemporaryDirectory() as root:
+        cache = CachedEmbeddings(underlying, os.path.join(root, "cache.db"), dtype=dtype)
+        for label in ("first upload", "re-upload"):
+            calls_before = underlying.calls
+            start = time.perf_counter()
+            for i in range(0, len(texts), 500):
+                cache.embed_documents(texts[i : i + 500])
+            elapsed = time.perf_counter() - start
+            print(
+                f"{label:>12}: {elapsed:.3f}s, "
+                f"{underlying.calls - calls_before} embedding calls, {cache.stats()}"
+            )
+        print(f"cache file: {os.path.getsize(os.path.join(root, 'cache.db')) / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--dtype", choices=["float32", "float16"], default="float32")
+    args = parser.parse_args()
+    run(args.chunks, args.dtype)
@@ -0,0 +1,57 @@
+"""
+Ingestion throughput versus batch size and concurrency, embedding through a
+local fake OpenAI server that rate-limits when overloaded.
+
+    python -m benchmarks.bench_embedding_pipeline --chunks 2000
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+from langchain_core.documents import Document
+from langchain_openai import OpenAIEmbeddings
+
+from benchmarks.fake_openai import FakeOpenAIServer
+from benchmarks.fakes import synthetic_chunks
+from ingestion import build_index
+
+
+def run(chunks: int, batch_tokens, workers, server_concurrency: int):
+    docs = [Document(page_content=text) for text in synthetic_chunks(chunks)]
+    print(f"{'batch tok':>10} {'workers':>8} {'seconds':>8} {'chunks/s':>9} {'429s':>6}")
+    with FakeOpenAIServer(max_concurrency=server_concurrency) as server:
+        embeddings = OpenAIEmbeddings(
+            model="text-embedding-3-small",
+            base_url=server.base_url,
+            api_key="fake",
+            check_embedding_ctx_length=False,
+            max_retries=0,
+        )
+        for tokens in batch_tokens:
+            for worker_count in workers:
+                limited_before = server.rate_limited
+                start = time.perf_counter()
+                store = build_index(
+                    docs,
+                    embeddings,
+                    max_batch_tokens=tokens,
+                    max_workers=worker_count,
+                    base_delay=0.05,
+                )
+                elapsed = time.perf_counter() - start
+                assert store.index.ntotal == chunks
+                print(
+                    f"{tokens:>10} {worker_count:>8} {elapsed:>8.2f} "
+                    f"{chunks / elapsed:>9.0f} {server.rate_limited - limited_before:>6}"
+                )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--batch-tokens", type=int, nargs="+", default=[2000, 8000, 32000])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--server-concurrency", type=int, default=6)
+    args = parser.parse_args()
+    run(args.chunks, args.batch_tokens, args.workers, args.server_concurrency)
@@ -0,0 +1,87 @@
+"""
+Startup cost of the backend: ``python -X importtime`` of a module in a fresh
+interpreter, broken down by the slowest modules and by top-level package,
+then the first-use cost of the lazily built pieces.
+
+    python -m benchmarks.bench_import_time --module langgraph_backend --top 15
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+
+_FIRST_USE = """
+import time, langgraph_backend as b
+for name in ("get_checkpointer", "get_llm", "get_chatbot", "get_embeddings"):
+    start = time.perf_counter()
+    getattr(b, name)()
+    print(f"{name}\\t{(time.perf_counter() - start) * 1000:.1f}")
+"""
+
+
+def _env(root: str) -> dict:
+    env = dict(os.environ)
+    env.setdefault("OPENAI_API_KEY", "bench")
+    env.update(
+        CHATBOT_DB_PATH=os.path.join(root, "bench.db"),
+        CHATBOT_RETENTION_KEEP="0",
+        PYTHONDONTWRITEBYTECODE="0",
+    )
+    return env
+
+
+def import_times(module: str, env: dict):
+    """(wall ms, [(self us, cumulative us, name)]) for importing ``module``."""
+    code = f"import time; t = time.perf_counter(); import {module}; print((time.perf_counter() - t) * 1000)"
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, env=env, check=True
+    )
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        rows.append((int(self_us), int(cumulative_us), name))
+    return float(out.stdout.strip().splitlines()[-1]), rows
+
+
+def run(module: str, top: int, repeat: int):
+    with tempfile.TemporaryDirectory() as root:
+        env = _env(root)
+        # The first run warms the bytecode cache; report the best of the rest.
+        import_times(module, env)
+        wall, rows = min((import_times(module, env) for _ in range(repeat)), key=lambda r: r[0])
+
+        print(f"import {module}: {wall:.0f} ms wall, {len(rows)} modules\n")
+        print(f"{'cumulative ms':>14} {'self ms':>8}  module")
+        for self_us, cumulative_us, name in sorted(rows, key=lambda r: -r[1])[:top]:
+            print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>8.1f}  {name}")
+
+        packages = defaultdict(int)
+        for self_us, _, name in rows:
+            packages[name.strip().split(".")[0]] += self_us
+        print(f"\n{'self ms':>8}  package")
+        for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+            print(f"{self_us / 1000:>8.1f}  {package}")
+
+        if module == "langgraph_backend":
+            out = subprocess.run(
+                [sys.executable, "-c", _FIRST_USE], capture_output=True, text=True, env=env, check=True
+            )
+            print(f"\n{'first use ms':>13}  factory")
+            for line in out.stdout.splitlines():
+                name, ms = line.split("\t")
+                print(f"{float(ms):>13.1f}  {name}()")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--module", default="langgraph_backend")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    run(args.module, args.top, args.repeat)
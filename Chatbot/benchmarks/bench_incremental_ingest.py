@@ -0,0 +1,58 @@
+"""
+Time to add one more PDF to a thread that already holds N pages: the
+incremental append used by ``ingest_pdf`` versus indexing all N pages from
+scratch, which is what rebuilding the thread's index on each upload costs.
+
+    python -m benchmarks.bench_incremental_ingest --files 8 --pages 20
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.fakes import SlowFakeEmbeddings, synthetic_pdf
+
+
+def run(files: int, pages: int):
+    with tempfile.TemporaryDirectory() as root:
+        os.environ.setdefault("OPENAI_API_KEY", "fake")
+        os.environ["CHATBOT_DB_PATH"] = os.path.join(root, "bench.db")
+        os.environ["CHATBOT_RETENTION_KEEP"] = "0"
+        import langgraph_backend
+        embeddings = SlowFakeEmbeddings(size=1536, latency_per_call=0.01, latency_per_text=0.0002)
+        langgraph_backend.embeddings = embeddings
+        pdf = synthetic_pdf(pages)
+        rows = []
+        for n in range(files):
+            start = time.perf_counter()
+            langgraph_backend.ingest_pdf(pdf, "bench", filename=f"file{n}.pdf")
+            append = time.perf_counter() - start
+
+            start = time.perf_counter()
+            langgraph_backend.ingest_pdf(synthetic_pdf((n + 1) * pages), f"rebuild-{n}")
+            rebuild = time.perf_counter() - start
+            rows.append(((n + 1) * pages, append, rebuild))
+
+        start = time.perf_counter()
+        langgraph_backend.remove_document("bench", "file0.pdf")
+        remove = time.perf_counter() - start
+        return rows, remove
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=8)
+    parser.add_argument("--pages", type=int, default=20, help="pages per file")
+    args = parser.parse_args()
+
+    rows, remove = run(args.files, args.pages)
+    print(f"{'thread pages':>12} {'append s':>9} {'rebuild s':>10}")
+    for total, append, rebuild in rows:
+        print(f"{total:>12} {append:>9.2f} {rebuild:>10.2f}")
+    print(f"remove one file: {remove:.2f} s (no re-embedding)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Cold-load latency of a persisted thread index versus re-ingesting the chunks.
+
+    python -m benchmarks.bench_index_load --chunks 500 2000
+"""
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+
+from langchain_community.vectorstores import FAISS
+
+from benchmarks.fakes import SlowFakeEmbeddings, synthetic_chunks
+from index_store import ThreadIndexStore
+
+
+def run(chunk_counts, dim: int = 1536):
+    embeddings = SlowFakeEmbeddings(size=dim)
+    rows = []
+    with tempfile.TemporaryDirectory() as root:
+        store = ThreadIndexStore(root)
+        for count in chunk_counts:
+            texts = synthetic_chunks(count)
+
+            start = time.perf_counter()
+            vector_store = FAISS.from_texts(texts, embeddings)
+            ingest = time.perf_counter() - start
+
+            thread_id = f"bench-{count}"
+            store.save(thread_id, vector_store, {"chunks": count})
+
+            timings = {}
+            for mmap in (True, False):
+                start = time.perf_counter()
+                loaded = store.load(thread_id, embeddings, mmap=mmap)
+                timings[mmap] = time.perf_counter() - start
+                assert loaded.index.ntotal == count
+
+            rows.append((count, ingest, timings[True], timings[False]))
+
+    print(f"{'chunks':>8} {'re-ingest s':>12} {'mmap load s':>12} {'read load s':>12}")
+    for count, ingest, mmap_load, read_load in rows:
+        print(f"{count:>8} {ingest:>12.3f} {mmap_load:>12.4f} {read_load:>12.4f}")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunks", type=int, nargs="+", default=[200, 1000, 5000])
+    parser.add_argument("--dim", type=int, default=1536)
+    args = parser.parse_args()
+    run(args.chunks, args.dim)
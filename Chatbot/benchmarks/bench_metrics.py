@@ -0,0 +1,56 @@
+"""
+Cost of the always-on metrics: one histogram observation and one counter
+increment, single-threaded and from contending threads, and rendering a
+scrape with many label sets.
+
+    python -m benchmarks.bench_metrics --observations 200000 --threads 8
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import Registry
+
+
+def run(observations: int, threads: int, series: int):
+    registry = Registry()
+    histogram = registry.histogram("bench_seconds", "Benchmark histogram.", ["op"])
+    counter = registry.counter("bench_total", "Benchmark counter.", ["op"])
+
+    start = time.perf_counter()
+    for i in range(observations):
+        histogram.observe(0.012, op="put")
+    per_observe = (time.perf_counter() - start) / observations
+    print(f"histogram.observe:        {per_observe * 1e6:6.2f} us")
+
+    start = time.perf_counter()
+    for i in range(observations):
+        counter.inc(op="put")
+    print(f"counter.inc:              {(time.perf_counter() - start) / observations * 1e6:6.2f} us")
+
+    def work(_):
+        for i in range(observations // threads):
+            histogram.observe(0.012, op="put")
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(work, range(threads)))
+    elapsed = time.perf_counter() - start
+    print(f"observe, {threads:>2} threads:      {elapsed / observations * 1e6:6.2f} us per observation")
+
+    for i in range(series):
+        histogram.observe(0.5, op=f"op{i}")
+    start = time.perf_counter()
+    text = registry.render()
+    print(f"render {series} series:      {(time.perf_counter() - start) * 1000:6.2f} ms, {len(text) / 1e3:.0f} KB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--observations", type=int, default=200_000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--series", type=int, default=100)
+    args = parser.parse_args()
+    run(args.observations, args.threads, args.series)
@@ -0,0 +1,77 @@
+"""
+Provider prompt-cache hit rate and time-to-first-token with the old
+per-thread system prompt (thread id in the first tokens) versus the shared
+constant prefix, against a local fake OpenAI endpoint that caches prefixes.
+
+    python -m benchmarks.bench_prompt_cache --threads 50 --prefill 0.08
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import uuid
+
+from benchmarks.fake_openai import FakeOpenAIServer
+
+
+def _per_thread_prompt(thread_id: str):
+    from langchain_core.messages import SystemMessage
+
+    return SystemMessage(
+        content=(
+            "You are a helpful assistant. For questions about the uploaded PDF, call "
+            "the `rag_tool` and include the thread_id "
+            f"`{thread_id}`. You can also use the web search, stock price, and "
+            "calculator tools when helpful. If no document is available, ask the user "
+            "to upload a PDF."
+        )
+    )
+
+
+def run(threads: int, latency: float, prefill: float):
+    with FakeOpenAIServer(
+        latency=latency, prefix_cache=True, uncached_latency=prefill
+    ) as server, tempfile.TemporaryDirectory() as root:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        os.environ["OPENAI_API_KEY"] = "fake"
+        os.environ["CHATBOT_DB_PATH"] = os.path.join(root, "bench.db")
+        from langchain_core.messages import HumanMessage
+
+        import langgraph_backend
+        from metrics import MetricsCallback
+        from usage_stats import PromptUsageRecorder
+
+        variants = {
+            "per_thread_prompt": _per_thread_prompt,
+            "stable_prefix": lambda _thread_id: langgraph_backend.SYSTEM_MESSAGE,
+        }
+        results = {}
+        for name, system in variants.items():
+            recorder = PromptUsageRecorder()
+            model = langgraph_backend.llm_with_tools.with_config(callbacks=[MetricsCallback(usage=recorder)])
+            for _ in range(threads):
+                thread_id = str(uuid.uuid4())
+                model.invoke([system(thread_id), HumanMessage("hello")])
+            results[name] = recorder.stats()
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.01, help="fixed seconds per call")
+    parser.add_argument("--prefill", type=float, default=0.08, help="extra seconds on a cache miss")
+    args = parser.parse_args()
+
+    print(f"{'variant':<18} {'calls':>6} {'hit calls':>10} {'cached %':>9} {'TTFT hit ms':>12} {'TTFT miss ms':>13}")
+    for name, stats in run(args.threads, args.latency, args.prefill).items():
+        print(
+            f"{name:<18} {stats['calls']:>6} {stats['cache_hit_calls']:>10} "
+            f"{stats['cached_token_ratio'] * 100:>8.1f}% {str(stats['ttft_ms_cache_hit']):>12} "
+            f"{str(stats['ttft_ms_cache_miss']):>13}"
+        )
+
+
+if __name__ == "__main__":
+    main()
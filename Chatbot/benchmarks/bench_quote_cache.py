@@ -0,0 +1,54 @@
+"""
+Upstream calls and latency for bursts of quote requests with and without
+the TTL cache and single-flight deduplication, against a local quote server.
+
+    python -m benchmarks.bench_quote_cache --requests 64 --symbols 4
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.fake_quotes import FakeQuoteServer
+from quote_cache import QuoteCache
+
+
+def run(total_requests: int, symbols: int, latency: float):
+    tickers = [f"SYM{i}" for i in range(symbols)]
+    burst = [tickers[i % symbols] for i in range(total_requests)]
+
+    with FakeQuoteServer(latency=latency) as server:
+        session = requests.Session()
+
+        def fetch(symbol):
+            return session.get(server.url, params={"symbol": symbol}, timeout=10).json()
+
+        def measure(label, call):
+            before = server.requests
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=16) as pool:
+                list(pool.map(call, burst))
+            elapsed = time.perf_counter() - start
+            print(f"{label:>22}: {elapsed:6.2f}s, {server.requests - before:>4} upstream calls")
+
+        measure("no cache", fetch)
+        cache = QuoteCache(fetch, ttl=60)
+        measure("cache, cold", cache.get)
+        measure("cache, warm", cache.get)
+
+        start = time.perf_counter()
+        QuoteCache(fetch, ttl=60).get_many(tickers)
+        print(f"{'batch of ' + str(symbols) + ' symbols':>22}: {time.perf_counter() - start:6.2f}s")
+        print(cache.stats())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--symbols", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+    run(args.requests, args.symbols, args.latency)
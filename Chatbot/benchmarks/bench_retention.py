@@ -0,0 +1,65 @@
+"""
+File size and get_state latency before and after checkpoint retention on a
+synthetic history.
+
+    python -m benchmarks.bench_retention --threads 10000 --checkpoints 20 --keep 5
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from benchmarks.bench_thread_listing import populate
+from retention import connect, enable_incremental_vacuum, incremental_vacuum, prune
+from thread_catalog import ThreadCatalogSaver
+
+
+def _get_state_latency(saver, thread_ids, samples: int = 500) -> float:
+    rng = random.Random(0)
+    picks = [rng.choice(thread_ids) for _ in range(samples)]
+    start = time.perf_counter()
+    for thread_id in picks:
+        saver.get_tuple({"configurable": {"thread_id": thread_id}})
+    return (time.perf_counter() - start) / samples * 1000
+
+
+def run(threads: int, checkpoints: int, keep: int):
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, "bench.db")
+        saver = ThreadCatalogSaver(sqlite3.connect(path, check_same_thread=False))
+        start = time.perf_counter()
+        populate(saver, threads, checkpoints)
+        print(f"populated {threads} threads x {checkpoints} checkpoints in {time.perf_counter() - start:.1f}s")
+        thread_ids = saver.all_thread_ids()
+
+        size_before = os.path.getsize(path)
+        latency_before = _get_state_latency(saver, thread_ids)
+
+        conn = connect(path)
+        start = time.perf_counter()
+        enable_incremental_vacuum(conn)
+        result = prune(conn, keep)
+        incremental_vacuum(conn, 10_000_000)
+        elapsed = time.perf_counter() - start
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.close()
+
+        size_after = os.path.getsize(path)
+        latency_after = _get_state_latency(saver, thread_ids)
+
+        print(f"retention (keep={keep}): {result} in {elapsed:.1f}s")
+        print(f"file size: {size_before / 1e6:.1f} MB -> {size_after / 1e6:.1f} MB")
+        print(f"get_state: {latency_before:.3f} ms -> {latency_after:.3f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=10000)
+    parser.add_argument("--checkpoints", type=int, default=20)
+    parser.add_argument("--keep", type=int, default=5)
+    args = parser.parse_args()
+    run(args.threads, args.checkpoints, args.keep)
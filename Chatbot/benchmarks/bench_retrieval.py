@@ -0,0 +1,96 @@
+"""
+Recall@k and query latency of vector-only, BM25-only and hybrid (RRF)
+retrieval on a labeled query set.
+
+    python -m benchmarks.bench_retrieval --chunks 2000 --k 4
+    python -m benchmarks.bench_retrieval --pdf manual.pdf --queries labels.jsonl
+
+A labels file has one ``{"query": ..., "answer": ...}`` object per line; a
+query counts as recalled when a retrieved chunk contains its answer text.
+Without ``--pdf`` a synthetic corpus and query set are generated and
+embedded with a local hashing model, so no API key is needed.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import time
+
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from benchmarks.fakes import HashingEmbeddings, labeled_corpus
+from hybrid_retrieval import BM25Index, HybridRetriever
+
+
+def _load_pdf(path: str, queries_path: str):
+    from ingestion import iter_pdf_pages
+    from langgraph_backend import _SPLITTER
+
+    with open(path, "rb") as f:
+        pages = list(iter_pdf_pages(f.read(), source=path))
+    with open(queries_path, "r", encoding="utf-8") as f:
+        queries = [json.loads(line) for line in f if line.strip()]
+    return _SPLITTER.split_documents(pages), queries
+
+
+def run(docs, queries, embeddings, k: int):
+    vector_store = FAISS.from_documents(docs, embeddings)
+    start = time.perf_counter()
+    keyword_index = BM25Index.from_vector_store(vector_store)
+    bm25_build = time.perf_counter() - start
+
+    modes = {
+        "vector": dict(vector_k=k, keyword_k=0),
+        "bm25": dict(vector_k=0, keyword_k=k),
+        "hybrid": dict(vector_k=k, keyword_k=k),
+    }
+    results = {}
+    for name, ks in modes.items():
+        retriever = HybridRetriever(vectorstore=vector_store, keyword_index=keyword_index, k=k, **ks)
+        recalled, latencies = {}, []
+        for query in queries:
+            start = time.perf_counter()
+            found = retriever.invoke(query["query"])
+            latencies.append(time.perf_counter() - start)
+            kind = query.get("kind", "all")
+            hit = any(query["answer"] in doc.page_content for doc in found)
+            recalled.setdefault(kind, []).append(hit)
+        results[name] = {
+            "recall": {kind: sum(hits) / len(hits) for kind, hits in recalled.items()},
+            "p50_ms": statistics.median(latencies) * 1000,
+            "p95_ms": sorted(latencies)[int(len(latencies) * 0.95) - 1] * 1000,
+        }
+    return results, bm25_build
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--pdf")
+    parser.add_argument("--queries", help="labels JSONL, required with --pdf")
+    args = parser.parse_args()
+
+    if args.pdf:
+        from langgraph_backend import embeddings
+
+        docs, queries = _load_pdf(args.pdf, args.queries)
+    else:
+        embeddings = HashingEmbeddings()
+        chunks, queries = labeled_corpus(args.chunks)
+        docs = [Document(page_content=text) for text in chunks]
+
+    results, bm25_build = run(docs, queries, embeddings, args.k)
+    print(f"{len(docs)} chunks, {len(queries)} queries, BM25 build {bm25_build * 1000:.0f} ms")
+    kinds = sorted(next(iter(results.values()))["recall"])
+    header = " ".join(f"{'R@' + str(args.k) + ' ' + kind:>16}" for kind in kinds)
+    print(f"{'mode':<8} {header} {'p50 ms':>8} {'p95 ms':>8}")
+    for name, row in results.items():
+        recall = " ".join(f"{row['recall'][kind]:>16.3f}" for kind in kinds)
+        print(f"{name:<8} {recall} {row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
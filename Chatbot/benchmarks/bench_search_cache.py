@@ -0,0 +1,66 @@
+"""
+Search tool round-trips for a query mix with repeats, with and without the
+result cache, using a stand-in search tool with fixed latency.
+
+    python -m benchmarks.bench_search_cache --queries 200 --distinct 20
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.tools import tool
+
+from search_cache import SearchCache
+
+LATENCY = 0.3
+CALLS = {"count": 0}
+
+
+@tool
+def slow_search(query: str) -> str:
+    """Stand-in web search with a fixed round-trip time."""
+    CALLS["count"] += 1
+    time.sleep(LATENCY)
+    return f"results for {query}"
+
+
+def run(total: int, distinct: int, workers: int):
+    rng = random.Random(0)
+    phrasings = ["{}", "{}?", "  {} ", "{} ".title()]
+    queries = [
+        rng.choice(phrasings).format(f"what is topic {rng.randrange(distinct)}")
+        for _ in range(total)
+    ]
+
+    cache = SearchCache(slow_search)
+    for label, tool_ in (("uncached", slow_search), ("cached", cache.as_tool())):
+        CALLS["count"] = 0
+        latencies = []
+
+        def call(query):
+            start = time.perf_counter()
+            tool_.invoke({"query": query})
+            latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(call, queries))
+        elapsed = time.perf_counter() - start
+        latencies.sort()
+        print(
+            f"{label:>9}: {elapsed:6.2f}s wall, {CALLS['count']:>4} upstream searches, "
+            f"median {latencies[len(latencies) // 2] * 1000:6.1f} ms"
+        )
+    print(cache.stats())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--distinct", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+    run(args.queries, args.distinct, args.workers)
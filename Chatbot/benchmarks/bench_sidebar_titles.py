@@ -0,0 +1,49 @@
+"""
+Sidebar title cost as the number of threads grows: reading every thread's
+checkpoint (the old get_thread_title) versus the stored titles.
+
+    python -m benchmarks.bench_sidebar_titles --threads 100 500 2000
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+from benchmarks.bench_thread_listing import populate
+from thread_catalog import ThreadCatalogSaver, make_title
+
+
+def run(thread_counts, checkpoints_per_thread: int):
+    print(f"{'threads':>8} {'per-thread get_tuple s':>23} {'stored titles s':>16}")
+    for count in thread_counts:
+        with tempfile.TemporaryDirectory() as root:
+            conn = sqlite3.connect(os.path.join(root, "bench.db"), check_same_thread=False)
+            saver = ThreadCatalogSaver(conn)
+            populate(saver, count, checkpoints_per_thread)
+            thread_ids = saver.all_thread_ids()
+
+            start = time.perf_counter()
+            old = {}
+            for thread_id in thread_ids:
+                tup = saver.get_tuple({"configurable": {"thread_id": thread_id}})
+                old[thread_id] = make_title(tup.checkpoint["channel_values"].get("messages", []))
+            per_thread = time.perf_counter() - start
+
+            start = time.perf_counter()
+            stored = saver.titles()
+            table = time.perf_counter() - start
+
+            assert old == stored
+            print(f"{count:>8} {per_thread:>23.3f} {table:>16.4f}")
+            conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, nargs="+", default=[100, 500, 2000])
+    parser.add_argument("--checkpoints", type=int, default=10)
+    args = parser.parse_args()
+    run(args.threads, args.checkpoints)
@@ -0,0 +1,115 @@
+"""
+Display cost of streaming an answer: yielding every chunk to the page (the
+old ai_only_stream) versus CoalescedStream, against a fake model that
+streams one word at a time and calls rag_tool before answering.
+
+st.write_stream redraws the whole markdown block on every piece, so the
+browser work grows with updates x answer length; "re-rendered" counts those
+characters and "render ms" times a stand-in markdown pass over them.
+
+    python -m benchmarks.bench_stream_render --words 400 --token-delay 0.005
+"""
+from __future__ import annotations
+
+import argparse
+import html
+import os
+import re
+import tempfile
+import time
+import uuid
+
+from benchmarks.fake_openai import FakeOpenAIServer
+
+_EMPHASIS = re.compile(r"\*\*(.+?)\*\*")
+
+
+def render(text: str) -> str:
+    """Stand-in for the markdown pass the page runs on every update."""
+    paragraphs = (_EMPHASIS.sub(r"<b>\1</b>", html.escape(p)) for p in text.split("\n\n"))
+    return "".join(f"<p>{p}</p>" for p in paragraphs)
+
+
+def display(pieces):
+    shown = ""
+    updates = leaked = rerendered = 0
+    render_seconds = 0.0
+    start = time.perf_counter()
+    first = None
+    for piece in pieces:
+        if not piece:
+            leaked += 1
+        elif first is None:
+            first = time.perf_counter() - start
+        shown += piece
+        updates += 1
+        rerendered += len(shown)
+        t = time.perf_counter()
+        render(shown)
+        render_seconds += time.perf_counter() - t
+    return {
+        "updates": updates,
+        "leaked": leaked,
+        "rerendered": rerendered,
+        "render_ms": render_seconds * 1000,
+        "ttft_ms": (first or 0) * 1000,
+        "total_ms": (time.perf_counter() - start) * 1000,
+    }
+
+
+def run(words: int, token_delay: float, turns: int, interval: float, max_chars: int):
+    reply = " ".join(f"**word{i}**" if i % 25 == 0 else f"word{i}" for i in range(words))
+    server = FakeOpenAIServer(latency=0.02, token_delay=token_delay, reply=reply, tool_call="rag_tool")
+    with server, tempfile.TemporaryDirectory() as root:
+        os.environ.update(
+            OPENAI_BASE_URL=server.base_url,
+            OPENAI_API_KEY="fake",
+            CHATBOT_DB_PATH=os.path.join(root, "bench.db"),
+            CHATBOT_SEARCH_CACHE=os.path.join(root, "search_cache.db"),
+            CHATBOT_EMBEDDING_CACHE=os.path.join(root, "embedding_cache.db"),
+            CHATBOT_RETENTION_KEEP="0",
+            CHATBOT_ANSWER_CACHE="0",
+        )
+        from langchain_core.messages import AIMessage, HumanMessage
+
+        import langgraph_backend
+        from chat_stream import CoalescedStream
+
+        chatbot = langgraph_backend.get_chatbot()
+
+        def events():
+            config = {"configurable": {"thread_id": str(uuid.uuid4())}}
+            return chatbot.stream({"messages": [HumanMessage("what is in the file?")]}, config, stream_mode="messages")
+
+        def per_chunk():
+            for chunk, _ in events():
+                if isinstance(chunk, AIMessage):
+                    yield chunk.content
+
+        # The first turn pays for building the model clients; keep it out of the timings.
+        for _ in events():
+            pass
+
+        print(f"{words} words, {token_delay * 1000:.0f} ms/token, {turns} turns")
+        print(f"{'adapter':>10} {'updates':>8} {'leaked':>7} {'re-rendered':>12} {'render ms':>10} {'TTFT ms':>8} {'total ms':>9}")
+        for label, make in (
+            ("per-chunk", per_chunk),
+            ("coalesced", lambda: CoalescedStream(events(), interval=interval, max_chars=max_chars)),
+        ):
+            results = [display(make()) for _ in range(turns)]
+            mean = {key: sum(r[key] for r in results) / turns for key in results[0]}
+            print(
+                f"{label:>10} {mean['updates']:>8.0f} {mean['leaked']:>7.0f} {mean['rerendered']:>12,.0f} "
+                f"{mean['render_ms']:>10.1f} {mean['ttft_ms']:>8.0f} {mean['total_ms']:>9.0f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--words", type=int, default=400)
+    parser.add_argument("--token-delay", type=float, default=0.005)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--interval-ms", type=float, default=50)
+    parser.add_argument("--max-chars", type=int, default=200)
+    args = parser.parse_args()
+    run(args.words, args.token_delay, args.turns, args.interval_ms / 1000, args.max_chars)
@@ -0,0 +1,67 @@
+"""
+Peak Python memory and time-to-first-searchable for whole-document versus
+streaming PDF ingestion.
+
+    python -m benchmarks.bench_streaming_ingest --pages 200
+"""
+from __future__ import annotations
+
+import argparse
+import time
+import tracemalloc
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from benchmarks.fakes import SlowFakeEmbeddings, synthetic_pdf
+from ingestion import build_index, iter_pdf_pages, stream_index
+
+
+def _measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    first = fn(start)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, first, peak / 1e6
+
+
+def run(pages: int, window_pages: int):
+    pdf = synthetic_pdf(pages)
+    embeddings = SlowFakeEmbeddings(size=1536, latency_per_call=0.01, latency_per_text=0.0002)
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+
+    def whole(start):
+        docs = list(iter_pdf_pages(pdf, "bench.pdf"))
+        build_index(splitter.split_documents(docs), embeddings)
+        return time.perf_counter() - start
+
+    def streaming(start):
+        first = []
+
+        def on_window(store, window, chunk_count):
+            if not first:
+                first.append(time.perf_counter() - start)
+
+        stream_index(
+            iter_pdf_pages(pdf, "bench.pdf"),
+            splitter,
+            embeddings,
+            window_pages=window_pages,
+            on_window=on_window,
+        )
+        return first[0]
+
+    print(f"{pages} pages, {len(pdf) / 1e6:.1f} MB PDF")
+    print(f"{'mode':>10} {'total s':>8} {'first searchable s':>19} {'peak MB':>8}")
+    for label, fn in (("whole", whole), ("streaming", streaming)):
+        elapsed, first, peak = _measure(fn)
+        print(f"{label:>10} {elapsed:>8.2f} {first:>19.2f} {peak:>8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--window-pages", type=int, default=8)
+    args = parser.parse_args()
+    run(args.pages, args.window_pages)
@@ -0,0 +1,62 @@
+"""
+Thread listing cost: scanning every checkpoint (the old retrieve_all_threads)
+versus the maintained ``threads`` table.
+
+    python -m benchmarks.bench_thread_listing --threads 1000 10000
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.base import empty_checkpoint
+
+from thread_catalog import ThreadCatalogSaver
+
+
+def populate(saver: ThreadCatalogSaver, threads: int, checkpoints_per_thread: int):
+    for t in range(threads):
+        config = {"configurable": {"thread_id": f"thread-{t}", "checkpoint_ns": ""}}
+        messages = []
+        for step in range(checkpoints_per_thread):
+            messages = messages + [HumanMessage(f"question {step}"), AIMessage(f"answer {step}")]
+            checkpoint = empty_checkpoint()
+            checkpoint["channel_values"] = {"messages": messages}
+            config = saver.put(config, checkpoint, {"source": "loop", "step": step}, {})
+
+
+def run(thread_counts, checkpoints_per_thread: int):
+    print(f"{'threads':>8} {'scan s':>8} {'table s':>8} {'page s':>8}")
+    for count in thread_counts:
+        with tempfile.TemporaryDirectory() as root:
+            conn = sqlite3.connect(os.path.join(root, "bench.db"), check_same_thread=False)
+            saver = ThreadCatalogSaver(conn)
+            populate(saver, count, checkpoints_per_thread)
+
+            start = time.perf_counter()
+            scanned = {c.config["configurable"]["thread_id"] for c in saver.list(None)}
+            scan = time.perf_counter() - start
+
+            start = time.perf_counter()
+            listed = saver.all_thread_ids()
+            table = time.perf_counter() - start
+
+            start = time.perf_counter()
+            saver.list_threads(limit=50)
+            page = time.perf_counter() - start
+
+            assert scanned == set(listed)
+            print(f"{count:>8} {scan:>8.3f} {table:>8.4f} {page:>8.5f}")
+            conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--checkpoints", type=int, default=4)
+    args = parser.parse_args()
+    run(args.threads, args.checkpoints)
@@ -0,0 +1,111 @@
+"""
+Wall-clock time of the tools node for a turn that asks for several tools at
+once (a web search, two quotes and rag_tool), using stand-in tools that
+sleep for a set time.
+
+    python -m benchmarks.bench_tool_executor --turns 5 --hang 5 --timeout 1
+
+Three ways of running the node are compared:
+  sequential  ToolNode with max_concurrency=1, one call after another
+  toolnode    ToolNode as it is, calls side by side but waiting for all
+  executor    ToolNode with ToolExecutor: shared pool plus per-tool timeouts
+Each runs a normal turn, then a turn where the search hangs for --hang
+seconds.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+import uuid
+from typing import Annotated, TypedDict
+
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.tools import StructuredTool
+from langgraph.graph import END, START, StateGraph
+from langgraph.graph.message import add_messages
+
+from tool_executor import ToolExecutor
+
+LATENCIES = {"duckduckgo_search": 0.30, "get_stock_price": 0.20, "rag_tool": 0.15}
+
+
+class State(TypedDict):
+    messages: Annotated[list[BaseMessage], add_messages]
+
+
+def stand_in_tools(hang: dict):
+    def make(name):
+        def run(query: str) -> dict:
+            time.sleep(hang.get(name, LATENCIES[name]))
+            return {"tool": name, "query": query}
+
+        return StructuredTool.from_function(run, name=name, description=f"Stand-in for {name}.")
+
+    return [make(name) for name in LATENCIES]
+
+
+def turn() -> AIMessage:
+    calls = [
+        ("duckduckgo_search", "latest EV news"),
+        ("get_stock_price", "TSLA"),
+        ("get_stock_price", "AAPL"),
+        ("rag_tool", "battery warranty"),
+    ]
+    return AIMessage(
+        content="",
+        tool_calls=[
+            {"name": name, "args": {"query": query}, "id": f"call_{uuid.uuid4().hex[:8]}", "type": "tool_call"}
+            for name, query in calls
+        ],
+    )
+
+
+def graph(node):
+    builder = StateGraph(State)
+    builder.add_node("tools", node)
+    builder.add_edge(START, "tools")
+    builder.add_edge("tools", END)
+    return builder.compile()
+
+
+def run(turns: int, hang_seconds: float, timeout: float) -> dict:
+    from langgraph.prebuilt import ToolNode
+
+    hang = {}
+    tools = stand_in_tools(hang)
+    executor = ToolExecutor(max_workers=16, default_timeout=timeout)
+    variants = {
+        "sequential": (graph(ToolNode(tools)), {"max_concurrency": 1}),
+        "toolnode": (graph(ToolNode(tools)), {}),
+        "executor": (graph(executor.tool_node(tools)), {}),
+    }
+    results = {}
+    print(f"{'variant':>10} {'scenario':>8} {'mean ms':>8} {'errors':>7}")
+    for scenario, hung in (("normal", {}), ("hung", {"duckduckgo_search": hang_seconds})):
+        hang.clear()
+        hang.update(hung)
+        for label, (app, config) in variants.items():
+            times, errors = [], 0
+            for _ in range(turns):
+                start = time.perf_counter()
+                out = app.invoke({"messages": [turn()]}, config)
+                times.append(time.perf_counter() - start)
+                errors += sum(1 for m in out["messages"][1:] if getattr(m, "status", "") == "error")
+            mean = sum(times) / len(times) * 1000
+            results[f"{label}/{scenario}"] = {"mean_ms": round(mean, 1), "errors": errors}
+            print(f"{label:>10} {scenario:>8} {mean:>8.0f} {errors:>7}")
+    executor.shutdown()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--hang", type=float, default=5.0, help="how long the hung search sleeps")
+    parser.add_argument("--timeout", type=float, default=1.0, help="ToolExecutor per-tool timeout")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON too")
+    args = parser.parse_args()
+    results = run(args.turns, args.hang, args.timeout)
+    if args.json:
+        print(json.dumps(results, indent=2))
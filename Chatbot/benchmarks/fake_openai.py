@@ -0,0 +1,257 @@
+"""
+A local stand-in for the OpenAI HTTP API, for benchmarks that should not
+touch the network or spend money.
+
+    server = FakeOpenAIServer(latency=0.05, rate_limit_ratio=0.1).start()
+    OpenAIEmbeddings(base_url=server.base_url, api_key="fake", ...)
+    ChatOpenAI(base_url=server.base_url, api_key="fake", ...)
+
+Chat completions answer with ``reply``, streamed word by word when the
+client asks for ``stream``. With ``prefix_cache`` the server mimics
+provider prompt caching: a request whose tools and leading system message
+were seen before reports them as ``cached_tokens`` and skips
+``uncached_latency``. With ``tool_call`` set to a tool name, every user
+turn first gets a call to that tool with the user's text as ``query``,
+and the reply follows once the tool result is in.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _vector(text: str, dim: int):
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    rng = random.Random(seed)
+    return [rng.uniform(-1, 1) for _ in range(dim)]
+
+
+class FakeOpenAIServer:
+    def __init__(
+        self,
+        latency: float = 0.05,
+        latency_per_item: float = 0.0005,
+        rate_limit_ratio: float = 0.0,
+        max_concurrency: int = 0,
+        dim: int = 1536,
+        port: int = 0,
+        reply: str = "This is a canned answer from the fake model. " * 8,
+        token_delay: float = 0.0,
+        prefix_cache: bool = False,
+        uncached_latency: float = 0.0,
+        tool_call: str = "",
+    ):
+        self.latency = latency
+        self.latency_per_item = latency_per_item
+        self.rate_limit_ratio = rate_limit_ratio
+        self.max_concurrency = max_concurrency
+        self.dim = dim
+        self.reply = reply
+        self.token_delay = token_delay
+        self.prefix_cache = prefix_cache
+        self.uncached_latency = uncached_latency
+        self.tool_call = tool_call
+        self._prefixes = set()
+        self.requests = 0
+        self.rate_limited = 0
+        self._active = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "FakeOpenAIServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _admit(self) -> bool:
+        with self._lock:
+            self.requests += 1
+            over = self.max_concurrency and self._active >= self.max_concurrency
+            if over or random.random() < self.rate_limit_ratio:
+                self.rate_limited += 1
+                return False
+            self._active += 1
+            return True
+
+    def _leave(self) -> None:
+        with self._lock:
+            self._active -= 1
+
+    def embeddings(self, body: dict) -> dict:
+        inputs = body.get("input", [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        time.sleep(self.latency + self.latency_per_item * len(inputs))
+        return {
+            "object": "list",
+            "model": body.get("model", "fake"),
+            "data": [
+                {"object": "embedding", "index": i, "embedding": _vector(str(text), self.dim)}
+                for i, text in enumerate(inputs)
+            ],
+            "usage": {"prompt_tokens": len(inputs), "total_tokens": len(inputs)},
+        }
+
+    def _prompt_usage(self, body: dict) -> dict:
+        """Token usage for the prompt; sleeps for the uncached prefill."""
+        messages = body.get("messages", [])
+        prompt = sum(len(str(m.get("content", ""))) // 4 for m in messages)
+        head = [m for m in messages[:1] if m.get("role") == "system"]
+        prefix = json.dumps([body.get("tools"), head], sort_keys=True)
+        prefix_tokens = len(prefix) // 4
+        with self._lock:
+            hit = self.prefix_cache and prefix in self._prefixes
+            self._prefixes.add(prefix)
+        if not hit:
+            time.sleep(self.uncached_latency)
+        return {
+            "prompt_tokens": prompt + len(json.dumps(body.get("tools") or [])) // 4,
+            "prompt_tokens_details": {"cached_tokens": prefix_tokens if hit else 0},
+        }
+
+    def _tool_call(self, body: dict):
+        """The tool call to make for this request, if any."""
+        messages = body.get("messages") or [{}]
+        names = {t.get("function", {}).get("name") for t in body.get("tools") or []}
+        if not self.tool_call or self.tool_call not in names or messages[-1].get("role") != "user":
+            return None
+        return {
+            "id": f"call_{uuid.uuid4().hex[:12]}",
+            "type": "function",
+            "function": {
+                "name": self.tool_call,
+                "arguments": json.dumps({"query": str(messages[-1].get("content", ""))}),
+            },
+        }
+
+    def chat_completion(self, body: dict) -> dict:
+        time.sleep(self.latency)
+        prompt = self._prompt_usage(body)
+        words = self.reply.split(" ")
+        call = self._tool_call(body)
+        message = {"role": "assistant", "content": self.reply}
+        if call:
+            message = {"role": "assistant", "content": None, "tool_calls": [call]}
+        return {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": message,
+                    "finish_reason": "tool_calls" if call else "stop",
+                }
+            ],
+            "usage": {
+                **prompt,
+                "completion_tokens": len(words),
+                "total_tokens": prompt["prompt_tokens"] + len(words),
+            },
+        }
+
+    def chat_chunks(self, body: dict):
+        time.sleep(self.latency)
+        prompt = self._prompt_usage(body)
+        base = {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+        }
+        words = self.reply.split(" ")
+        call = self._tool_call(body)
+        if call:
+            delta = {"role": "assistant", "content": None, "tool_calls": [dict(call, index=0)]}
+            yield dict(base, choices=[{"index": 0, "delta": delta, "finish_reason": None}])
+            words = []
+        for i, word in enumerate(words):
+            if i and self.token_delay:
+                time.sleep(self.token_delay)
+            delta = {"content": word if i == len(words) - 1 else word + " "}
+            if i == 0:
+                delta["role"] = "assistant"
+            yield dict(base, choices=[{"index": 0, "delta": delta, "finish_reason": None}])
+        finish = "tool_calls" if call else "stop"
+        yield dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": finish}])
+        if (body.get("stream_options") or {}).get("include_usage"):
+            usage = dict(prompt, completion_tokens=len(words))
+            usage["total_tokens"] = prompt["prompt_tokens"] + len(words)
+            yield dict(base, choices=[], usage=usage)
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, payload: dict, headers=None):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                if self.path.endswith("/chat/completions"):
+                    self._chat(body)
+                    return
+                if not self.path.endswith("/embeddings"):
+                    self._send(404, {"error": {"message": f"unknown path {self.path}"}})
+                    return
+                if not server._admit():
+                    self._send(
+                        429,
+                        {"error": {"message": "rate limited", "type": "rate_limit_exceeded"}},
+                        {"retry-after": "0.05"},
+                    )
+                    return
+                try:
+                    self._send(200, server.embeddings(body))
+                finally:
+                    server._leave()
+
+            def _chat(self, body: dict):
+                with server._lock:
+                    server.requests += 1
+                if not body.get("stream"):
+                    self._send(200, server.chat_completion(body))
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                for chunk in server.chat_chunks(body):
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                self.wfile.write(b"data: [DONE]\n\n")
+
+        return Handler
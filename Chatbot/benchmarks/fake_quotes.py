@@ -0,0 +1,74 @@
+"""
+A local stand-in for Alpha Vantage's GLOBAL_QUOTE endpoint.
+
+    with FakeQuoteServer(latency=0.2) as server:
+        os.environ["ALPHA_VANTAGE_URL"] = server.url
+"""
+from __future__ import annotations
+
+import json
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class FakeQuoteServer:
+    def __init__(self, latency: float = 0.2, port: int = 0):
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._httpd.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/query"
+
+    def start(self) -> "FakeQuoteServer":
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def quote(self, symbol: str) -> dict:
+        with self._lock:
+            self.requests += 1
+        time.sleep(self.latency)
+        price = 50 + zlib.crc32(symbol.encode("utf-8")) % 40000 / 100
+        return {
+            "Global Quote": {
+                "01. symbol": symbol,
+                "05. price": f"{price:.4f}",
+                "07. latest trading day": time.strftime("%Y-%m-%d"),
+            }
+        }
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                query = parse_qs(urlparse(self.path).query)
+                symbol = (query.get("symbol") or [""])[0]
+                data = json.dumps(server.quote(symbol)).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
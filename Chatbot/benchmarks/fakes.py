@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import hashlib
+import math
+import random
+import re
+import time
+from typing import List
+
+from langchain_core.embeddings import DeterministicFakeEmbedding, Embeddings
+from langchain_core.tools import BaseTool, StructuredTool
+
+
+class SlowFakeEmbeddings(DeterministicFakeEmbedding):
+    """Deterministic embeddings that sleep to mimic a remote embedding API."""
+
+    latency_per_call: float = 0.05
+    latency_per_text: float = 0.0005
+    calls: int = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        time.sleep(self.latency_per_call + self.latency_per_text * len(texts))
+        return super().embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        self.calls += 1
+        time.sleep(self.latency_per_call)
+        return super().embed_query(text)
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Feature-hashed character trigrams of alphabetic words. Like a real
+    embedding model it tolerates inflections and typos but blurs part
+    numbers and clause ids; useful where retrieval quality is measured.
+    """
+
+    _WORD = re.compile(r"[a-z]+")
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.dim
+        grams = [
+            padded[i : i + 3]
+            for padded in (f" {word} " for word in self._WORD.findall(text.lower()))
+            for i in range(len(padded) - 2)
+        ]
+        for gram in grams:
+            digest = hashlib.md5(gram.encode("utf-8")).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dim
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+def labeled_corpus(count: int, seed: int = 7):
+    """
+    ``count`` manual-like chunks plus a labeled query set. Every chunk has a
+    topic, a few distinctive words and a unique part number; half the
+    queries ask about a part number, half use inflected forms of the
+    distinctive words, which exact keyword matching misses. Each query's
+    ``answer`` is a string that only its target chunk contains.
+    """
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    topics = [[f"{t}{w}" for w in ("valve", "pump", "seal", "torque", "limit", "inspect")] for t in letters]
+    filler = "the unit shall be checked before operation and after maintenance per the schedule".split()
+    chunks, queries = [], []
+    for n in range(count):
+        topic = topics[n % len(topics)]
+        rare = ["".join(rng.choice(letters) for _ in range(8)) for _ in range(3)]
+        part = f"PN-{rng.randint(10000, 99999)}-{rng.choice(letters).upper()}{n}"
+        words = [rng.choice(topic + filler) for _ in range(20)]
+        for word in rare:
+            words.insert(rng.randrange(len(words)), word)
+        words.insert(rng.randrange(len(words)), part)
+        chunks.append(" ".join(words))
+        if n % 2:
+            queries.append({"query": f"What does the manual say about {part}?", "answer": part, "kind": "identifier"})
+        else:
+            inflected = " ".join(f"{word[:-1]}ing" for word in rare)
+            queries.append({"query": f"Which procedure covers {inflected}?", "answer": rare[0], "kind": "topical"})
+    return chunks, queries
+
+
+def fake_search_tool(latency: float = 0.3) -> BaseTool:
+    """Stand-in for DuckDuckGoSearchRun: same tool name, canned results."""
+
+    def search(query: str) -> str:
+        time.sleep(latency)
+        return f"Top results for {query!r}: example.com/a, example.com/b, example.com/c"
+
+    return StructuredTool.from_function(
+        search,
+        name="duckduckgo_search",
+        description="A wrapper around DuckDuckGo Search. Input should be a search query.",
+    )
+
+
+def synthetic_chunks(count: int, words: int = 150) -> List[str]:
+    """Cheap, distinct pseudo-text chunks for indexing benchmarks."""
+    vocab = [f"term{i}" for i in range(2000)]
+    return [
+        " ".join(vocab[(n * 7 + i * 13) % len(vocab)] for i in range(words)) + f" chunk{n}"
+        for n in range(count)
+    ]
+
+
+def synthetic_pdf(pages: int, lines_per_page: int = 40) -> bytes:
+    """A minimal text-only PDF with distinct words on every page."""
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [{}] /Count {} >>".format(
+            " ".join(f"{4 + 2 * i} 0 R" for i in range(pages)), pages
+        ),
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for page in range(pages):
+        lines = [
+            f"page {page} line {line} clause C-{page}-{line} "
+            + " ".join(f"term{(page * 31 + line * 7 + w) % 2000}" for w in range(12))
+            for line in range(lines_per_page)
+        ]
+        stream = "BT /F1 9 Tf 20 820 Td 11 TL " + " ".join(f"({text}) '" for text in lines) + " ET"
+        objects.append(
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * page} 0 R >>"
+        )
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+
+    out = "%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n"
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n"
+    return out.encode("latin-1")
@@ -0,0 +1,196 @@
+"""
+Offline benchmark suite for langgraph_backend.
+
+Chat completions come from a local fake OpenAI server, embeddings from a
+deterministic in-process model, quotes from a local Alpha Vantage stand-in
+and web search from a canned tool, each with configurable latency, so runs
+need no network or API keys and are comparable over time.
+
+    python -m benchmarks.suite --levels 1 4 16 64 --output results.json
+
+Measures ingestion throughput (pages/sec, whole and streaming), rag_tool
+p50/p99 latency, checkpoint write p50/p99 latency, and end-to-end turns/sec
+at each concurrency level (one conversation per worker thread). Results
+are written as JSON together with the settings and the git revision.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from benchmarks.fake_openai import FakeOpenAIServer
+from benchmarks.fake_quotes import FakeQuoteServer
+from benchmarks.fakes import SlowFakeEmbeddings, fake_search_tool, synthetic_pdf
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+
+    def at(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return {"p50_ms": round(at(0.50), 3), "p99_ms": round(at(0.99), 3), "n": len(ordered)}
+
+
+def _git_revision() -> str:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=10
+        )
+        return out.stdout.strip() or "unknown"
+    except OSError:
+        return "unknown"
+
+
+def load_backend(root: str, chat: FakeOpenAIServer, quotes: FakeQuoteServer, args):
+    """Import the backend against the fakes; it reads its settings at import."""
+    os.environ.update(
+        OPENAI_BASE_URL=chat.base_url,
+        OPENAI_API_KEY="fake",
+        ALPHA_VANTAGE_URL=quotes.url,
+        CHATBOT_DB_PATH=os.path.join(root, "bench.db"),
+        CHATBOT_SEARCH_CACHE=os.path.join(root, "search_cache.db"),
+        CHATBOT_EMBEDDING_CACHE=os.path.join(root, "embedding_cache.db"),
+        CHATBOT_RETENTION_KEEP="0",
+        CHATBOT_ANSWER_CACHE="0",
+    )
+    import langgraph_backend
+
+    langgraph_backend.embeddings = SlowFakeEmbeddings(
+        size=1536, latency_per_call=args.embed_latency, latency_per_text=args.embed_latency_per_text
+    )
+    langgraph_backend.search_cache.search = fake_search_tool(args.tool_latency)
+    # Model clients and the graph are built on first use; keep that out of the timings.
+    langgraph_backend.get_chatbot()
+    langgraph_backend.get_llm_with_tools()
+    return langgraph_backend
+
+
+def bench_ingestion(backend, pages: int) -> dict:
+    pdf = synthetic_pdf(pages)
+    result = {"pages": pages}
+    for mode, streaming in (("whole", False), ("streaming", True)):
+        start = time.perf_counter()
+        summary = backend.ingest_pdf(pdf, f"ingest-{mode}", filename="bench.pdf", streaming=streaming)
+        elapsed = time.perf_counter() - start
+        result[mode] = {
+            "seconds": round(elapsed, 3),
+            "pages_per_sec": round(pages / elapsed, 2),
+            "chunks": summary["chunks"],
+        }
+    return result
+
+
+def bench_rag(backend, queries: int) -> dict:
+    config = {"configurable": {"thread_id": "ingest-whole"}}
+    backend.rag_tool.invoke({"query": "warm up"}, config=config)
+    samples = []
+    for n in range(queries):
+        start = time.perf_counter()
+        backend.rag_tool.invoke({"query": f"what does clause C-{n % 20}-{n % 40} say"}, config=config)
+        samples.append(time.perf_counter() - start)
+    return percentiles(samples)
+
+
+def bench_checkpoint(backend, writes: int) -> dict:
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    thread = {"configurable": {"thread_id": "checkpoint-bench"}}
+    backend.chatbot.update_state(
+        thread, {"messages": [HumanMessage("question " * 50), AIMessage("answer " * 200)] * 5}
+    )
+    saved = backend.checkpointer.get_tuple(thread)
+    samples = []
+    config = saved.config
+    for step in range(writes):
+        checkpoint = dict(saved.checkpoint, id=str(uuid.uuid4()))
+        start = time.perf_counter()
+        config = backend.checkpointer.put(config, checkpoint, {"source": "loop", "step": step}, {})
+        samples.append(time.perf_counter() - start)
+    return percentiles(samples)
+
+
+def bench_turns(backend, levels: List[int], turns_per_worker: int, pdf_pages: int) -> dict:
+    from langchain_core.messages import HumanMessage
+
+    pdf = synthetic_pdf(pdf_pages)
+    results = {}
+    for level in levels:
+        threads = [f"turns-{level}-{w}" for w in range(level)]
+        for thread_id in threads:
+            backend.ingest_pdf(pdf, thread_id, filename="bench.pdf")
+
+        def worker(thread_id: str) -> List[float]:
+            config = {"configurable": {"thread_id": thread_id}}
+            samples = []
+            for n in range(turns_per_worker):
+                start = time.perf_counter()
+                backend.chatbot.invoke({"messages": [HumanMessage(f"question {n} about clause C-1-{n}")]}, config=config)
+                samples.append(time.perf_counter() - start)
+            return samples
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=level) as pool:
+            samples = [s for worker_samples in pool.map(worker, threads) for s in worker_samples]
+        elapsed = time.perf_counter() - start
+        results[str(level)] = {
+            "turns": len(samples),
+            "seconds": round(elapsed, 3),
+            "turns_per_sec": round(len(samples) / elapsed, 2),
+            **percentiles(samples),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    parser.add_argument("--turns", type=int, default=4, help="turns per worker at each level")
+    parser.add_argument("--pages", type=int, default=50, help="pages in the ingestion PDF")
+    parser.add_argument("--rag-queries", type=int, default=200)
+    parser.add_argument("--checkpoint-writes", type=int, default=500)
+    parser.add_argument("--chat-latency", type=float, default=0.2)
+    parser.add_argument("--token-delay", type=float, default=0.0)
+    parser.add_argument("--embed-latency", type=float, default=0.05)
+    parser.add_argument("--embed-latency-per-text", type=float, default=0.0005)
+    parser.add_argument("--tool-latency", type=float, default=0.2)
+    parser.add_argument("--tool", default="rag_tool", help="tool the fake model calls each turn ('' for none)")
+    parser.add_argument("--output", default="benchmark_results.json")
+    args = parser.parse_args()
+
+    chat = FakeOpenAIServer(latency=args.chat_latency, token_delay=args.token_delay, tool_call=args.tool)
+    quotes = FakeQuoteServer(latency=args.tool_latency)
+    with chat, quotes, tempfile.TemporaryDirectory() as root:
+        backend = load_backend(root, chat, quotes, args)
+        results = {
+            "ingestion": bench_ingestion(backend, args.pages),
+            "rag_tool": bench_rag(backend, args.rag_queries),
+            "checkpoint_put": bench_checkpoint(backend, args.checkpoint_writes),
+            "turns": bench_turns(backend, args.levels, args.turns, pdf_pages=5),
+        }
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": vars(args),
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print(json.dumps(results, indent=2))
+    print(f"written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
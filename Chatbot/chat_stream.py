@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import queue
+import threading
+import time
+from typing import Any, AsyncIterable, AsyncIterator, Iterable, Iterator, Optional, Set, Tuple, Union
+
+from langchain_core.messages import AIMessage
+
+from metrics import STREAM_SECONDS, STREAM_TTFT_SECONDS
+
+
+_END = object()
+
+
+class CoalescedStream:
+    """
+    Adapts ``chatbot.stream(..., stream_mode="messages")`` for display.
+
+    Only assistant text from ``node`` is passed through. Tool-call chunks,
+    any later text in a message that carries tool calls, and tool results
+    are all dropped. The text is yielded in pieces of at least
+    ``max_chars`` characters, or whatever arrived within ``interval``
+    seconds, so the UI redraws a few times a second instead of once per
+    token. Buffered text also goes out when ``interval`` runs out with no
+    new chunk, so a model pausing mid-answer does not hide what it sent.
+    To wait with a deadline, the sync form reads the events on a helper
+    thread.
+
+    ``ttft`` (to the first visible text) and ``total`` are in seconds,
+    measured from when iteration starts, and are recorded in the metrics
+    registry too. Iterate with ``async for`` over an async event stream.
+    """
+
+    def __init__(
+        self,
+        events: Union[Iterable[Tuple[Any, dict]], AsyncIterable[Tuple[Any, dict]]],
+        interval: float = 0.05,
+        max_chars: int = 200,
+        node: str = "chat_node",
+    ):
+        self.events = events
+        self.interval = interval
+        self.max_chars = max_chars
+        self.node = node
+        self.ttft: Optional[float] = None
+        self.total: Optional[float] = None
+        self.chunks = 0
+        self.flushes = 0
+        self.chars = 0
+
+    def _text(self, message: Any, metadata: dict, tool_messages: Set[str]) -> str:
+        if not isinstance(message, AIMessage) or metadata.get("langgraph_node") != self.node:
+            return ""
+        if getattr(message, "tool_call_chunks", None) or message.tool_calls:
+            if message.id:
+                tool_messages.add(message.id)
+            return ""
+        if message.id in tool_messages or not isinstance(message.content, str):
+            return ""
+        return message.content
+
+    def _start(self) -> None:
+        self._began = time.perf_counter()
+        self._last_flush = self._began
+        self._buffer: list = []
+        self._buffered = 0
+        self._tool_messages: Set[str] = set()
+
+    def _take(self, message: Any, metadata: dict) -> Optional[str]:
+        """Buffer one event's text; returns a piece when it is time to flush."""
+        text = self._text(message, metadata, self._tool_messages)
+        if not text:
+            return None
+        if self.ttft is None:
+            self.ttft = time.perf_counter() - self._began
+            STREAM_TTFT_SECONDS.observe(self.ttft)
+        self.chunks += 1
+        self._buffer.append(text)
+        self._buffered += len(text)
+        # The first text goes out at once so the answer starts visibly.
+        if self.flushes == 0 or self._buffered >= self.max_chars or self._wait() == 0:
+            return self._drain()
+        return None
+
+    def _wait(self) -> Optional[float]:
+        """Seconds until buffered text is due, or None with nothing buffered."""
+        if not self._buffer:
+            return None
+        return max(0.0, self._last_flush + self.interval - time.perf_counter())
+
+    def _drain(self) -> str:
+        piece = self._flush(self._buffer)
+        self._buffer, self._buffered, self._last_flush = [], 0, time.perf_counter()
+        return piece
+
+    def _finish(self) -> None:
+        self.total = time.perf_counter() - self._began
+        STREAM_SECONDS.observe(self.total)
+
+    def __iter__(self) -> Iterator[str]:
+        self._start()
+        events: "queue.Queue[tuple]" = queue.Queue()
+        stop = threading.Event()
+
+        def read() -> None:
+            iterator = iter(self.events)
+            try:
+                for event in iterator:
+                    events.put((event, None))
+                    if stop.is_set():
+                        break
+            except BaseException as exc:
+                events.put((_END, exc))
+                return
+            finally:
+                close = getattr(iterator, "close", None)
+                if close is not None:
+                    close()
+            events.put((_END, None))
+
+        # Callbacks and tracing find their run context in context variables.
+        context = contextvars.copy_context()
+        threading.Thread(target=context.run, args=(read,), name="chat-stream", daemon=True).start()
+        try:
+            while True:
+                try:
+                    event, error = events.get(timeout=self._wait())
+                except queue.Empty:
+                    yield self._drain()
+                    continue
+                if event is _END:
+                    if error is not None:
+                        raise error
+                    break
+                piece = self._take(*event)
+                if piece:
+                    yield piece
+            if self._buffer:
+                yield self._drain()
+        finally:
+            stop.set()
+            self._finish()
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        """The same over ``chatbot.astream(...)``."""
+        self._start()
+        events = self.events.__aiter__()
+        pending: Optional[asyncio.Future] = None
+        try:
+            while True:
+                if pending is None:
+                    pending = asyncio.ensure_future(events.__anext__())
+                # Waiting on the task, not the generator, leaves it running
+                # when the deadline passes.
+                done, _ = await asyncio.wait({pending}, timeout=self._wait())
+                if not done:
+                    yield self._drain()
+                    continue
+                finished, pending = pending, None
+                try:
+                    message, metadata = finished.result()
+                except StopAsyncIteration:
+                    break
+                piece = self._take(message, metadata)
+                if piece:
+                    yield piece
+            if self._buffer:
+                yield self._drain()
+        finally:
+            if pending is not None:
+                pending.cancel()
+                await asyncio.gather(pending, return_exceptions=True)
+            self._finish()
+
+    def _flush(self, buffer) -> str:
+        piece = "".join(buffer)
+        self.flushes += 1
+        self.chars += len(piece)
+        return piece
+
+    def stats(self) -> dict:
+        return {
+            "ttft_ms": round(self.ttft * 1000, 1) if self.ttft is not None else None,
+            "total_ms": round(self.total * 1000, 1) if self.total is not None else None,
+            "chunks": self.chunks,
+            "flushes": self.flushes,
+            "chars": self.chars,
+        }
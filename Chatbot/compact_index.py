@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import math
+from typing import Any, Iterable, Optional, Tuple
+
+import faiss
+import numpy as np
+
+FLAT = "Flat"
+# k-means wants about this many training points per centroid; PQ trains 256
+# centroids per sub-quantizer.
+_POINTS_PER_CENTROID = 39
+_PQ_MIN_TRAIN = 256 * _POINTS_PER_CENTROID
+
+
+def _nlist(count: int) -> int:
+    """Inverted lists for ``count`` vectors: a power of two near sqrt(count),
+    so the layout only changes when the thread grows about 4x."""
+    nlist = max(16, 2 ** int(math.log2(max(math.sqrt(count), 1))))
+    return max(1, min(nlist, count // _POINTS_PER_CENTROID))
+
+
+def _pq_subquantizers(dim: int) -> int:
+    """Largest divisor of ``dim`` giving sub-vectors of at least 4 dims."""
+    for m in range(max(dim // 4, 1), 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def choose_spec(
+    count: int, dim: int, min_chunks: int, sq8_min_chunks: int = 0, pq_min_chunks: int = 0
+) -> str:
+    """
+    FAISS factory string for a thread with ``count`` chunks: flat float32
+    below ``min_chunks``, then IVF with float16 codes (1/2 the memory), IVF
+    with 8-bit codes (1/4) from ``sq8_min_chunks``, and IVF with product
+    quantization (1/16, noticeably lossier and slow to train) from
+    ``pq_min_chunks``. A threshold of 0 disables that tier, and PQ is not
+    used below the ~10k vectors it needs for training.
+    """
+    if pq_min_chunks and count >= max(pq_min_chunks, _PQ_MIN_TRAIN):
+        return f"IVF{_nlist(count)},PQ{_pq_subquantizers(dim)}x8"
+    if sq8_min_chunks and count >= sq8_min_chunks:
+        return f"IVF{_nlist(count)},SQ8"
+    if min_chunks and count >= min_chunks:
+        return f"IVF{_nlist(count)},SQfp16"
+    return FLAT
+
+
+def index_spec(index: Any) -> str:
+    """The factory string ``index`` was built from, as far as it can be told."""
+    try:
+        ivf = faiss.downcast_index(faiss.extract_index_ivf(index))
+    except RuntimeError:
+        return FLAT
+    if isinstance(ivf, faiss.IndexIVFPQ):
+        return f"IVF{ivf.nlist},PQ{ivf.pq.M}x{ivf.pq.nbits}"
+    if ivf.sq.qtype == faiss.ScalarQuantizer.QT_8bit:
+        return f"IVF{ivf.nlist},SQ8"
+    return f"IVF{ivf.nlist},SQfp16"
+
+
+def index_kind(spec: str) -> str:
+    """The code type of a factory string (``Flat``, ``SQfp16``, ``SQ8``,
+    ``PQ<m>x8``), leaving out the IVF layout."""
+    return spec.rpartition(",")[2]
+
+
+def _vectors(index: Any, positions: Optional[Iterable[int]] = None) -> np.ndarray:
+    if index_spec(index) != FLAT:
+        faiss.extract_index_ivf(index).make_direct_map()
+    if positions is None:
+        return index.reconstruct_n(0, index.ntotal)
+    positions = list(positions)
+    if not positions:
+        return np.zeros((0, index.d), dtype="float32")
+    return np.vstack([index.reconstruct(int(p)) for p in positions])
+
+
+def _original_vectors(vector_store: Any) -> np.ndarray:
+    """
+    The store's vectors at full precision, in index order. A flat index holds
+    them as they are; a compact one only holds lossy codes, so its chunks are
+    embedded again (from the embedding cache, where they were put when the
+    chunks were added) rather than training new quantizers on decoded codes.
+    """
+    index = vector_store.index
+    if index_spec(index) == FLAT:
+        return _vectors(index)
+    ids = vector_store.index_to_docstore_id
+    texts = [vector_store.docstore.search(ids[i]).page_content for i in range(index.ntotal)]
+    return np.asarray(vector_store.embedding_function.embed_documents(texts), dtype="float32")
+
+
+def build(spec: str, vectors: np.ndarray, nprobe: int = 0, metric: int = faiss.METRIC_L2) -> Any:
+    """Train (on a sample) and fill an index of ``spec`` with ``vectors``."""
+    index = faiss.index_factory(vectors.shape[1], spec, metric)
+    if not index.is_trained:
+        nlist = faiss.extract_index_ivf(index).nlist
+        sample = vectors
+        if len(vectors) > nlist * 256:
+            rng = np.random.default_rng(0)
+            sample = vectors[rng.choice(len(vectors), nlist * 256, replace=False)]
+        index.train(sample)
+    index.add(vectors)
+    if spec != FLAT:
+        ivf = faiss.extract_index_ivf(index)
+        ivf.nprobe = min(ivf.nlist, nprobe or max(8, ivf.nlist // 8))
+    return index
+
+
+def compacted(
+    vector_store: Any,
+    min_chunks: int,
+    sq8_min_chunks: int = 0,
+    pq_min_chunks: int = 0,
+    nprobe: int = 0,
+) -> Tuple[str, Any]:
+    """
+    The index type the store's size calls for, and an index of that type
+    holding the store's vectors in the same order, so the docstore mapping
+    stays valid: the store's own index when it already has that type, else
+    a new one. The store is only read, so searches can go on meanwhile.
+    Small stores, including compact ones that shrank, end up flat.
+
+    Only a change of code type rebuilds: the IVF layout chosen at the last
+    build is kept as the thread grows, as rebuilding costs a re-embed (see
+    ``_original_vectors``) and a retrain.
+    """
+    index = vector_store.index
+    current = index_spec(index)
+    target = choose_spec(index.ntotal, index.d, min_chunks, sq8_min_chunks, pq_min_chunks)
+    if index_kind(target) == index_kind(current):
+        return current, index
+    return target, build(target, _original_vectors(vector_store), nprobe, index.metric_type)
+
+
+def append_store(store: Any, part: Any) -> None:
+    """``store.merge_from(part)`` that also works when ``store`` is compact
+    and ``part`` is a freshly built flat store."""
+    if index_spec(store.index) == index_spec(part.index):
+        store.merge_from(part)
+        return
+    start = store.index.ntotal
+    count = part.index.ntotal
+    store.index.add(_vectors(part.index))
+    ids = [part.index_to_docstore_id[i] for i in range(count)]
+    store.docstore.add({doc_id: part.docstore.search(doc_id) for doc_id in ids})
+    store.index_to_docstore_id.update({start + i: doc_id for i, doc_id in enumerate(ids)})
+
+
+def delete_chunks(vector_store: Any, doc_ids: Iterable[str]) -> None:
+    """
+    Remove chunks by docstore id. Flat stores use ``FAISS.delete``. IVF ids
+    are not renumbered on removal, so in compact stores the surviving codes
+    are relabelled in place afterwards; they are never decoded and encoded
+    again, which would move 8-bit and PQ codes a little each time.
+    """
+    doc_ids = set(doc_ids)
+    if not doc_ids:
+        return
+    index = vector_store.index
+    if index_spec(index) == FLAT:
+        vector_store.delete(list(doc_ids))
+        return
+    positions = sorted(vector_store.index_to_docstore_id.items())
+    keep = [p for p, doc_id in positions if doc_id not in doc_ids]
+    drop = [p for p, doc_id in positions if doc_id in doc_ids]
+    ivf = faiss.extract_index_ivf(index)
+    ivf.set_direct_map_type(faiss.DirectMap.NoMap)
+    renumber = np.full(index.ntotal, -1, dtype="int64")
+    renumber[keep] = np.arange(len(keep))
+    index.remove_ids(faiss.IDSelectorBatch(np.asarray(drop, dtype="int64")))
+    for list_no in range(ivf.nlist):
+        size = ivf.invlists.list_size(list_no)
+        if size:
+            ids = faiss.rev_swig_ptr(ivf.invlists.get_ids(list_no), size)
+            ids[:] = renumber[ids]
+    vector_store.index_to_docstore_id = {
+        i: vector_store.index_to_docstore_id[p] for i, p in enumerate(keep)
+    }
+    vector_store.docstore.delete(list(doc_ids))
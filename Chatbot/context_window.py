@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import json
+from typing import Awaitable, Callable, List, Optional, Sequence, Tuple
+
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage, ToolMessage
+
+from token_count import count_tokens
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a conversation between a user and an "
+    "assistant. Merge the previous summary with the new messages into one "
+    "summary of at most 250 words. Keep facts, names, numbers, user "
+    "preferences, decisions and open questions; drop pleasantries and raw tool output."
+)
+
+Summarizer = Callable[[Optional[str], Sequence[BaseMessage]], str]
+AsyncSummarizer = Callable[[Optional[str], Sequence[BaseMessage]], Awaitable[str]]
+
+
+def _text(content) -> str:
+    return content if isinstance(content, str) else json.dumps(content, default=str)
+
+
+def message_tokens(message: BaseMessage) -> int:
+    tokens = count_tokens(_text(message.content)) + 4
+    for call in getattr(message, "tool_calls", None) or []:
+        tokens += count_tokens(call["name"]) + count_tokens(json.dumps(call.get("args", {})))
+    return tokens
+
+
+def render_transcript(messages: Sequence[BaseMessage], tool_chars: int = 500) -> str:
+    """Plain-text transcript for the summarizer, with tool output clipped."""
+    lines = []
+    for message in messages:
+        text = _text(message.content)
+        if isinstance(message, ToolMessage):
+            text = text[:tool_chars]
+        for call in getattr(message, "tool_calls", None) or []:
+            text += f" [called {call['name']}({json.dumps(call.get('args', {}))})]"
+        lines.append(f"{message.type}: {text}")
+    return "\n".join(lines)
+
+
+def summary_request(previous: Optional[str], messages: Sequence[BaseMessage]) -> List[BaseMessage]:
+    return [
+        SystemMessage(content=SUMMARY_PROMPT),
+        HumanMessage(
+            content=f"Previous summary:\n{previous or '(none)'}\n\n"
+            f"New messages:\n{render_transcript(messages)}"
+        ),
+    ]
+
+
+class ContextWindow:
+    """
+    Decide what part of a thread the model sees on each turn.
+
+    The last ``keep_turns`` turns (a turn starts at a user message) are sent
+    verbatim, except that tool output from earlier turns is clipped to
+    ``tool_output_chars``. Older turns are folded into a running summary,
+    ``fold_turns`` at a time so the summarizer does not run on every turn,
+    and fewer turns are kept whenever the input would exceed ``max_tokens``.
+    The full history stays in the checkpoint; only the model input shrinks.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 12000,
+        keep_turns: int = 6,
+        fold_turns: int = 4,
+        tool_output_chars: int = 2000,
+        summary_tokens: int = 400,
+    ):
+        self.max_tokens = max_tokens
+        self.keep_turns = keep_turns
+        self.fold_turns = fold_turns
+        self.tool_output_chars = tool_output_chars
+        self.summary_tokens = summary_tokens
+
+    def _clip(self, message: BaseMessage) -> BaseMessage:
+        text = _text(message.content)
+        if len(text) <= self.tool_output_chars:
+            return message
+        omitted = len(text) - self.tool_output_chars
+        return message.model_copy(
+            update={
+                "content": text[: self.tool_output_chars]
+                + f"\n...[{omitted} characters of earlier tool output omitted]"
+            }
+        )
+
+    def compact(self, window: Sequence[BaseMessage], clip_all: bool = False) -> List[BaseMessage]:
+        """Clip tool output everywhere except the latest turn (or everywhere)."""
+        last_turn = max(
+            (i for i, m in enumerate(window) if isinstance(m, HumanMessage)), default=0
+        )
+        return [
+            self._clip(m) if isinstance(m, ToolMessage) and (clip_all or i < last_turn) else m
+            for i, m in enumerate(window)
+        ]
+
+    def _fits(self, window: Sequence[BaseMessage], reserve: int) -> bool:
+        return reserve + sum(message_tokens(m) for m in self.compact(window)) <= self.max_tokens
+
+    def plan(self, messages: Sequence[BaseMessage], summary_upto: int) -> int:
+        """Index of the first message to keep verbatim."""
+        summary_upto = min(summary_upto, len(messages))
+        starts = [
+            i for i, m in enumerate(messages) if isinstance(m, HumanMessage) and i >= summary_upto
+        ]
+        cut = summary_upto
+        if len(starts) > self.keep_turns + self.fold_turns:
+            cut = starts[-self.keep_turns]
+
+        reserve = self.summary_tokens
+        later = [i for i in starts if i > cut]
+        while later and not self._fits(messages[cut:], reserve):
+            cut = later.pop(0)
+        return cut
+
+    def _assemble(
+        self, messages: Sequence[BaseMessage], cut: int, summary: Optional[str]
+    ) -> List[BaseMessage]:
+        window = self.compact(messages[cut:])
+        if sum(message_tokens(m) for m in window) > self.max_tokens:
+            window = self.compact(messages[cut:], clip_all=True)
+        if summary:
+            window = [SystemMessage(content=f"Summary of the earlier conversation:\n{summary}"), *window]
+        return window
+
+    def prepare(
+        self,
+        messages: Sequence[BaseMessage],
+        summary: Optional[str],
+        summary_upto: int,
+        summarize: Summarizer,
+    ) -> Tuple[List[BaseMessage], dict]:
+        """
+        Return the model input (without the system prompt) and the state
+        update to apply, which is empty unless the summary moved forward.
+        """
+        cut = self.plan(messages, summary_upto)
+        update: dict = {}
+        if cut > summary_upto:
+            summary = summarize(summary, messages[summary_upto:cut])
+            update = {"summary": summary, "summary_upto": cut}
+        return self._assemble(messages, cut, summary), update
+
+    async def aprepare(
+        self,
+        messages: Sequence[BaseMessage],
+        summary: Optional[str],
+        summary_upto: int,
+        summarize: AsyncSummarizer,
+    ) -> Tuple[List[BaseMessage], dict]:
+        cut = self.plan(messages, summary_upto)
+        update: dict = {}
+        if cut > summary_upto:
+            summary = await summarize(summary, messages[summary_upto:cut])
+            update = {"summary": summary, "summary_upto": cut}
+        return self._assemble(messages, cut, summary), update
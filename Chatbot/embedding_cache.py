@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from sqlite_cache import RowCap
+
+_SQLITE_BATCH = 500
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Content-addressed embedding cache in a sqlite BLOB table.
+
+    Vectors are keyed by sha256(model name + text), so the same chunk is
+    embedded once no matter which thread or upload it comes from. Entries
+    are evicted least-recently-used once ``max_entries`` is exceeded.
+
+    Queries (``embed_query``) are one-off text, so they skip the table and
+    sit in an in-memory LRU of ``query_cache_size`` instead. The file can
+    be shared by several processes: it runs in WAL mode and waits up to
+    ``busy_timeout`` seconds for another writer.
+    """
+
+    def __init__(
+        self,
+        underlying: Embeddings,
+        path: str,
+        model_name: Optional[str] = None,
+        max_entries: int = 200_000,
+        dtype: str = "float32",
+        query_cache_size: int = 1024,
+        busy_timeout: float = 30.0,
+    ):
+        if dtype not in ("float32", "float16"):
+            raise ValueError("dtype must be 'float32' or 'float16'")
+        self.underlying = underlying
+        self.model_name = model_name or getattr(underlying, "model", type(underlying).__name__)
+        self.max_entries = max_entries
+        self.dtype = dtype
+        self.query_cache_size = query_cache_size
+        self.hits = 0
+        self.misses = 0
+        self.query_hits = 0
+        self.query_misses = 0
+        self._queries: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=busy_timeout, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                dtype TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)"
+        )
+        self._conn.commit()
+        self._cap = RowCap(self._conn, "embeddings", "last_used", max_entries)
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def _lookup(self, keys: List[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        now = time.time()
+        with self._lock:
+            for i in range(0, len(keys), _SQLITE_BATCH):
+                batch = keys[i : i + _SQLITE_BATCH]
+                marks = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, dtype, vector FROM embeddings WHERE key IN ({marks})", batch
+                ).fetchall()
+                for key, dtype, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=dtype).astype(np.float32).tolist()
+                if rows:
+                    self._conn.execute(
+                        f"UPDATE embeddings SET last_used = ? WHERE key IN ({marks})",
+                        [now, *batch],
+                    )
+            self._conn.commit()
+        return found
+
+    def _store(self, items: Dict[str, List[float]]) -> None:
+        now = time.time()
+        rows = [
+            (key, self.dtype, np.asarray(vector, dtype=self.dtype).tobytes(), now)
+            for key, vector in items.items()
+        ]
+        with self._lock:
+            # A key already present holds the same vector: it is the same text.
+            inserted = self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, dtype, vector, last_used) VALUES (?, ?, ?, ?)",
+                rows,
+            ).rowcount
+            self._cap.added(inserted)
+            self._conn.commit()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(text) for text in texts]
+        found = self._lookup(list(dict.fromkeys(keys)))
+
+        missing: Dict[str, str] = {}
+        misses = 0
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+                misses += 1
+
+        # build_index embeds batches from several threads at once.
+        with self._lock:
+            self.hits += len(texts) - misses
+            self.misses += misses
+
+        if missing:
+            vectors = self.underlying.embed_documents(list(missing.values()))
+            fresh = dict(zip(missing.keys(), vectors))
+            self._store(fresh)
+            found.update(fresh)
+
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self._key(text)
+        with self._lock:
+            vector = self._queries.get(key)
+            if vector is not None:
+                self._queries.move_to_end(key)
+                self.query_hits += 1
+                return vector
+        vector = self.underlying.embed_query(text)
+        with self._lock:
+            self.query_misses += 1
+            self._queries[key] = vector
+            while len(self._queries) > self.query_cache_size:
+                self._queries.popitem(last=False)
+        return vector
+
+    def stats(self) -> dict:
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+            "entries": entries,
+            "query_hits": self.query_hits,
+            "query_misses": self.query_misses,
+        }
@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+import re
+from collections import Counter, defaultdict
+from heapq import nlargest
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from pydantic import ConfigDict
+
+# Identifiers such as "PN-4821.3B" or "§12(b)" stay whole; their parts are
+# indexed too so "4821" still matches.
+_TOKEN = re.compile(r"[a-z0-9]+(?:[._/-][a-z0-9]+)*")
+_PART = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by do does for from how in is it of on or that the this "
+    "to was what when where which who why with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        if token in _STOPWORDS:
+            continue
+        tokens.append(token)
+        parts = _PART.findall(token)
+        if len(parts) > 1:
+            tokens.extend(p for p in parts if p not in _STOPWORDS)
+    return tokens
+
+
+class BM25Index:
+    """
+    Okapi BM25 over chunk ids. Only term frequencies are kept; the chunk
+    text stays in the FAISS docstore the ids point into.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._docs: Dict[str, Dict[str, int]] = {}
+        self._lengths: Dict[str, int] = {}
+        self._postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._docs
+
+    def _add_terms(self, doc_id: str, terms: Dict[str, int]) -> None:
+        self._docs[doc_id] = terms
+        length = sum(terms.values())
+        self._lengths[doc_id] = length
+        self._total_length += length
+        for term, tf in terms.items():
+            self._postings[term][doc_id] = tf
+
+    def add(self, doc_id: str, text: str) -> None:
+        if doc_id in self._docs:
+            self.remove([doc_id])
+        self._add_terms(doc_id, dict(Counter(tokenize(text))))
+
+    def remove(self, doc_ids: Iterable[str]) -> None:
+        for doc_id in doc_ids:
+            terms = self._docs.pop(doc_id, None)
+            if terms is None:
+                continue
+            self._total_length -= self._lengths.pop(doc_id)
+            for term in terms:
+                posting = self._postings[term]
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self._postings[term]
+
+    def sync(self, vector_store: Any) -> int:
+        """Index chunks the vector store has and this index lacks, and drop
+        ones it no longer has. Returns the number of chunks added."""
+        ids = set(vector_store.index_to_docstore_id.values())
+        self.remove([doc_id for doc_id in self._docs if doc_id not in ids])
+        added = 0
+        for doc_id in ids - self._docs.keys():
+            doc = vector_store.docstore.search(doc_id)
+            if isinstance(doc, Document):
+                self.add(doc_id, doc.page_content)
+                added += 1
+        return added
+
+    def extend(self, vector_store: Any, start: int = 0) -> int:
+        """Index the vector store's chunks from position ``start`` on, i.e.
+        only what was appended since; returns the new end position."""
+        end = vector_store.index.ntotal
+        for position in range(start, end):
+            doc_id = vector_store.index_to_docstore_id[position]
+            doc = vector_store.docstore.search(doc_id)
+            if isinstance(doc, Document):
+                self.add(doc_id, doc.page_content)
+        return end
+
+    @classmethod
+    def from_vector_store(cls, vector_store: Any, **kwargs: Any) -> "BM25Index":
+        index = cls(**kwargs)
+        index.sync(vector_store)
+        return index
+
+    def search(
+        self, query: str, k: int = 4, doc_filter: Optional[Callable[[str], bool]] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Top ``k`` ``(doc_id, score)`` pairs; chunks sharing no term are left
+        out, as are chunks ``doc_filter`` rejects.
+        """
+        n = len(self._docs)
+        if not n:
+            return []
+        avg_length = self._total_length / n or 1.0
+        scores: Dict[str, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            posting = self._postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for doc_id, tf in posting.items():
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / avg_length)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        if doc_filter is not None:
+            scores = {doc_id: score for doc_id, score in scores.items() if doc_filter(doc_id)}
+        return nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def nbytes(self) -> int:
+        """Rough resident size: one posting entry per (term, chunk) pair."""
+        return sum(len(terms) for terms in self._docs.values()) * 120
+
+    def save(self, path: str) -> None:
+        # dumps uses the C encoder; dump to a file streams through the Python one.
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"k1": self.k1, "b": self.b, "docs": self._docs}))
+
+    @classmethod
+    def load(cls, path: str) -> Optional["BM25Index"]:
+        if not os.path.isfile(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        index = cls(k1=data["k1"], b=data["b"])
+        for doc_id, terms in data["docs"].items():
+            index._add_terms(doc_id, terms)
+        return index
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[str]], k: int = 60
+) -> List[Tuple[str, float]]:
+    """Merge ranked id lists: each list contributes ``1 / (k + rank)`` per id."""
+    scores: Dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] += 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Runs the FAISS similarity search and the BM25 keyword search and merges
+    them with reciprocal-rank fusion, so exact identifiers that embeddings
+    blur still surface. Either side can be switched off with a k of 0.
+    ``invoke(query, source_file=...)`` restricts both sides to one file.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    vectorstore: Any
+    keyword_index: Optional[BM25Index] = None
+    vector_k: int = 4
+    keyword_k: int = 4
+    k: int = 4
+    rrf_k: int = 60
+
+    def _get_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: CallbackManagerForRetrieverRun,
+        source_file: Optional[str] = None,
+    ) -> List[Document]:
+        docs: Dict[str, Document] = {}
+        rankings = []
+        search_kwargs: Dict[str, Any] = {}
+        doc_filter: Optional[Callable[[str], bool]] = None
+        if source_file:
+            # FAISS filters after the search, so look further than k.
+            search_kwargs = {"filter": {"source_file": source_file}, "fetch_k": max(50, self.vector_k * 20)}
+
+            def from_source(doc_id: str) -> bool:
+                doc = self.vectorstore.docstore.search(doc_id)
+                return isinstance(doc, Document) and doc.metadata.get("source_file") == source_file
+
+            doc_filter = from_source
+
+        if self.vector_k > 0:
+            ranking = []
+            for doc in self.vectorstore.similarity_search(query, k=self.vector_k, **search_kwargs):
+                key = doc.id or doc.page_content
+                docs.setdefault(key, doc)
+                ranking.append(key)
+            rankings.append(ranking)
+        if self.keyword_index is not None and self.keyword_k > 0:
+            ranking = []
+            for doc_id, _ in self.keyword_index.search(query, self.keyword_k, doc_filter):
+                doc = self.vectorstore.docstore.search(doc_id)
+                if isinstance(doc, Document):
+                    docs.setdefault(doc_id, doc)
+                    ranking.append(doc_id)
+            rankings.append(ranking)
+        fused = reciprocal_rank_fusion(rankings, k=self.rrf_k)
+        return [docs[doc_id] for doc_id, _ in fused[: self.k]]
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import pickle
+import re
+import shutil
+import uuid
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Callable, Iterator, Optional, Tuple, TypeVar
+
+from hybrid_retrieval import BM25Index
+
+try:
+    import fcntl
+except ImportError:  # Windows: one process per index root
+    fcntl = None
+
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import FAISS
+
+INDEX_FILE = "index.faiss"
+DOCSTORE_FILE = "index.pkl"
+METADATA_FILE = "metadata.json"
+KEYWORD_FILE = "bm25.json"
+# Names the thread's current version directory; replaced atomically by save.
+CURRENT_FILE = "CURRENT"
+_VERSION_PREFIX = "v-"
+# A read overlapping this many saves of the same thread gives up.
+_READ_ATTEMPTS = 5
+_T = TypeVar("_T")
+
+_SAFE_NAME = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+class ThreadIndexStore:
+    """
+    One directory per thread holding the FAISS index, its docstore, the
+    BM25 keyword index and a small metadata file. Nothing is scanned up front: a thread's directory is
+    only touched when that thread is asked for.
+
+    Each save writes a new ``v-<id>`` subdirectory and then replaces the
+    ``CURRENT`` file naming it, so there is always exactly one complete
+    version. Reads resolve ``CURRENT`` once and read every file from that
+    version, starting over if a save replaced it meanwhile. Directories
+    written before versions existed hold the files directly and are read
+    as they are until their next save.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path_for(self, thread_id: str) -> str:
+        """
+        UUIDs and other plain ids are used as the directory name. Anything
+        else ("..", "a/b", dots that could meet the ".lock" and ".tmp-"
+        siblings) is hashed, so no two ids share a directory and none
+        escapes the root.
+        """
+        name = str(thread_id)
+        if not _SAFE_NAME.fullmatch(name):
+            name = "h-" + hashlib.sha256(name.encode("utf-8")).hexdigest()
+        return os.path.join(self.root, name)
+
+    def _current(self, thread_id: str) -> str:
+        """The directory holding the thread's current version."""
+        base = self.path_for(thread_id)
+        try:
+            with open(os.path.join(base, CURRENT_FILE), "r", encoding="utf-8") as f:
+                return os.path.join(base, f.read().strip())
+        except FileNotFoundError:
+            return base
+
+    def _read(self, thread_id: str, read: Callable[[str], _T]) -> _T:
+        """
+        ``read(directory)`` against one version of the thread, run again if
+        a save swapped in another version while it ran (and removed the one
+        being read, which shows up as missing files).
+        """
+        for attempt in range(_READ_ATTEMPTS):
+            before = self.version(thread_id)
+            try:
+                result = read(self._current(thread_id))
+            except (OSError, RuntimeError, EOFError, pickle.UnpicklingError):
+                if attempt + 1 == _READ_ATTEMPTS or self.version(thread_id) == before:
+                    raise
+                continue
+            if self.version(thread_id) == before:
+                return result
+        return result
+
+    def exists(self, thread_id: str) -> bool:
+        return self._read(thread_id, lambda path: os.path.isfile(os.path.join(path, METADATA_FILE)))
+
+    def version(self, thread_id: str) -> Optional[Tuple[int, int]]:
+        """
+        Changes whenever ``save`` or ``delete`` replaces the thread's index, in
+        any process; None if there is none. A stat call, cheap enough to
+        check on every search.
+        """
+        base = self.path_for(thread_id)
+        for name in (CURRENT_FILE, METADATA_FILE):
+            try:
+                st = os.stat(os.path.join(base, name))
+            except OSError:
+                continue
+            return st.st_ino, st.st_mtime_ns
+        return None
+
+    @contextmanager
+    def lock(self, thread_id: str) -> Iterator[None]:
+        """
+        Exclusive across processes sharing the root, for read-modify-write
+        updates of one thread's index. The lock file sits beside the index
+        directory, which ``save`` swaps out.
+        """
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(self.root, exist_ok=True)
+        with open(f"{self.path_for(thread_id)}.lock", "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def metadata(self, thread_id: str) -> dict:
+        try:
+            return self._read(thread_id, _read_metadata)
+        except (OSError, ValueError):
+            return {}
+
+    def save(
+        self,
+        thread_id: str,
+        vector_store: FAISS,
+        metadata: dict,
+        keyword_index: Optional[BM25Index] = None,
+    ) -> str:
+        """
+        Write the index for a thread as a new version and make it current,
+        so readers never see a half-written index or go without one. Callers
+        hold ``lock(thread_id)``; older versions are removed afterwards.
+        """
+        target = self.path_for(thread_id)
+        os.makedirs(target, exist_ok=True)
+        name = f"{_VERSION_PREFIX}{uuid.uuid4().hex}"
+
+        version = os.path.join(target, name)
+        vector_store.save_local(version)
+        if keyword_index is not None:
+            keyword_index.save(os.path.join(version, KEYWORD_FILE))
+        with open(os.path.join(version, METADATA_FILE), "w", encoding="utf-8") as f:
+            json.dump(metadata, f)
+
+        pointer = os.path.join(target, f"{CURRENT_FILE}.tmp-{name}")
+        with open(pointer, "w", encoding="utf-8") as f:
+            f.write(name)
+        os.replace(pointer, os.path.join(target, CURRENT_FILE))
+
+        for entry in os.listdir(target):
+            path = os.path.join(target, entry)
+            if entry.startswith(_VERSION_PREFIX) and entry != name:
+                shutil.rmtree(path, ignore_errors=True)
+            elif entry in (INDEX_FILE, DOCSTORE_FILE, METADATA_FILE, KEYWORD_FILE):
+                # Left from before versions existed; CURRENT is read first now.
+                os.remove(path)
+        return version
+
+    def load(self, thread_id: str, embeddings: Any, mmap: bool = True) -> Optional[FAISS]:
+        """
+        Load a thread's FAISS store, or None if it was never persisted.
+
+        With ``mmap`` the vectors are mapped read-only from disk instead of
+        being copied into memory; index types that cannot be mapped are read
+        normally.
+        """
+        return self._read(thread_id, lambda path: _load_vector_store(path, embeddings, mmap))
+
+    def load_thread(
+        self, thread_id: str, embeddings: Any, mmap: bool = True
+    ) -> Optional[Tuple[FAISS, BM25Index, dict]]:
+        """
+        The FAISS store, BM25 index and metadata of one version of the
+        thread, or None if it was never persisted. The keyword index is
+        rebuilt from the docstore for indexes saved before keyword search
+        existed.
+        """
+
+        def read(path: str) -> Optional[Tuple[FAISS, BM25Index, dict]]:
+            vector_store = _load_vector_store(path, embeddings, mmap)
+            if vector_store is None:
+                return None
+            keyword_index = BM25Index.load(os.path.join(path, KEYWORD_FILE))
+            if keyword_index is None:
+                keyword_index = BM25Index.from_vector_store(vector_store)
+            return vector_store, keyword_index, _read_metadata(path)
+
+        return self._read(thread_id, read)
+
+    def delete(self, thread_id: str) -> None:
+        shutil.rmtree(self.path_for(thread_id), ignore_errors=True)
+
+
+def _read_metadata(path: str) -> dict:
+    with open(os.path.join(path, METADATA_FILE), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _load_vector_store(path: str, embeddings: Any, mmap: bool) -> Optional[FAISS]:
+    index_path = os.path.join(path, INDEX_FILE)
+    if not os.path.isfile(index_path):
+        return None
+
+    # Deferred: metadata reads (the sidebar) should not pay for FAISS.
+    import faiss
+    from langchain_community.vectorstores import FAISS
+
+    index = None
+    if mmap:
+        flags = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+        try:
+            index = faiss.read_index(index_path, flags)
+        except RuntimeError:
+            index = None
+    if index is None:
+        index = faiss.read_index(index_path)
+
+    # The docstore pickle is written by ``save``, never by the user.
+    with open(os.path.join(path, DOCSTORE_FILE), "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+
+    return FAISS(embeddings, index, docstore, index_to_docstore_id)
@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import contextlib
+import io
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import Any, Callable, ContextManager, Iterable, Iterator, List, Optional
+
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from pypdf import PdfReader
+
+from compact_index import append_store
+from metrics import stage
+from token_count import count_tokens
+
+ProgressCallback = Callable[[int, int], None]
+WindowCallback = Callable[[FAISS, List[Document], int], None]
+
+
+def token_batches(
+    texts: List[str], max_batch_tokens: int = 8000, max_batch_size: int = 256
+) -> List[List[int]]:
+    """Group text indices into batches bounded by token count and item count."""
+    batches: List[List[int]] = []
+    current: List[int] = []
+    current_tokens = 0
+    for i, text in enumerate(texts):
+        tokens = count_tokens(text)
+        if current and (
+            current_tokens + tokens > max_batch_tokens or len(current) >= max_batch_size
+        ):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def is_rate_limited(exc: BaseException) -> bool:
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status == 429 or type(exc).__name__ == "RateLimitError"
+
+
+def _retry_after(exc: BaseException) -> Optional[float]:
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveConcurrency:
+    """
+    Additive-increase / multiplicative-decrease cap on in-flight requests.
+    A 429 halves the cap; a full round of successes raises it by one.
+    """
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max(1, max_concurrency)
+        self.limit = self.max_concurrency
+        self.rate_limited = 0
+        self._active = 0
+        self._successes = 0
+        self._cond = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self._active >= self.limit:
+                self._cond.wait()
+            self._active += 1
+
+    def release(self, success: bool = True) -> None:
+        with self._cond:
+            self._active -= 1
+            if success:
+                self._successes += 1
+                if self._successes >= self.limit and self.limit < self.max_concurrency:
+                    self.limit += 1
+                    self._successes = 0
+            self._cond.notify_all()
+
+    def back_off(self) -> None:
+        with self._cond:
+            self.rate_limited += 1
+            self.limit = max(1, self.limit // 2)
+            self._successes = 0
+
+
+def _embed_with_backoff(
+    embeddings: Any,
+    texts: List[str],
+    limiter: AdaptiveConcurrency,
+    max_retries: int,
+    base_delay: float,
+) -> List[List[float]]:
+    for attempt in range(max_retries + 1):
+        limiter.acquire()
+        try:
+            with stage("embed"):
+                vectors = embeddings.embed_documents(texts)
+        except Exception as exc:
+            limiter.release(success=False)
+            if not is_rate_limited(exc) or attempt == max_retries:
+                raise
+            limiter.back_off()
+            delay = _retry_after(exc) or base_delay * (2**attempt)
+            time.sleep(delay * (0.5 + random.random()))
+            continue
+        limiter.release(success=True)
+        return vectors
+    raise RuntimeError("unreachable")
+
+
+def build_index(
+    chunks: Iterable[Document],
+    embeddings: Any,
+    vector_store: Optional[FAISS] = None,
+    max_batch_tokens: int = 8000,
+    max_workers: int = 4,
+    max_retries: int = 6,
+    base_delay: float = 1.0,
+    on_progress: Optional[ProgressCallback] = None,
+) -> Optional[FAISS]:
+    """
+    Embed chunks in token-bounded batches on a bounded worker pool and add
+    each batch to the FAISS store as soon as it finishes.
+
+    Rate-limited batches are retried with jittered exponential backoff while
+    the pool's concurrency shrinks. ``on_progress(done, total)`` is called
+    from the calling thread, so it is safe to drive UI widgets from it.
+    Returns ``vector_store`` (created if None), or None for no chunks.
+    """
+    chunks = list(chunks)
+    texts = [chunk.page_content for chunk in chunks]
+    batches = token_batches(texts, max_batch_tokens)
+    limiter = AdaptiveConcurrency(max_workers)
+    done = 0
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = {
+            pool.submit(
+                _embed_with_backoff,
+                embeddings,
+                [texts[i] for i in batch],
+                limiter,
+                max_retries,
+                base_delay,
+            ): batch
+            for batch in batches
+        }
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                batch = pending.pop(future)
+                vectors = future.result()
+                pairs = [(texts[i], vector) for i, vector in zip(batch, vectors)]
+                metadatas = [chunks[i].metadata for i in batch]
+                with stage("index"):
+                    if vector_store is None:
+                        vector_store = FAISS.from_embeddings(pairs, embeddings, metadatas=metadatas)
+                    else:
+                        vector_store.add_embeddings(pairs, metadatas=metadatas)
+                done += len(batch)
+                if on_progress:
+                    on_progress(done, len(chunks))
+
+    return vector_store
+
+
+def iter_pdf_pages(file_bytes: bytes, source: Optional[str] = None) -> Iterator[Document]:
+    """Yield one Document per PDF page, parsing each page only when it is reached."""
+    reader = PdfReader(io.BytesIO(file_bytes))
+    total = len(reader.pages)
+    for number, page in enumerate(reader.pages):
+        with stage("load"):
+            text = page.extract_text() or ""
+        yield Document(
+            page_content=text,
+            metadata={"source": source, "page": number, "total_pages": total},
+        )
+
+
+def windows(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    iterator = iter(items)
+    while True:
+        window = list(islice(iterator, size))
+        if not window:
+            return
+        yield window
+
+
+def stream_index(
+    pages: Iterable[Document],
+    splitter: Any,
+    embeddings: Any,
+    window_pages: int = 8,
+    lock: Optional[ContextManager] = None,
+    on_window: Optional[WindowCallback] = None,
+    vector_store: Optional[FAISS] = None,
+    **build_kwargs: Any,
+) -> Optional[FAISS]:
+    """
+    Split and embed pages a window at a time, appending each window to one
+    FAISS store (``vector_store`` if given, else a new one). Only the current
+    window's pages and chunks are held outside the index.
+
+    ``on_window(store, window, chunk_count)`` runs after every window, so the
+    caller can publish the store as soon as the first pages are searchable.
+    Appends happen under ``lock`` so that concurrent searches holding the
+    same lock never see a half-merged index.
+    """
+    store = vector_store
+    for window in windows(pages, window_pages):
+        with stage("split"):
+            chunks = splitter.split_documents(window)
+        if chunks:
+            part = build_index(chunks, embeddings, **build_kwargs)
+            if store is None:
+                store = part
+            else:
+                with lock or contextlib.nullcontext(), stage("index"):
+                    append_store(store, part)
+        if on_window and store is not None:
+            on_window(store, window, len(chunks))
+    return store
@@ -1,97 +1,485 @@
 from __future__ import annotations
 
+import hashlib
 import os
-import sqlite3
 import tempfile
-from typing import Annotated, Any, Dict, Optional, TypedDict
+import threading
+import uuid
+from collections import OrderedDict
+from typing import (
+    TYPE_CHECKING,
+    Annotated,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NotRequired,
+    Optional,
+    Tuple,
+    TypedDict,
+)
 
 from dotenv import load_dotenv
-from langchain_text_splitters  import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import PyPDFLoader
 from langchain_community.tools import DuckDuckGoSearchRun
-from langchain_community.vectorstores import FAISS
-from langchain_core.messages import BaseMessage, SystemMessage
+from langchain_core.documents import Document
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
 from langchain_core.tools import tool
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.constants import TAG_NOSTREAM
 from langgraph.graph import START, StateGraph
 from langgraph.graph.message import add_messages
-from langgraph.prebuilt import ToolNode, tools_condition
 import requests
 
+from context_window import ContextWindow, summary_request
+from hybrid_retrieval import BM25Index, HybridRetriever
+from index_store import ThreadIndexStore
+from metrics import (
+    INGEST_CHUNKS,
+    INGEST_PAGES,
+    INGEST_SECONDS,
+    RETRIEVER_SECONDS,
+    MetricsCallback,
+    instrument_checkpointer,
+    serve as serve_metrics,
+    stage,
+    timed_node,
+)
+from quote_cache import QuoteCache
+from pooled_saver import PooledThreadCatalogSaver
+from retention import (
+    RetentionWorker,
+    connect as retention_connect,
+    init_incremental_vacuum,
+    set_keep_history,
+)
+from retriever_registry import RetrieverRegistry
+from search_cache import SearchCache
+from thread_catalog import make_title
+from tool_executor import ToolExecutor, parse_timeouts
+from usage_stats import PromptUsageRecorder
+
+if TYPE_CHECKING:
+    from ingestion import ProgressCallback
+
+# Heavy pieces are built on first use, and the modules only they need
+# (langchain_openai, FAISS, pypdf, numpy) are imported there too, so that
+# importing this module stays cheap. They are reachable as module attributes
+# (``langgraph_backend.chatbot``) or through their ``get_*`` functions, and
+# assigning the attribute first (tests, benchmarks) replaces the default.
+_LAZY_LOCK = threading.RLock()
+
+
+def _lazy(name: str, factory: Callable[[], Any]) -> Any:
+    if name not in globals():
+        with _LAZY_LOCK:
+            if name not in globals():
+                globals()[name] = factory()
+    return globals()[name]
+
 load_dotenv()
 
+DB_PATH = os.getenv("CHATBOT_DB_PATH", "chatbot.db")
+INDEX_DIR = os.getenv(
+    "CHATBOT_INDEX_DIR", os.path.join(os.path.dirname(os.path.abspath(DB_PATH)), "indexes")
+)
+EMBEDDING_CACHE_PATH = os.getenv(
+    "CHATBOT_EMBEDDING_CACHE",
+    os.path.join(os.path.dirname(os.path.abspath(DB_PATH)), "embedding_cache.db"),
+)
+
 # -------------------
 # 1. LLM + embeddings
 # -------------------
-llm = ChatOpenAI(model="gpt-4o-mini")
-embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
+usage_recorder = PromptUsageRecorder()
+metrics_callback = MetricsCallback(usage=usage_recorder)
+
+
+def get_llm():
+    def build():
+        from langchain_openai import ChatOpenAI
+
+        return ChatOpenAI(model="gpt-4o-mini", callbacks=[metrics_callback])
+
+    return _lazy("llm", build)
+
+
+def get_embeddings():
+    def build():
+        from langchain_openai import OpenAIEmbeddings
+
+        from embedding_cache import CachedEmbeddings
+
+        return CachedEmbeddings(
+            OpenAIEmbeddings(model="text-embedding-3-small"),
+            EMBEDDING_CACHE_PATH,
+            max_entries=int(os.getenv("CHATBOT_EMBEDDING_CACHE_MAX", "200000")),
+        )
+
+    return _lazy("embeddings", build)
 
 # -------------------
 # 2. PDF retriever store (per thread)
 # -------------------
-_THREAD_RETRIEVERS: Dict[str, Any] = {}
 _THREAD_METADATA: Dict[str, dict] = {}
+_INDEX_STORE = ThreadIndexStore(INDEX_DIR)
+_INDEX_LOCKS: Dict[str, threading.Lock] = {}
+_WRITE_LOCKS: Dict[str, threading.Lock] = {}
+
+
+def _splitter():
+    def build():
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+        return RecursiveCharacterTextSplitter(
+            chunk_size=1000, chunk_overlap=200, separators=["\n\n", "\n", " ", ""]
+        )
+
+    return _lazy("_SPLITTER", build)
+
+
+# How many chunks each retriever contributes, how many fused chunks reach
+# the model, and the reciprocal-rank-fusion constant. A k of 0 disables that side.
+RAG_VECTOR_K = int(os.getenv("CHATBOT_RAG_VECTOR_K", "4"))
+RAG_KEYWORD_K = int(os.getenv("CHATBOT_RAG_KEYWORD_K", "4"))
+RAG_K = int(os.getenv("CHATBOT_RAG_K", "4"))
+RAG_RRF_K = int(os.getenv("CHATBOT_RAG_RRF_K", "60"))
+
+
+# Threads with at least CHATBOT_COMPACT_MIN_CHUNKS chunks get an IVF index
+# with float16 codes, from CHATBOT_SQ8_MIN_CHUNKS 8-bit codes, and from
+# CHATBOT_PQ_MIN_CHUNKS (off by default) product-quantized codes; smaller
+# threads stay flat. 0 disables a tier, and CHATBOT_INDEX_NPROBE
+# (0 = automatic) trades IVF recall for speed.
+COMPACT_MIN_CHUNKS = int(os.getenv("CHATBOT_COMPACT_MIN_CHUNKS", "4000"))
+SQ8_MIN_CHUNKS = int(os.getenv("CHATBOT_SQ8_MIN_CHUNKS", "50000"))
+PQ_MIN_CHUNKS = int(os.getenv("CHATBOT_PQ_MIN_CHUNKS", "0"))
+INDEX_NPROBE = int(os.getenv("CHATBOT_INDEX_NPROBE", "0"))
+
+
+def _as_retriever(vector_store, keyword_index: Optional[BM25Index] = None):
+    return HybridRetriever(
+        vectorstore=vector_store,
+        keyword_index=keyword_index,
+        vector_k=RAG_VECTOR_K,
+        keyword_k=RAG_KEYWORD_K,
+        k=RAG_K,
+        rrf_k=RAG_RRF_K,
+    )
+
+
+def _load_retriever(thread_id: str):
+    loaded = _INDEX_STORE.load_thread(thread_id, get_embeddings())
+    if loaded is None:
+        return None
+    vector_store, keyword_index, metadata = loaded
+    _tag_legacy_chunks(vector_store, metadata)
+    return _as_retriever(vector_store, keyword_index)
+
+
+_RETRIEVERS = RetrieverRegistry(
+    _load_retriever,
+    max_bytes=int(float(os.getenv("CHATBOT_RETRIEVER_BUDGET_MB", "1024")) * 1024 * 1024),
+    # Other processes sharing INDEX_DIR may replace a thread's index.
+    version=_INDEX_STORE.version,
+)
 
 
 def _get_retriever(thread_id: Optional[str]):
-    """Fetch the retriever for a thread if available."""
-    if thread_id and thread_id in _THREAD_RETRIEVERS:
-        return _THREAD_RETRIEVERS[thread_id]
-    return None
+    """
+    Fetch the retriever for a thread. Indexes are loaded from disk on first
+    use and again after the registry evicts them to stay within its budget.
+    """
+    if not thread_id:
+        return None
+    return _RETRIEVERS.get(str(thread_id))
+
+
+def _index_lock(thread_id: str) -> threading.Lock:
+    """Per-thread lock shared by index appends and searches."""
+    return _INDEX_LOCKS.setdefault(str(thread_id), threading.Lock())
+
+
+def _build_kwargs() -> dict:
+    return {
+        "max_batch_tokens": int(os.getenv("CHATBOT_EMBED_BATCH_TOKENS", "8000")),
+        "max_workers": int(os.getenv("CHATBOT_EMBED_WORKERS", "4")),
+    }
+
+
+def _write_lock(thread_id: str) -> threading.Lock:
+    """Serializes uploads and removals for a thread without blocking its searches."""
+    return _WRITE_LOCKS.setdefault(str(thread_id), threading.Lock())
+
 
+def _tag_source(docs: Iterable[Document], filename: str) -> Iterator[Document]:
+    for doc in docs:
+        doc.metadata["source_file"] = filename
+        yield doc
 
-def ingest_pdf(file_bytes: bytes, thread_id: str, filename: Optional[str] = None) -> dict:
+
+def _document_files(metadata: dict) -> Dict[str, dict]:
+    """Per-file summaries; indexes saved before multi-document threads hold one file."""
+    files = metadata.get("files")
+    if files is None and metadata.get("filename"):
+        files = {
+            metadata["filename"]: {
+                "documents": metadata.get("documents", 0),
+                "chunks": metadata.get("chunks", 0),
+            }
+        }
+    return dict(files or {})
+
+
+def _thread_summary(files: Dict[str, dict], last: Optional[str] = None) -> dict:
+    return {
+        "filename": last,
+        "documents": sum(f["documents"] for f in files.values()),
+        "chunks": sum(f["chunks"] for f in files.values()),
+        "files": files,
+    }
+
+
+def _tag_legacy_chunks(vector_store, metadata: dict) -> None:
+    """Chunks indexed before files were tagged belong to the thread's only file."""
+    if "files" in metadata or not metadata.get("filename"):
+        return
+    for doc in getattr(vector_store.docstore, "_dict", {}).values():
+        doc.metadata.setdefault("source_file", metadata["filename"])
+
+
+def _open_for_write(thread_id: str):
+    """
+    A private, writable copy of the thread's saved index with its keyword
+    index and per-file summaries, or ``(None, None, {})`` for a new thread.
+    Searches keep using the published copy until the new one is put.
     """
-    Build a FAISS retriever for the uploaded PDF and store it for the thread.
+    loaded = _INDEX_STORE.load_thread(thread_id, get_embeddings(), mmap=False)
+    if loaded is None:
+        return None, None, {}
+    vector_store, keyword_index, metadata = loaded
+    _tag_legacy_chunks(vector_store, metadata)
+    return vector_store, keyword_index, _document_files(metadata)
+
+
+def _drop_file(vector_store, keyword_index: BM25Index, filename: str) -> int:
+    ids = [
+        doc_id
+        for doc_id, doc in getattr(vector_store.docstore, "_dict", {}).items()
+        if doc.metadata.get("source_file") == filename
+    ]
+    if ids:
+        from compact_index import delete_chunks
+
+        delete_chunks(vector_store, ids)
+        keyword_index.remove(ids)
+    return len(ids)
+
+
+def _publish(thread_id: str, vector_store, keyword_index: BM25Index, files: Dict[str, dict], last: str) -> dict:
+    from compact_index import compacted
+
+    summary = _thread_summary(files, last)
+    with stage("publish"):
+        # A rebuild re-embeds and retrains, so it runs without the index
+        # lock; a streamed upload's store keeps serving searches meanwhile.
+        summary["index"], index = compacted(
+            vector_store, COMPACT_MIN_CHUNKS, SQ8_MIN_CHUNKS, PQ_MIN_CHUNKS, INDEX_NPROBE
+        )
+        with _index_lock(thread_id):
+            vector_store.index = index
+            _INDEX_STORE.save(thread_id, vector_store, summary, keyword_index)
+            _RETRIEVERS.put(thread_id, _as_retriever(vector_store, keyword_index))
+    _THREAD_METADATA.pop(thread_id, None)
+    get_checkpointer().set_has_document(thread_id)
+    return summary
+
+
+def ingest_pdf(
+    file_bytes: bytes,
+    thread_id: str,
+    filename: Optional[str] = None,
+    on_progress: Optional[ProgressCallback] = None,
+    streaming: bool = False,
+    window_pages: int = 8,
+) -> dict:
+    """
+    Add the uploaded PDF to the thread's hybrid FAISS + BM25 index, persist
+    it under INDEX_DIR and publish it for the thread. Only the new file's
+    chunks are embedded; chunks are tagged with ``source_file``, and
+    uploading a file name again replaces that file's chunks.
+    ``on_progress(done, total)`` reports embedded chunks.
+
+    With ``streaming`` the PDF is read from memory a window of pages at a
+    time, the index grows as each window is embedded, and the new file
+    becomes searchable after the first window; ``on_progress`` then reports pages.
 
-    Returns a summary dict that can be surfaced in the UI.
+    Returns a summary dict for this file that can be surfaced in the UI.
     """
     if not file_bytes:
         raise ValueError("No bytes received for ingestion.")
 
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_file:
-        temp_file.write(file_bytes)
-        temp_path = temp_file.name
+    thread_id = str(thread_id)
+    filename = filename or "document.pdf"
+    mode = "streaming" if streaming else "whole"
+    with _write_lock(thread_id), _INDEX_STORE.lock(thread_id), INGEST_SECONDS.time(mode=mode):
+        if streaming:
+            summary = _ingest_pdf_streaming(file_bytes, thread_id, filename, on_progress, window_pages)
+        else:
+            summary = _ingest_pdf_whole(file_bytes, thread_id, filename, on_progress)
+    INGEST_PAGES.inc(summary["documents"])
+    INGEST_CHUNKS.inc(summary["chunks"])
+    return summary
 
-    try:
-        loader = PyPDFLoader(temp_path)
-        docs = loader.load()
 
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000, chunk_overlap=200, separators=["\n\n", "\n", " ", ""]
-        )
-        chunks = splitter.split_documents(docs)
+def _ingest_pdf_whole(
+    file_bytes: bytes,
+    thread_id: str,
+    filename: str,
+    on_progress: Optional[ProgressCallback],
+) -> dict:
+    from langchain_community.document_loaders import PyPDFLoader
 
-        vector_store = FAISS.from_documents(chunks, embeddings)
-        retriever = vector_store.as_retriever(
-            search_type="similarity", search_kwargs={"k": 4}
-        )
+    from ingestion import build_index
 
-        _THREAD_RETRIEVERS[str(thread_id)] = retriever
-        _THREAD_METADATA[str(thread_id)] = {
-            "filename": filename or os.path.basename(temp_path),
-            "documents": len(docs),
-            "chunks": len(chunks),
-        }
+    with stage("load"):
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_file:
+            temp_file.write(file_bytes)
+            temp_path = temp_file.name
 
-        return {
-            "filename": filename or os.path.basename(temp_path),
-            "documents": len(docs),
-            "chunks": len(chunks),
-        }
-    finally:
-        # The FAISS store keeps copies of the text, so the temp file is safe to remove.
         try:
-            os.remove(temp_path)
-        except OSError:
-            pass
+            loader = PyPDFLoader(temp_path)
+            docs = loader.load()
+        finally:
+            # The FAISS store keeps copies of the text, so the temp file is safe to remove.
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+    with stage("split"):
+        chunks = _splitter().split_documents(list(_tag_source(docs, filename)))
+    if not chunks:
+        raise ValueError("No extractable text found in the PDF.")
+
+    vector_store, keyword_index, files = _open_for_write(thread_id)
+    if vector_store is not None:
+        _drop_file(vector_store, keyword_index, filename)
+    keyword_index = keyword_index or BM25Index()
+    start = vector_store.index.ntotal if vector_store is not None else 0
+
+    vector_store = build_index(
+        chunks,
+        get_embeddings(),
+        vector_store=vector_store,
+        on_progress=on_progress,
+        **_build_kwargs(),
+    )
+    with stage("index"):
+        keyword_index.extend(vector_store, start)
+    files[filename] = {
+        "documents": len(docs),
+        "chunks": len(chunks),
+        "sha256": hashlib.sha256(file_bytes).hexdigest(),
+    }
+    _publish(thread_id, vector_store, keyword_index, files, filename)
+    return dict(files[filename], filename=filename)
+
+
+def _ingest_pdf_streaming(
+    file_bytes: bytes,
+    thread_id: str,
+    filename: str,
+    on_progress: Optional[ProgressCallback],
+    window_pages: int,
+) -> dict:
+    from ingestion import iter_pdf_pages, stream_index
+
+    vector_store, keyword_index, files = _open_for_write(thread_id)
+    if vector_store is not None:
+        _drop_file(vector_store, keyword_index, filename)
+    keyword_index = keyword_index or BM25Index()
+    position = [vector_store.index.ntotal if vector_store is not None else 0]
+    file_summary = {"documents": 0, "chunks": 0, "sha256": hashlib.sha256(file_bytes).hexdigest()}
+    files[filename] = file_summary
+    published = {}
+
+    def publish(store, window, chunk_count):
+        file_summary["documents"] += len(window)
+        file_summary["chunks"] += chunk_count
+        with _index_lock(thread_id), stage("index"):
+            position[0] = keyword_index.extend(store, position[0])
+        if "retriever" not in published:
+            published["retriever"] = _as_retriever(store, keyword_index)
+        # Re-put on every window so the registry sees the index grow.
+        _RETRIEVERS.put(thread_id, published["retriever"])
+        _THREAD_METADATA[thread_id] = dict(_thread_summary(files, filename), ingesting=True)
+        if on_progress:
+            on_progress(file_summary["documents"], window[-1].metadata["total_pages"])
+
+    try:
+        vector_store = stream_index(
+            _tag_source(iter_pdf_pages(file_bytes, source=filename), filename),
+            _splitter(),
+            get_embeddings(),
+            window_pages=window_pages,
+            lock=_index_lock(thread_id),
+            on_window=publish,
+            vector_store=vector_store,
+            **_build_kwargs(),
+        )
+        if not file_summary["chunks"]:
+            raise ValueError("No extractable text found in the PDF.")
+        _publish(thread_id, vector_store, keyword_index, files, filename)
+    except BaseException:
+        # Windows published so far exist only in memory. Drop them so
+        # searches and the document list fall back to the saved index and
+        # the upload can be retried.
+        _RETRIEVERS.discard(thread_id)
+        _THREAD_METADATA.pop(thread_id, None)
+        raise
+    return dict(file_summary, filename=filename)
+
+
+def remove_document(thread_id: str, filename: str) -> dict:
+    """
+    Remove one file's chunks from the thread's index. The other files'
+    vectors are kept as they are, so nothing is re-embedded. Returns the
+    thread's updated summary.
+    """
+    thread_id = str(thread_id)
+    with _write_lock(thread_id), _INDEX_STORE.lock(thread_id):
+        vector_store, keyword_index, files = _open_for_write(thread_id)
+        if vector_store is None or filename not in files:
+            raise KeyError(f"{filename!r} is not indexed for this chat.")
+        _drop_file(vector_store, keyword_index, filename)
+        del files[filename]
+        if files:
+            return _publish(thread_id, vector_store, keyword_index, files, next(reversed(files)))
+
+        _INDEX_STORE.delete(thread_id)
+        _RETRIEVERS.discard(thread_id)
+        _THREAD_METADATA.pop(thread_id, None)
+        get_checkpointer().set_has_document(thread_id, False)
+        return _thread_summary({})
 
 
 # -------------------
 # 3. Tools
 # -------------------
-search_tool = DuckDuckGoSearchRun(region="us-en")
+SEARCH_CACHE_PATH = os.getenv(
+    "CHATBOT_SEARCH_CACHE",
+    os.path.join(os.path.dirname(os.path.abspath(DB_PATH)), "search_cache.db"),
+)
+
+search_cache = SearchCache(
+    DuckDuckGoSearchRun(region="us-en"),
+    ttl=float(os.getenv("CHATBOT_SEARCH_TTL", "3600")),
+    max_entries=int(os.getenv("CHATBOT_SEARCH_CACHE_MAX", "1024")),
+    path=SEARCH_CACHE_PATH,
+)
+search_tool = search_cache.as_tool()
 
 
 @tool
@@ -124,26 +512,61 @@ def calculator(first_num: float, second_num: float, operation: str) -> dict:
         return {"error": str(e)}
 
 
+ALPHA_VANTAGE_URL = os.getenv("ALPHA_VANTAGE_URL", "https://www.alphavantage.co/query")
+ALPHA_VANTAGE_API_KEY = os.getenv("ALPHA_VANTAGE_API_KEY", "C9PE94QUEW9VWGFM")
+HTTP_TIMEOUT = float(os.getenv("CHATBOT_HTTP_TIMEOUT", "10"))
+
+# One pooled session for every sync tool call instead of a connection per request.
+_http_session = requests.Session()
+_http_session.mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=20))
+_http_session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=20))
+
+
+def _quote_params(symbol: str) -> dict:
+    return {"function": "GLOBAL_QUOTE", "symbol": symbol, "apikey": ALPHA_VANTAGE_API_KEY}
+
+
+def _fetch_quote(symbol: str) -> dict:
+    r = _http_session.get(ALPHA_VANTAGE_URL, params=_quote_params(symbol), timeout=HTTP_TIMEOUT)
+    return r.json()
+
+
+quote_cache = QuoteCache(_fetch_quote, ttl=float(os.getenv("CHATBOT_QUOTE_TTL", "60")))
+
+
 @tool
 def get_stock_price(symbol: str) -> dict:
     """
     Fetch latest stock price for a given symbol (e.g. 'AAPL', 'TSLA') 
     using Alpha Vantage with API key in the URL.
     """
-    url = (
-        "https://www.alphavantage.co/query"
-        f"?function=GLOBAL_QUOTE&symbol={symbol}&apikey=C9PE94QUEW9VWGFM"
-    )
-    r = requests.get(url)
-    return r.json()
+    quote, cached = quote_cache.get(symbol)
+    return {**quote, "cached": cached}
 
 
 @tool
-def rag_tool(query: str, thread_id: Optional[str] = None) -> dict:
+def get_stock_prices(symbols: list[str]) -> dict:
     """
-    Retrieve relevant information from the uploaded PDF for this chat thread.
-    Always include the thread_id when calling this tool.
+    Fetch latest stock prices for several symbols at once (e.g. ['AAPL', 'TSLA']).
+    Prefer this over repeated get_stock_price calls when comparing tickers.
     """
+    return {
+        "quotes": {
+            symbol: {**quote, "cached": cached}
+            for symbol, (quote, cached) in quote_cache.get_many(symbols).items()
+        }
+    }
+
+
+@tool
+def rag_tool(query: str, config: RunnableConfig, filename: Optional[str] = None) -> dict:
+    """
+    Retrieve relevant information from the PDFs uploaded to this chat thread.
+    Pass `filename` to search only one of the uploaded files.
+    """
+    # The thread comes from the run config, not from the model, so it never
+    # has to appear in the prompt.
+    thread_id = config.get("configurable", {}).get("thread_id")
     retriever = _get_retriever(thread_id)
     if retriever is None:
         return {
@@ -151,7 +574,8 @@ def rag_tool(query: str, thread_id: Optional[str] = None) -> dict:
             "query": query,
         }
 
-    result = retriever.invoke(query)
+    with RETRIEVER_SECONDS.time(), _index_lock(str(thread_id)):
+        result = retriever.invoke(query, source_file=filename)
     context = [doc.page_content for doc in result]
     metadata = [doc.metadata for doc in result]
 
@@ -159,78 +583,410 @@ def rag_tool(query: str, thread_id: Optional[str] = None) -> dict:
         "query": query,
         "context": context,
         "metadata": metadata,
-        "source_file": _THREAD_METADATA.get(str(thread_id), {}).get("filename"),
+        "source_files": sorted({m.get("source_file") for m in metadata if m.get("source_file")}),
     }
 
 
-tools = [search_tool, get_stock_price, calculator, rag_tool]
-llm_with_tools = llm.bind_tools(tools)
+tools = [search_tool, get_stock_price, get_stock_prices, calculator, rag_tool]
+for _tool in tools:
+    # Tool-level callbacks run whatever config ToolNode passes down.
+    _tool.callbacks = [metrics_callback]
+
+# A turn's tool calls run side by side on a shared pool; none may hold the
+# turn longer than its timeout. CHATBOT_TOOL_TIMEOUTS overrides per tool,
+# e.g. "rag_tool=20,duckduckgo_search=8".
+TOOL_TIMEOUTS = {
+    "duckduckgo_search": 15.0,
+    "get_stock_price": 15.0,
+    "get_stock_prices": 20.0,
+    "calculator": 5.0,
+    "rag_tool": 30.0,
+    **parse_timeouts(os.getenv("CHATBOT_TOOL_TIMEOUTS", "")),
+}
+tool_executor = ToolExecutor(
+    max_workers=int(os.getenv("CHATBOT_TOOL_WORKERS", "16")),
+    default_timeout=float(os.getenv("CHATBOT_TOOL_TIMEOUT", "30")),
+    timeouts=TOOL_TIMEOUTS,
+)
+# Tool schemas are bound once and the system prompt is a constant, so every
+# thread shares the same prompt prefix and the provider's prefix cache can hit.
+PROMPT_CACHE_KEY = os.getenv("CHATBOT_PROMPT_CACHE_KEY", "langgraph-chatbot-v1")
+
+
+def get_llm_with_tools():
+    return _lazy("llm_with_tools", lambda: get_llm().bind_tools(tools, prompt_cache_key=PROMPT_CACHE_KEY))
+
 
 # -------------------
 # 4. State
 # -------------------
 class ChatState(TypedDict):
     messages: Annotated[list[BaseMessage], add_messages]
+    # Rolling summary of messages[:summary_upto], which the model no longer sees verbatim.
+    summary: NotRequired[str]
+    summary_upto: NotRequired[int]
 
 
 # -------------------
 # 5. Nodes
 # -------------------
-def chat_node(state: ChatState, config=None):
-    """LLM node that may answer or request a tool call."""
-    thread_id = None
-    if config and isinstance(config, dict):
-        thread_id = config.get("configurable", {}).get("thread_id")
-
-    system_message = SystemMessage(
-        content=(
-            "You are a helpful assistant. For questions about the uploaded PDF, call "
-            "the `rag_tool` and include the thread_id "
-            f"`{thread_id}`. You can also use the web search, stock price, and "
-            "calculator tools when helpful. If no document is available, ask the user "
-            "to upload a PDF."
+SYSTEM_MESSAGE = SystemMessage(
+    content=(
+        "You are a helpful assistant. For questions about the uploaded PDFs, call "
+        "the `rag_tool`. You can also use the web search, stock price, and "
+        "calculator tools when helpful. If no document is available, ask the user "
+        "to upload a PDF."
+    )
+)
+
+
+context_window = ContextWindow(
+    max_tokens=int(os.getenv("CHATBOT_CONTEXT_TOKENS", "12000")),
+    keep_turns=int(os.getenv("CHATBOT_KEEP_TURNS", "6")),
+    tool_output_chars=int(os.getenv("CHATBOT_TOOL_OUTPUT_CHARS", "2000")),
+)
+
+def get_summarizer_llm():
+    # Summaries are bookkeeping, not answers: keep them out of stream_mode="messages".
+    return _lazy("summarizer_llm", lambda: get_llm().with_config(tags=[TAG_NOSTREAM]))
+
+
+def _summarize(previous, messages) -> str:
+    return get_summarizer_llm().invoke(summary_request(previous, messages)).content
+
+
+def get_answer_cache():
+    """Opt-in: reuse answers to near-identical questions about the same documents.
+    None unless CHATBOT_ANSWER_CACHE=1."""
+
+    def build():
+        if os.getenv("CHATBOT_ANSWER_CACHE", "0") != "1":
+            return None
+        from answer_cache import AnswerCache
+
+        return AnswerCache(
+            get_embeddings(),
+            threshold=float(os.getenv("CHATBOT_ANSWER_CACHE_THRESHOLD", "0.95")),
+            ttl=float(os.getenv("CHATBOT_ANSWER_CACHE_TTL", "86400")),
+            max_entries=int(os.getenv("CHATBOT_ANSWER_CACHE_SIZE", "1024")),
         )
+
+    return _lazy("answer_cache", build)
+
+
+def _thread_fingerprint(config) -> Optional[str]:
+    from answer_cache import document_fingerprint
+
+    thread_id = (config or {}).get("configurable", {}).get("thread_id")
+    files = thread_documents(thread_id) if thread_id else {}
+    if not files:
+        return None
+    return document_fingerprint(
+        meta.get("sha256") or f"{name}:{meta.get('chunks')}" for name, meta in files.items()
     )
 
-    messages = [system_message, *state["messages"]]
-    response = llm_with_tools.invoke(messages, config=config)
-    return {"messages": [response]}
 
+def _cache_query(state: ChatState, config) -> Optional[tuple]:
+    """``(fingerprint, question)`` when this turn may be answered from the cache."""
+    if get_answer_cache() is None:
+        return None
+    last = state["messages"][-1] if state["messages"] else None
+    if not isinstance(last, HumanMessage) or not isinstance(last.content, str):
+        return None
+    fingerprint = _thread_fingerprint(config)
+    return (fingerprint, last.content) if fingerprint else None
+
+
+def _cached_reply(answer: str, provenance: dict) -> dict:
+    return {"messages": [AIMessage(content=answer, response_metadata={"answer_cache": provenance})]}
+
+
+def _grounded_question(messages, response) -> Optional[str]:
+    """The turn's question if ``response`` is a final answer built on rag_tool output."""
+    if get_answer_cache() is None or response.tool_calls or not isinstance(response.content, str):
+        return None
+    used_rag = False
+    for message in reversed(messages):
+        if isinstance(message, HumanMessage):
+            if used_rag and isinstance(message.content, str):
+                return message.content
+            return None
+        if isinstance(message, ToolMessage) and message.name == "rag_tool":
+            used_rag = True
+    return None
+
+
+@timed_node("chat_node")
+def chat_node(state: ChatState, config=None):
+    """LLM node that may answer or request a tool call."""
+    query = _cache_query(state, config)
+    if query:
+        hit = get_answer_cache().lookup(*query)
+        if hit:
+            return _cached_reply(*hit)
+
+    history, update = context_window.prepare(
+        state["messages"], state.get("summary"), state.get("summary_upto", 0), _summarize
+    )
+    messages = [SYSTEM_MESSAGE, *history]
+    response = get_llm_with_tools().invoke(messages, config=config)
+
+    question = _grounded_question(state["messages"], response)
+    fingerprint = _thread_fingerprint(config) if question else None
+    if fingerprint:
+        get_answer_cache().store(fingerprint, question, response.content)
+        response.response_metadata["answer_cache"] = {"hit": False, "stored": True}
+    return {"messages": [response], **update}
 
-tool_node = ToolNode(tools)
 
 # -------------------
 # 6. Checkpointer
 # -------------------
-conn = sqlite3.connect(database="chatbot.db", check_same_thread=False)
-checkpointer = SqliteSaver(conn=conn)
+# Keep the newest N checkpoints per thread; 0 disables pruning.
+RETENTION_KEEP = int(os.getenv("CHATBOT_RETENTION_KEEP", "20"))
+retention_worker = None
+SQLITE_SYNCHRONOUS = os.getenv("CHATBOT_SQLITE_SYNCHRONOUS", "NORMAL").upper()
+
+
+def get_checkpointer():
+    """
+    WAL with a pool of read connections and one batching writer, so sessions
+    neither queue on a shared connection nor hit "database is locked".
+    CHATBOT_SQLITE_SYNCHRONOUS=FULL syncs every commit; NORMAL (default) may
+    lose the last commits on power loss. CHATBOT_WRITE_BATCH_MS > 0 holds each
+    commit open that long for more sessions' writes to join it. The retention
+    worker starts with it.
+    """
+
+    def build():
+        global retention_worker
+        # Must come before the WAL switch below, which fixes the vacuum mode.
+        init_incremental_vacuum(DB_PATH)
+        saver = instrument_checkpointer(
+            PooledThreadCatalogSaver(
+                DB_PATH,
+                readers=int(os.getenv("CHATBOT_SQLITE_READERS", "8")),
+                synchronous=SQLITE_SYNCHRONOUS,
+                batch_window=float(os.getenv("CHATBOT_WRITE_BATCH_MS", "0")) / 1000,
+                max_batch=int(os.getenv("CHATBOT_WRITE_BATCH_MAX", "64")),
+            )
+        )
+        if RETENTION_KEEP > 0:
+            retention_worker = RetentionWorker(
+                DB_PATH,
+                keep=RETENTION_KEEP,
+                interval=float(os.getenv("CHATBOT_RETENTION_INTERVAL", "300")),
+            )
+            retention_worker.start()
+        return saver
+
+    return _lazy("checkpointer", build)
+
 
 # -------------------
 # 7. Graph
 # -------------------
-graph = StateGraph(ChatState)
-graph.add_node("chat_node", chat_node)
-graph.add_node("tools", tool_node)
+def build_graph(node, tools_node) -> StateGraph:
+    """Wire the chat/tools loop; shared by the sync and async chatbots."""
+    from langgraph.prebuilt import tools_condition
+
+    graph = StateGraph(ChatState)
+    graph.add_node("chat_node", node)
+    graph.add_node("tools", tools_node)
+
+    graph.add_edge(START, "chat_node")
+    graph.add_conditional_edges("chat_node", tools_condition)
+    graph.add_edge("tools", "chat_node")
+    return graph
+
+
+def get_chatbot():
+    """The compiled sync chatbot, with its checkpointer."""
+
+    def build():
+        return build_graph(chat_node, tool_executor.tool_node(tools)).compile(checkpointer=get_checkpointer())
+
+    return _lazy("chatbot", build)
+
+
+_LAZY_ATTRIBUTES = {
+    "llm": get_llm,
+    "embeddings": get_embeddings,
+    "llm_with_tools": get_llm_with_tools,
+    "summarizer_llm": get_summarizer_llm,
+    "answer_cache": get_answer_cache,
+    "checkpointer": get_checkpointer,
+    "chatbot": get_chatbot,
+}
+
+
+def __getattr__(name: str) -> Any:
+    getter = _LAZY_ATTRIBUTES.get(name)
+    if getter is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getter()
 
-graph.add_edge(START, "chat_node")
-graph.add_conditional_edges("chat_node", tools_condition)
-graph.add_edge("tools", "chat_node")
 
-chatbot = graph.compile(checkpointer=checkpointer)
+# Prometheus text metrics at http://127.0.0.1:<port>/metrics; 0 keeps the endpoint off.
+METRICS_PORT = int(os.getenv("CHATBOT_METRICS_PORT", "0"))
+metrics_server = serve_metrics(METRICS_PORT) if METRICS_PORT > 0 else None
 
 # -------------------
 # 8. Helpers
 # -------------------
 def retrieve_all_threads():
-    all_threads = set()
-    for checkpoint in checkpointer.list(None):
-        all_threads.add(checkpoint.config["configurable"]["thread_id"])
-    return list(all_threads)
+    return get_checkpointer().all_thread_ids()
+
+
+def create_thread(thread_id: Optional[str] = None) -> str:
+    """Register a new (or given) thread id in the catalog and return it."""
+    thread_id = str(thread_id or uuid.uuid4())
+    get_checkpointer().create_thread(thread_id)
+    return thread_id
+
+
+def thread_titles() -> Dict[str, Optional[str]]:
+    """Stored titles for every thread, from the threads table in one query."""
+    return get_checkpointer().titles()
+
+
+def thread_title(thread_id: str) -> Optional[str]:
+    """
+    Stored title for one thread. Threads from before titles were stored get
+    theirs computed from the checkpoint once and saved.
+    """
+    row = get_checkpointer().get_thread(str(thread_id))
+    if row is None:
+        return None
+    if row["title"] is None:
+        state = get_chatbot().get_state(config={"configurable": {"thread_id": str(thread_id)}})
+        title = make_title(state.values.get("messages", []))
+        if title is not None:
+            get_checkpointer().set_title(str(thread_id), title)
+        return title
+    return row["title"]
+
+
+def _is_chat_message(message: BaseMessage) -> bool:
+    """User turns and assistant replies with text; tool traffic is not shown."""
+    if isinstance(message, HumanMessage):
+        return True
+    return isinstance(message, AIMessage) and isinstance(message.content, str) and bool(message.content)
+
+
+# thread id -> (checkpoint id, messages) for recently shown threads, so a
+# page is cut from memory until the thread gets a new checkpoint.
+_CONVERSATIONS: "OrderedDict[str, Tuple[str, List[BaseMessage]]]" = OrderedDict()
+_CONVERSATIONS_MAX = int(os.getenv("CHATBOT_CONVERSATION_CACHE", "64"))
+_CONVERSATIONS_LOCK = threading.Lock()
+
+
+def _conversation(thread_id: str) -> List[BaseMessage]:
+    checkpoint_id = get_checkpointer().latest_checkpoint_id(thread_id)
+    if checkpoint_id is None:
+        return []
+    with _CONVERSATIONS_LOCK:
+        entry = _CONVERSATIONS.get(thread_id)
+        if entry is not None and entry[0] == checkpoint_id:
+            _CONVERSATIONS.move_to_end(thread_id)
+            return entry[1]
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_id": checkpoint_id}}
+    messages = get_chatbot().get_state(config=config).values.get("messages", [])
+    with _CONVERSATIONS_LOCK:
+        _CONVERSATIONS[thread_id] = (checkpoint_id, messages)
+        _CONVERSATIONS.move_to_end(thread_id)
+        while len(_CONVERSATIONS) > _CONVERSATIONS_MAX:
+            _CONVERSATIONS.popitem(last=False)
+    return messages
+
+
+def conversation_page(
+    thread_id: str, limit: int = 20, before: Optional[int] = None
+) -> Tuple[List[BaseMessage], Optional[int]]:
+    """
+    One page of a thread's chat messages, newest page first, each page in
+    chronological order.
+
+    ``before`` is the cursor returned with the previous (newer) page; a
+    cursor is the position of a page's oldest message in the thread, which
+    stays valid as the thread grows because messages are only appended.
+    Returns the messages and the cursor for the page before them, or None
+    when there is nothing earlier.
+
+    The thread's state is loaded once per checkpoint and kept for the
+    next call. Streamlit reruns that add no turn only look up the newest
+    checkpoint id.
+    """
+    messages = _conversation(str(thread_id))
+    end = len(messages) if before is None else min(before, len(messages))
+    page: List[BaseMessage] = []
+    position = end
+    while position > 0 and len(page) < limit:
+        position -= 1
+        if _is_chat_message(messages[position]):
+            page.append(messages[position])
+    page.reverse()
+    more = any(_is_chat_message(m) for m in messages[:position])
+    return page, position if more else None
+
+
+def keep_full_history(thread_id: str, keep: bool = True) -> None:
+    """Exempt a thread from checkpoint pruning."""
+    retention_conn = retention_connect(DB_PATH)
+    try:
+        set_keep_history(retention_conn, str(thread_id), keep)
+    finally:
+        retention_conn.close()
+
+
+def list_threads(limit: int = 50, cursor=None):
+    """Paginated thread rows, most recently updated first; see ThreadCatalogSaver."""
+    return get_checkpointer().list_threads(limit=limit, cursor=cursor)
+
+
+def prompt_cache_stats() -> dict:
+    """Token usage, provider prompt-cache reads and time-to-first-token."""
+    return usage_recorder.stats()
+
+
+def answer_cache_stats() -> dict:
+    cache = get_answer_cache()
+    return cache.stats() if cache is not None else {"enabled": False}
+
+
+def tool_executor_stats() -> dict:
+    return tool_executor.stats()
+
+
+def search_cache_stats() -> dict:
+    return search_cache.stats()
+
+
+def quote_cache_stats() -> dict:
+    return quote_cache.stats()
+
+
+def embedding_cache_stats() -> dict:
+    return get_embeddings().stats()
+
+
+def retriever_registry_stats() -> dict:
+    return _RETRIEVERS.stats()
 
 
 def thread_has_document(thread_id: str) -> bool:
-    return str(thread_id) in _THREAD_RETRIEVERS
+    return str(thread_id) in _RETRIEVERS or _INDEX_STORE.exists(str(thread_id))
 
 
 def thread_document_metadata(thread_id: str) -> dict:
-    return _THREAD_METADATA.get(str(thread_id), {})
+    # Only an ingestion running in this process is tracked in memory; the
+    # saved metadata may have been rewritten by another process.
+    thread_id = str(thread_id)
+    if thread_id in _THREAD_METADATA:
+        return _THREAD_METADATA[thread_id]
+    return _INDEX_STORE.metadata(thread_id)
+
+
+def thread_documents(thread_id: str) -> Dict[str, dict]:
+    """Filename -> {"documents", "chunks"} for every file indexed in the thread."""
+    return _document_files(thread_document_metadata(thread_id))
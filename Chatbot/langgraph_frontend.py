@@ -1,56 +1,56 @@
 import uuid
 import streamlit as st
-from langchain_core.messages import HumanMessage, AIMessage
+from langchain_core.messages import HumanMessage
+from chat_stream import CoalescedStream
 from langgraph_backend import (
-    chatbot,
+    conversation_page,
+    get_chatbot,
     ingest_pdf,
+    remove_document,
     retrieve_all_threads,
-    thread_document_metadata,
+    thread_documents,
+    thread_title,
+    thread_titles,
 )
 
+# Messages shown when a thread opens, and added by each "load earlier".
+PAGE_SIZE = 20
+
+WELCOME = "Hello! How may I assist you today? You can ask me questions, search the web, get stock prices, or upload a PDF to ask questions about it."
+
 # **************************************** Utility Functions *************************
 
 def generate_thread_id():
     return uuid.uuid4()
 
+def open_thread(thread_id):
+    # Only the thread id and window size live in session state; the messages
+    # themselves are read from the checkpointer a page at a time.
+    st.session_state['thread_id'] = thread_id
+    st.session_state['visible_messages'] = PAGE_SIZE
+
 def reset_chat():
     thread_id = generate_thread_id()
-    st.session_state['thread_id'] = thread_id
+    open_thread(thread_id)
     add_thread(thread_id)
-    st.session_state['message_history'] = []
 
 def add_thread(thread_id):
     if thread_id not in st.session_state['chat_threads']:
         st.session_state['chat_threads'].append(thread_id)
 
-def load_conversation(thread_id):
-    state = chatbot.get_state(config={'configurable': {'thread_id': thread_id}})
-    return state.values.get('messages', [])
-
 def get_thread_title(thread_id):
     """Return a nice title to show in sidebar for this thread."""
-    messages = load_conversation(thread_id)
-
-    # default title if no user messages exist yet
-    title = "New chat"
-
-    for msg in messages:
-        if isinstance(msg, HumanMessage):
-            # Use the first user message as title
-            raw = msg.content.strip()
-            if not raw:
-                break
-            # truncate for cleanliness
-            max_len = 40
-            title = raw if len(raw) <= max_len else raw[:max_len] + "..."
-            break
-
-    return title
+    titles = st.session_state['thread_titles']
+    key = str(thread_id)
+    if key not in titles:
+        # default title if no user messages exist yet
+        titles[key] = thread_title(key) or "New chat"
+    return titles[key]
 
 # **************************************** Session Setup ******************************
 
-if 'message_history' not in st.session_state:
-    st.session_state['message_history'] = []
+if 'visible_messages' not in st.session_state:
+    st.session_state['visible_messages'] = PAGE_SIZE
 
 if 'thread_id' not in st.session_state:
     st.session_state['thread_id'] = generate_thread_id()
@@ -58,8 +58,13 @@ if 'thread_id' not in st.session_state:
 if 'chat_threads' not in st.session_state:
     st.session_state['chat_threads'] = retrieve_all_threads()
 
-if 'ingested_docs' not in st.session_state:
-    st.session_state['ingested_docs'] = {}
+if 'thread_titles' not in st.session_state:
+    st.session_state['thread_titles'] = {
+        thread_id: title for thread_id, title in thread_titles().items() if title
+    }
+
+if 'uploader_version' not in st.session_state:
+    st.session_state['uploader_version'] = 0
 
 add_thread(st.session_state['thread_id'])
 
@@ -75,19 +80,7 @@ st.sidebar.header('My Conversations')
 for thread_id in st.session_state['chat_threads'][::-1]:
     label = get_thread_title(thread_id)
     if st.sidebar.button(label=label, key=str(thread_id)):
-        st.session_state['thread_id'] = thread_id
-        messages = load_conversation(thread_id)
-
-        temp_messages = []
-
-        for msg in messages:
-            if isinstance(msg, HumanMessage):
-                role = 'user'
-            else:
-                role = 'assistant'
-            temp_messages.append({'role': role, 'content': msg.content})
-
-        st.session_state['message_history'] = temp_messages
+        open_thread(thread_id)
 
 # **************************************** Main UI ************************************
 
@@ -98,31 +91,39 @@ uploaded_pdf = st.file_uploader(
     label="📄 Upload a PDF document",
     type=["pdf"],
     accept_multiple_files=False,
-    help="Upload a PDF to enable document-based Q&A"
+    help="Upload a PDF to enable document-based Q&A",
+    # A new key clears the uploader, so a removed file is not indexed again.
+    key=f"pdf-uploader-{st.session_state['uploader_version']}",
 )
 
+thread_key = str(st.session_state['thread_id'])
+thread_docs = thread_documents(thread_key)
+
 if uploaded_pdf:
-    thread_key = str(st.session_state['thread_id'])
-    thread_docs = st.session_state['ingested_docs'].setdefault(thread_key, {})
-    
     # Only process if this file hasn't been indexed for this thread yet
     if uploaded_pdf.name not in thread_docs:
         with st.spinner(f"📚 Indexing {uploaded_pdf.name}..."):
-            summary = ingest_pdf(
+            progress = st.progress(0.0)
+            ingest_pdf(
                 uploaded_pdf.getvalue(),
                 thread_id=thread_key,
-                filename=uploaded_pdf.name
+                filename=uploaded_pdf.name,
+                on_progress=lambda done, total: progress.progress(done / total),
+                streaming=True,
             )
-            thread_docs[uploaded_pdf.name] = summary
             st.success(f"✅ {uploaded_pdf.name} indexed successfully!")
             st.rerun()
 
 # Display indexed documents for current thread
-thread_key = str(st.session_state['thread_id'])
-if thread_key in st.session_state['ingested_docs'] and st.session_state['ingested_docs'][thread_key]:
+if thread_docs:
     with st.expander("📚 Indexed Documents"):
-        for filename, meta in st.session_state['ingested_docs'][thread_key].items():
-            st.write(f"**{filename}** - {meta.get('documents', 0)} pages, {meta.get('chunks', 0)} chunks")
+        for filename, meta in thread_docs.items():
+            info, remove = st.columns([5, 1])
+            info.write(f"**{filename}** - {meta.get('documents', 0)} pages, {meta.get('chunks', 0)} chunks")
+            if remove.button("Remove", key=f"remove-{thread_key}-{filename}"):
+                remove_document(thread_key, filename)
+                st.session_state['uploader_version'] += 1
+                st.rerun()
 
 st.divider()
 
@@ -130,25 +131,24 @@ st.divider()
 chat_container = st.container()
 
 with chat_container:
-    # Check if message_history is empty and add welcome message
-    if len(st.session_state['message_history']) == 0:
-        st.session_state['message_history'].append({
-            'role': 'assistant', 
-            'content': "Hello! How may I assist you today? You can ask me questions, search the web, get stock prices, or upload a PDF to ask questions about it."
-        })
-    
-    # Display conversation history
-    for message in st.session_state['message_history']:
-        with st.chat_message(message['role']):
-            st.markdown(message['content'])
+    # Only the newest window of the conversation is fetched and rendered
+    messages, earlier = conversation_page(thread_key, limit=st.session_state['visible_messages'])
+    if earlier is not None and st.button("⬆️ Load earlier messages", key=f"earlier-{thread_key}"):
+        st.session_state['visible_messages'] += PAGE_SIZE
+        st.rerun()
+
+    if not messages:
+        with st.chat_message('assistant'):
+            st.markdown(WELCOME)
+
+    for message in messages:
+        with st.chat_message('user' if isinstance(message, HumanMessage) else 'assistant'):
+            st.markdown(message.content)
 
 # Chat input at the bottom
 user_input = st.chat_input("Type your message here...")
 
 if user_input:
-    # Add user message to history
-    st.session_state['message_history'].append({'role': 'user', 'content': user_input})
-    
     # Display user message
     with chat_container:
         with st.chat_message('user'):
@@ -163,19 +163,16 @@ if user_input:
     
     with chat_container:
         with st.chat_message("assistant"):
-            def ai_only_stream():
-                for message_chunk, metadata in chatbot.stream(
-                    {"messages": [HumanMessage(content=user_input)]},
-                    config=CONFIG,
-                    stream_mode="messages"
-                ):
-                    if isinstance(message_chunk, AIMessage):
-                        yield message_chunk.content
-            
-            ai_message = st.write_stream(ai_only_stream())
-    
-    # Add assistant message to history
-    st.session_state['message_history'].append({'role': 'assistant', 'content': ai_message})
+            # Final-answer text only, redrawn every 50 ms / 200 chars instead of per token
+            st.write_stream(CoalescedStream(get_chatbot().stream(
+                {"messages": [HumanMessage(content=user_input)]},
+                config=CONFIG,
+                stream_mode="messages"
+            )))
+
+    # The first message of a thread sets its title; drop the cached "New chat"
+    if st.session_state['thread_titles'].get(str(st.session_state['thread_id'])) == "New chat":
+        del st.session_state['thread_titles'][str(st.session_state['thread_id'])]
     
     # Rerun to update the display
     st.rerun()
@@ -0,0 +1,378 @@
+"""
+In-process counters and histograms for the chatbot, rendered in the
+Prometheus text exposition format.
+
+Recording is a dict lookup, a bisect and a few additions under a lock, so
+it stays on all the time; ``serve(port)`` exposes ``/metrics`` on a daemon
+thread for a local scraper.
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+if TYPE_CHECKING:
+    from usage_stats import PromptUsageRecorder
+
+# Seconds, from a cached lookup to a slow model turn.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonic total per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in values
+        ]
+
+
+class Histogram(_Metric):
+    """Cumulative buckets, sum and count per label set."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts (last is +Inf), sum, count]
+        self._series: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        slot = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][slot] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: Any) -> int:
+        series = self._series.get(self._key(labels))
+        return series[2] if series else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = sorted((key, ([*counts], total, n)) for key, (counts, total, n) in self._series.items())
+        lines = self.header()
+        for key, (counts, total, n) in series:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, float("inf")), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {n}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> Any:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                # Modules imported twice (e.g. Streamlit reruns) get the same series.
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+REGISTRY = Registry()
+
+NODE_SECONDS = REGISTRY.histogram(
+    "chatbot_node_seconds", "Time spent in a graph node per call.", ["node"]
+)
+LLM_SECONDS = REGISTRY.histogram(
+    "chatbot_llm_seconds", "Chat model call duration.", ["model"]
+)
+LLM_TTFT_SECONDS = REGISTRY.histogram(
+    "chatbot_llm_ttft_seconds",
+    "Time to the first streamed token (the whole reply when not streaming).",
+    ["model"],
+)
+LLM_TOKENS = REGISTRY.counter(
+    "chatbot_llm_tokens_total",
+    "Tokens reported in response usage metadata; kind is input, output or cached_input.",
+    ["model", "kind"],
+)
+STREAM_TTFT_SECONDS = REGISTRY.histogram(
+    "chatbot_stream_ttft_seconds", "Time from sending a turn to its first displayed answer text."
+)
+STREAM_SECONDS = REGISTRY.histogram(
+    "chatbot_stream_seconds", "Time from sending a turn to the end of its displayed stream."
+)
+TOOL_SECONDS = REGISTRY.histogram(
+    "chatbot_tool_seconds", "Tool call duration.", ["tool", "status"]
+)
+TOOL_CALL_SECONDS = REGISTRY.histogram(
+    "chatbot_tool_call_seconds",
+    "Time a turn waited for one tool call, pool queueing included; status is ok, error or timeout.",
+    ["tool", "status"],
+)
+RETRIEVER_SECONDS = REGISTRY.histogram(
+    "chatbot_retriever_seconds", "Hybrid retriever search time, including the index lock wait."
+)
+CHECKPOINT_SECONDS = REGISTRY.histogram(
+    "chatbot_checkpoint_seconds", "Checkpointer operation duration.", ["op"]
+)
+INGEST_SECONDS = REGISTRY.histogram(
+    "chatbot_ingest_seconds",
+    "Whole PDF ingestion time.",
+    ["mode"],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+)
+INGEST_STAGE_SECONDS = REGISTRY.histogram(
+    "chatbot_ingest_stage_seconds",
+    "Time spent per ingestion stage: load, split, embed, index, publish.",
+    ["stage"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+)
+INGEST_PAGES = REGISTRY.counter("chatbot_ingest_pages_total", "PDF pages ingested.")
+INGEST_CHUNKS = REGISTRY.counter("chatbot_ingest_chunks_total", "Chunks embedded and indexed.")
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Record the block's wall time under the ingestion stage ``name``."""
+    with INGEST_STAGE_SECONDS.time(stage=name):
+        yield
+
+
+def timed_node(name: str) -> Callable:
+    """Decorator recording a graph node's duration, sync or async."""
+
+    def decorate(fn: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def awrapper(*args, **kwargs):
+                with NODE_SECONDS.time(node=name):
+                    return await fn(*args, **kwargs)
+
+            return awrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with NODE_SECONDS.time(node=name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+_CHECKPOINT_OPS = ("get_tuple", "put", "put_writes", "aget_tuple", "aput", "aput_writes")
+
+
+def instrument_checkpointer(saver: Any) -> Any:
+    """Time the saver's read and write operations, patching the instance in place."""
+    for op in _CHECKPOINT_OPS:
+        method = getattr(saver, op, None)
+        if method is None:
+            continue
+        label = op[1:] if op.startswith("a") else op
+        if asyncio.iscoroutinefunction(method):
+
+            async def timed(*args, _method=method, _label=label, **kwargs):
+                with CHECKPOINT_SECONDS.time(op=_label):
+                    return await _method(*args, **kwargs)
+
+        else:
+
+            def timed(*args, _method=method, _label=label, **kwargs):
+                with CHECKPOINT_SECONDS.time(op=_label):
+                    return _method(*args, **kwargs)
+
+        setattr(saver, op, functools.wraps(method)(timed))
+    return saver
+
+
+class MetricsCallback(BaseCallbackHandler):
+    """
+    Records chat model latency, time to first token and token usage, and
+    tool latency. Attach it to the model and to each tool (their own
+    ``callbacks``), so it runs whatever config the graph is invoked with.
+    Each finished model call is also passed to ``usage``, if given.
+    """
+
+    run_inline = True
+
+    def __init__(self, usage: Optional["PromptUsageRecorder"] = None):
+        self.usage = usage
+        self._runs: Dict[UUID, list] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs: Any) -> None:
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model") or params.get("model_name") or (serialized or {}).get("name", "")
+        self._runs[run_id] = [time.perf_counter(), None, model]
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._runs.get(run_id)
+        if run is not None and run[1] is None and token:
+            run[1] = time.perf_counter()
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        start, first, model = run
+        end = time.perf_counter()
+        # Without streaming the first token arrives with the whole reply.
+        ttft = (first or end) - start
+        LLM_SECONDS.observe(end - start, model=model)
+        LLM_TTFT_SECONDS.observe(ttft, model=model)
+        usage = {}
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                usage = getattr(message, "usage_metadata", None) or usage
+        if usage:
+            LLM_TOKENS.inc(usage.get("input_tokens", 0), model=model, kind="input")
+            LLM_TOKENS.inc(usage.get("output_tokens", 0), model=model, kind="output")
+            cached = (usage.get("input_token_details") or {}).get("cache_read", 0) or 0
+            LLM_TOKENS.inc(cached, model=model, kind="cached_input")
+        if self.usage is not None:
+            self.usage.record(usage, ttft)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._runs.pop(run_id, None)
+
+    def on_tool_start(self, serialized, input_str, *, run_id: UUID, **kwargs: Any) -> None:
+        self._runs[run_id] = [time.perf_counter(), (serialized or {}).get("name", "unknown")]
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end_tool(run_id, "ok")
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end_tool(run_id, "error")
+
+    def _end_tool(self, run_id: UUID, status: str) -> None:
+        run = self._runs.pop(run_id, None)
+        if run is not None:
+            TOOL_SECONDS.observe(time.perf_counter() - run[0], tool=run[1], status=status)
+
+
+def serve(port: int, host: str = "127.0.0.1", registry: Registry = REGISTRY) -> ThreadingHTTPServer:
+    """Serve ``registry`` at ``http://host:port/metrics`` from a daemon thread."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    httpd = ThreadingHTTPServer((host, port), Handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd
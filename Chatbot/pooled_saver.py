@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Iterator, List, Optional, Tuple
+
+from thread_catalog import ThreadCatalogSaver
+
+SYNCHRONOUS_MODES = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+# (executemany?, sql, params)
+Statement = Tuple[bool, str, Any]
+
+
+class _RecordingCursor:
+    """Stands in for a write cursor: statements are collected, not run, so
+    the writer thread can commit them together with other sessions' writes."""
+
+    def __init__(self):
+        self.statements: List[Statement] = []
+
+    def execute(self, sql: str, params: Any = ()) -> "_RecordingCursor":
+        self.statements.append((False, sql, params))
+        return self
+
+    def executemany(self, sql: str, seq_of_params: Any) -> "_RecordingCursor":
+        self.statements.append((True, sql, list(seq_of_params)))
+        return self
+
+    def close(self) -> None:
+        pass
+
+
+class _WriteJob:
+    __slots__ = ("statements", "done", "error")
+
+    def __init__(self, statements: List[Statement]):
+        self.statements = statements
+        self.done = threading.Event()
+        self.error: Optional[BaseException] = None
+
+
+class BatchWriter:
+    """
+    Owns the write connection. Callers hand over their statements and block
+    until they are committed. Jobs that queued up while the previous commit
+    ran, plus any arriving within ``window`` seconds (up to ``max_batch``),
+    share one transaction, so concurrent sessions pay for one commit
+    instead of one each. A window of 0 never delays a lone writer.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, window: float = 0.0, max_batch: int = 64):
+        self.conn = conn
+        self.window = window
+        self.max_batch = max(1, max_batch)
+        self.batches = 0
+        self.jobs = 0
+        self._queue: "queue.Queue[Optional[_WriteJob]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="checkpoint-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, statements: List[Statement]) -> None:
+        job = _WriteJob(statements)
+        self._queue.put(job)
+        job.done.wait()
+        if job.error is not None:
+            raise job.error
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            batch = [job]
+            stop = self._collect(batch)
+            self._commit(batch)
+            if stop:
+                return
+
+    def _collect(self, batch: List[_WriteJob]) -> bool:
+        """Add jobs already queued or arriving within the window; True on close."""
+        while len(batch) < self.max_batch:
+            try:
+                job = self._queue.get(timeout=self.window) if self.window > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                return False
+            if job is None:
+                return True
+            batch.append(job)
+        return False
+
+    def _apply(self, job: _WriteJob) -> None:
+        for many, sql, params in job.statements:
+            if many:
+                self.conn.executemany(sql, params)
+            else:
+                self.conn.execute(sql, params)
+
+    def _commit(self, batch: List[_WriteJob]) -> None:
+        try:
+            for job in batch:
+                self._apply(job)
+            self.conn.commit()
+        except Exception:
+            # One bad job must not fail the others: retry each on its own.
+            self.conn.rollback()
+            for job in batch:
+                try:
+                    self._apply(job)
+                    self.conn.commit()
+                except Exception as exc:
+                    self.conn.rollback()
+                    job.error = exc
+        self.batches += 1
+        self.jobs += len(batch)
+        for job in batch:
+            job.done.set()
+
+
+class PooledThreadCatalogSaver(ThreadCatalogSaver):
+    """
+    ThreadCatalogSaver for many concurrent sessions on one SQLite file.
+
+    The database runs in WAL mode, so readers never wait for the writer.
+    Reads are served by a pool of read-only connections, one per concurrent
+    reader, instead of queueing on the shared connection's lock. All writes
+    go through a single BatchWriter. ``synchronous`` sets durability: NORMAL
+    (default) can lose the last commits on power loss but never corrupts,
+    and FULL syncs every commit.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        readers: int = 4,
+        synchronous: str = "NORMAL",
+        batch_window: float = 0.0,
+        max_batch: int = 64,
+        busy_timeout: float = 30.0,
+        **kwargs: Any,
+    ):
+        if path == ":memory:" or not path:
+            raise ValueError("PooledThreadCatalogSaver needs a database file shared by its connections.")
+        synchronous = synchronous.upper()
+        if synchronous not in SYNCHRONOUS_MODES:
+            raise ValueError(f"synchronous must be one of {SYNCHRONOUS_MODES}, got {synchronous!r}")
+        self.path = path
+        self.readers = max(1, readers)
+        self.synchronous = synchronous
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._pool: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        writer = self._connect()
+        writer.execute("PRAGMA journal_mode=WAL")
+        super().__init__(writer, **kwargs)
+        self._batcher = BatchWriter(writer, batch_window, max_batch)
+
+    # Code that reaches for ``self.conn`` directly (SqliteSaver.list) gets the
+    # reader its thread has checked out, and the writer otherwise.
+    @property
+    def conn(self) -> sqlite3.Connection:
+        return getattr(self._local, "reader", None) or self._writer
+
+    @conn.setter
+    def conn(self, value: sqlite3.Connection) -> None:
+        self._writer = value
+
+    def _connect(self, read_only: bool = False) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout, check_same_thread=False)
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        if read_only:
+            conn.execute("PRAGMA query_only=ON")
+        return conn
+
+    @contextmanager
+    def _reader(self) -> Iterator[sqlite3.Connection]:
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            # Past the pool size (or a list() left unfinished) gets its own connection.
+            conn = self._connect(read_only=True)
+        try:
+            yield conn
+        finally:
+            if self._pool.qsize() < self.readers:
+                self._pool.put(conn)
+            else:
+                conn.close()
+
+    @contextmanager
+    def _open_cursor(self, transaction: bool = True) -> Iterator[Any]:
+        if not self._catalog_ready:
+            with self.lock:
+                self.setup()
+        if not transaction:
+            with self._reader() as conn:
+                previous = getattr(self._local, "reader", None)
+                self._local.reader = conn
+                cur = conn.cursor()
+                try:
+                    yield cur
+                finally:
+                    cur.close()
+                    self._local.reader = previous
+            return
+        recorder = _RecordingCursor()
+        yield recorder
+        if recorder.statements:
+            self._batcher.submit(recorder.statements)
+
+    def write_stats(self) -> dict:
+        batches, jobs = self._batcher.batches, self._batcher.jobs
+        return {"batches": batches, "writes": jobs, "writes_per_batch": jobs / batches if batches else 0.0}
+
+    def close(self) -> None:
+        """Stop the writer and close every connection."""
+        self._batcher.close()
+        self._writer.close()
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
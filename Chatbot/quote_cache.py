@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+
+def normalize_symbol(symbol: str) -> str:
+    return symbol.strip().upper()
+
+
+def is_cacheable_quote(payload: dict) -> bool:
+    """Only real quotes are cached; Alpha Vantage reports errors and throttling as 200s."""
+    return bool(isinstance(payload, dict) and payload.get("Global Quote"))
+
+
+class QuoteCache:
+    """
+    TTL cache in front of a quote fetcher with single-flight deduplication:
+    concurrent requests for the same symbol share one upstream call.
+    ``aget`` does the same on an event loop when an async ``afetch`` is given.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[str], dict],
+        ttl: float = 60.0,
+        max_workers: int = 8,
+        afetch: Optional[Callable[[str], Awaitable[dict]]] = None,
+    ):
+        self.fetch = fetch
+        self.afetch = afetch
+        self.ttl = ttl
+        self.max_workers = max_workers
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries: Dict[str, Tuple[float, dict]] = {}
+        self._inflight: Dict[str, Future] = {}
+        self._ainflight: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+
+    def lookup(self, symbol: str) -> Optional[dict]:
+        """A fresh cached quote, or None."""
+        entry = self._entries.get(normalize_symbol(symbol))
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+        return None
+
+    def store(self, symbol: str, payload: dict) -> None:
+        if is_cacheable_quote(payload):
+            self._entries[normalize_symbol(symbol)] = (time.monotonic() + self.ttl, payload)
+
+    def get(self, symbol: str) -> Tuple[dict, bool]:
+        """Return ``(quote, served_from_cache)`` for one symbol."""
+        symbol = normalize_symbol(symbol)
+        with self._lock:
+            cached = self.lookup(symbol)
+            if cached is not None:
+                self.hits += 1
+                return cached, True
+            future = self._inflight.get(symbol)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[symbol] = future
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not owner:
+            return future.result(), False
+
+        try:
+            payload = self.fetch(symbol)
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            self.store(symbol, payload)
+            future.set_result(payload)
+            return payload, False
+        finally:
+            with self._lock:
+                self._inflight.pop(symbol, None)
+
+    def get_many(self, symbols: Iterable[str]) -> Dict[str, Tuple[dict, bool]]:
+        """Fetch several symbols concurrently; duplicates are requested once."""
+        unique = list(dict.fromkeys(normalize_symbol(s) for s in symbols if s.strip()))
+        if len(unique) <= 1:
+            return {symbol: self.get(symbol) for symbol in unique}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(unique))) as pool:
+            return dict(zip(unique, pool.map(self.get, unique)))
+
+    async def _afetch_and_store(self, symbol: str) -> dict:
+        try:
+            payload = await self.afetch(symbol)
+            self.store(symbol, payload)
+            return payload
+        finally:
+            self._ainflight.pop(symbol, None)
+
+    async def aget(self, symbol: str) -> Tuple[dict, bool]:
+        if self.afetch is None:
+            raise RuntimeError("QuoteCache was created without an async fetcher")
+        symbol = normalize_symbol(symbol)
+        cached = self.lookup(symbol)
+        if cached is not None:
+            self.hits += 1
+            return cached, True
+        task = self._ainflight.get(symbol)
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(self._afetch_and_store(symbol))
+            self._ainflight[symbol] = task
+        else:
+            self.coalesced += 1
+        # Shielded so one cancelled caller does not cancel the shared fetch.
+        return await asyncio.shield(task), False
+
+    async def aget_many(self, symbols: Iterable[str]) -> Dict[str, Tuple[dict, bool]]:
+        unique = list(dict.fromkeys(normalize_symbol(s) for s in symbols if s.strip()))
+        results = await asyncio.gather(*(self.aget(symbol) for symbol in unique))
+        return dict(zip(unique, results))
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses + self.coalesced
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": (self.hits + self.coalesced) / total if total else 0.0,
+            "entries": len(self._entries),
+        }
@@ -0,0 +1,236 @@
+"""
+Checkpoint retention for chatbot.db.
+
+Every graph step writes a full checkpoint, so the database grows without
+bound. This keeps the latest N checkpoints per thread (threads marked with
+``keep_history`` are left alone), removes ``writes`` rows whose checkpoint
+is gone, and gives the freed pages back with incremental vacuum.
+
+A new database is created in incremental auto_vacuum mode at startup. An
+older one needs a one-time full VACUUM to switch, which locks and rewrites
+the whole file, so run ``vacuum`` once while the app is stopped; until
+then the worker only prunes.
+
+    python retention.py report --db chatbot.db --top 20
+    python retention.py prune --db chatbot.db --keep 5
+    python retention.py keep-history THREAD_ID
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+import threading
+from typing import List, Optional
+
+_EXEMPT_SQL = "CREATE TABLE IF NOT EXISTS retention_exempt (thread_id TEXT PRIMARY KEY)"
+
+_PRUNE_SQL = """
+DELETE FROM checkpoints WHERE rowid IN (
+    SELECT rowid FROM (
+        SELECT rowid, ROW_NUMBER() OVER (
+            PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC
+        ) AS newest_first
+        FROM checkpoints
+        WHERE thread_id NOT IN (SELECT thread_id FROM retention_exempt)
+    ) WHERE newest_first > ?
+)
+"""
+
+_ORPHAN_WRITES_SQL = """
+DELETE FROM writes WHERE NOT EXISTS (
+    SELECT 1 FROM checkpoints c
+    WHERE c.thread_id = writes.thread_id
+      AND c.checkpoint_ns = writes.checkpoint_ns
+      AND c.checkpoint_id = writes.checkpoint_id
+)
+"""
+
+
+def connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute(_EXEMPT_SQL)
+    conn.commit()
+    return conn
+
+
+def set_keep_history(conn: sqlite3.Connection, thread_id: str, keep: bool = True) -> None:
+    """Exempt a thread from pruning (or stop exempting it)."""
+    if keep:
+        conn.execute("INSERT OR IGNORE INTO retention_exempt (thread_id) VALUES (?)", (str(thread_id),))
+    else:
+        conn.execute("DELETE FROM retention_exempt WHERE thread_id = ?", (str(thread_id),))
+    conn.commit()
+
+
+def prune(conn: sqlite3.Connection, keep: int) -> dict:
+    """Drop all but the newest ``keep`` checkpoints per thread and namespace."""
+    if keep < 1:
+        raise ValueError("keep must be at least 1; the latest checkpoint is the thread state.")
+    checkpoints = conn.execute(_PRUNE_SQL, (keep,)).rowcount
+    writes = conn.execute(_ORPHAN_WRITES_SQL).rowcount
+    conn.commit()
+    return {"checkpoints_deleted": checkpoints, "writes_deleted": writes}
+
+
+def enable_incremental_vacuum(conn: sqlite3.Connection) -> bool:
+    """
+    Switch the file to auto_vacuum=INCREMENTAL. An existing database only
+    changes mode after one full VACUUM, which is run here once. Returns
+    True if the mode was changed.
+    """
+    (mode,) = conn.execute("PRAGMA auto_vacuum").fetchone()
+    if mode == 2:
+        return False
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("VACUUM")
+    return True
+
+
+def init_incremental_vacuum(path: str) -> bool:
+    """
+    Startup step, run before anything else opens ``path``. A database with
+    no tables yet is switched to auto_vacuum=INCREMENTAL, where the VACUUM
+    that records the mode costs nothing. Returns whether the file is in
+    that mode; existing databases are left as they are.
+    """
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        (tables,) = conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        if not tables:
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+        (mode,) = conn.execute("PRAGMA auto_vacuum").fetchone()
+    finally:
+        conn.close()
+    return mode == 2
+
+
+def incremental_vacuum(conn: sqlite3.Connection, pages: int = 2000) -> int:
+    """Release up to ``pages`` free pages to the OS; returns pages still free."""
+    # executescript steps the pragma to completion; a plain execute frees one page.
+    conn.executescript(f"PRAGMA incremental_vacuum({int(pages)});")
+    (free,) = conn.execute("PRAGMA freelist_count").fetchone()
+    return free
+
+
+def thread_sizes(conn: sqlite3.Connection, top: Optional[int] = None) -> List[dict]:
+    """Stored bytes and row counts per thread, largest first."""
+    query = """
+        SELECT thread_id, SUM(checkpoints), SUM(checkpoint_bytes), SUM(writes), SUM(write_bytes)
+        FROM (
+            SELECT thread_id, COUNT(*) AS checkpoints,
+                   SUM(LENGTH(checkpoint) + LENGTH(metadata)) AS checkpoint_bytes,
+                   0 AS writes, 0 AS write_bytes
+            FROM checkpoints GROUP BY thread_id
+            UNION ALL
+            SELECT thread_id, 0, 0, COUNT(*), SUM(LENGTH(value))
+            FROM writes GROUP BY thread_id
+        )
+        GROUP BY thread_id
+        ORDER BY SUM(checkpoint_bytes) + SUM(write_bytes) DESC
+    """
+    params: tuple = ()
+    if top:
+        query += " LIMIT ?"
+        params = (top,)
+    return [
+        {
+            "thread_id": thread_id,
+            "checkpoints": checkpoints,
+            "checkpoint_bytes": checkpoint_bytes or 0,
+            "writes": writes,
+            "write_bytes": write_bytes or 0,
+        }
+        for thread_id, checkpoints, checkpoint_bytes, writes, write_bytes in conn.execute(
+            query, params
+        )
+    ]
+
+
+class RetentionWorker(threading.Thread):
+    """
+    Daemon thread that prunes and incrementally vacuums on an interval. It
+    never changes the vacuum mode; on a database not in incremental mode
+    the vacuum step frees nothing.
+    """
+
+    def __init__(self, path: str, keep: int, interval: float = 300.0, vacuum_pages: int = 2000):
+        super().__init__(name="checkpoint-retention", daemon=True)
+        self.path = path
+        self.keep = keep
+        self.interval = interval
+        self.vacuum_pages = vacuum_pages
+        self.last_result: dict = {}
+        self._stop_event = threading.Event()
+
+    def run_once(self) -> dict:
+        conn = connect(self.path)
+        try:
+            result = prune(conn, self.keep)
+            result["free_pages"] = incremental_vacuum(conn, self.vacuum_pages)
+        finally:
+            conn.close()
+        self.last_result = result
+        return result
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.run_once()
+            except sqlite3.Error:
+                # Busy or locked: try again next interval.
+                continue
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+
+def _main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Checkpoint retention for chatbot.db")
+    parser.add_argument("--db", default=os.getenv("CHATBOT_DB_PATH", "chatbot.db"))
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    report = commands.add_parser("report", help="database size per thread")
+    report.add_argument("--top", type=int, default=20)
+
+    prune_cmd = commands.add_parser("prune", help="keep the newest N checkpoints per thread")
+    prune_cmd.add_argument("--keep", type=int, default=5)
+    prune_cmd.add_argument("--vacuum", action="store_true", help="also release freed pages")
+
+    commands.add_parser(
+        "vacuum", help="enable incremental vacuum (a full VACUUM; stop the app first) and release free pages"
+    )
+
+    keep_cmd = commands.add_parser("keep-history", help="exempt a thread from pruning")
+    keep_cmd.add_argument("thread_id")
+    keep_cmd.add_argument("--off", action="store_true", help="remove the exemption")
+
+    args = parser.parse_args(argv)
+    conn = connect(args.db)
+
+    if args.command == "report":
+        print(f"{args.db}: {os.path.getsize(args.db) / 1e6:.2f} MB")
+        print(f"{'thread_id':<38} {'ckpts':>6} {'ckpt KB':>9} {'writes':>7} {'writes KB':>10}")
+        for row in thread_sizes(conn, args.top):
+            print(
+                f"{row['thread_id']:<38} {row['checkpoints']:>6} "
+                f"{row['checkpoint_bytes'] / 1024:>9.1f} {row['writes']:>7} "
+                f"{row['write_bytes'] / 1024:>10.1f}"
+            )
+    elif args.command == "prune":
+        print(prune(conn, args.keep))
+        if args.vacuum:
+            enable_incremental_vacuum(conn)
+            print({"free_pages": incremental_vacuum(conn, 1_000_000)})
+    elif args.command == "vacuum":
+        enable_incremental_vacuum(conn)
+        print({"free_pages": incremental_vacuum(conn, 1_000_000)})
+    elif args.command == "keep-history":
+        set_keep_history(conn, args.thread_id, keep=not args.off)
+
+    conn.close()
+
+
+if __name__ == "__main__":
+    _main()
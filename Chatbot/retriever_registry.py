@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+# ``put`` default: look the version up at put time.
+_SAVED_NOW = object()
+
+
+def _resident_code_bytes(index: Any) -> int:
+    """
+    Bytes of vector codes the index holds in memory. Codes mapped from the
+    index file (``ThreadIndexStore.load`` with mmap) live in the page cache,
+    which the kernel can drop under pressure, so they are not counted.
+    """
+    import faiss
+
+    code_size = getattr(index, "code_size", 0) or index.d * 4
+    try:
+        ivf = faiss.extract_index_ivf(index)
+    except RuntimeError:
+        codes = getattr(index, "codes", None)
+        return 0 if getattr(codes, "is_owned", True) is False else index.ntotal * code_size
+    invlists = faiss.downcast_InvertedLists(ivf.invlists)
+    lists = getattr(invlists, "codes", None)
+    if lists is None:
+        return index.ntotal * code_size
+    return sum(
+        invlists.list_size(list_no) * invlists.code_size
+        for list_no in range(ivf.nlist)
+        if getattr(lists.at(list_no), "is_owned", True)
+    )
+
+
+def estimate_nbytes(vector_store: Any) -> int:
+    """Approximate resident size of a FAISS store: in-memory vector codes plus chunk text."""
+    texts = sum(
+        len(doc.page_content) for doc in getattr(vector_store.docstore, "_dict", {}).values()
+    )
+    return _resident_code_bytes(vector_store.index) + texts
+
+
+class RetrieverRegistry:
+    """
+    Thread id -> retriever map with a byte budget.
+
+    Least-recently-used threads are dropped once the tracked footprint goes
+    over ``max_bytes``; a later ``get`` for an evicted thread calls ``loader``
+    again, which reloads its index from disk.
+
+    With ``version`` (thread id -> a token that changes whenever the saved
+    index does), an entry whose index was replaced since it was put, for
+    instance by another worker process, is dropped and reloaded.
+
+    Concurrent ``get`` calls for the same missing thread share one load;
+    loads of different threads run side by side.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[str], Optional[Any]],
+        max_bytes: int,
+        version: Optional[Callable[[str], Any]] = None,
+    ):
+        self.loader = loader
+        self.max_bytes = max_bytes
+        self.version = version
+        self.total_bytes = 0
+        self.hits = 0
+        self.loads = 0
+        self.reloads = 0
+        self.evictions = 0
+        self.stale = 0
+        self._entries: "OrderedDict[str, Tuple[Any, int, Any]]" = OrderedDict()
+        self._evicted: Set[str] = set()
+        self._lock = threading.Lock()
+        # thread id -> [lock, callers using it]; removed when the last one leaves.
+        self._load_locks: Dict[str, List[Any]] = {}
+
+    def __contains__(self, thread_id: str) -> bool:
+        return self._current(str(thread_id)) is not None
+
+    def _current(self, thread_id: str) -> Optional[tuple]:
+        """The thread's entry, dropping it first if its saved index changed."""
+        entry = self._entries.get(thread_id)
+        if entry is None or self.version is None:
+            return entry
+        if self.version(thread_id) == entry[2]:
+            return entry
+        with self._lock:
+            if self._entries.get(thread_id) is entry:
+                del self._entries[thread_id]
+                self.total_bytes -= entry[1]
+                self.stale += 1
+        return None
+
+    def _lookup(self, thread_id: str) -> Optional[Any]:
+        if self._current(thread_id) is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(thread_id)
+            if entry is None:
+                return None
+            self._entries.move_to_end(thread_id)
+            self.hits += 1
+            return entry[0]
+
+    @contextmanager
+    def _loading(self, thread_id: str) -> Iterator[None]:
+        """Held while loading ``thread_id``; other threads' loads do not wait."""
+        with self._lock:
+            slot = self._load_locks.setdefault(thread_id, [threading.Lock(), 0])
+            slot[1] += 1
+        try:
+            with slot[0]:
+                yield
+        finally:
+            with self._lock:
+                slot[1] -= 1
+                if not slot[1]:
+                    del self._load_locks[thread_id]
+
+    def get(self, thread_id: str) -> Optional[Any]:
+        thread_id = str(thread_id)
+        retriever = self._lookup(thread_id)
+        if retriever is not None:
+            return retriever
+
+        with self._loading(thread_id):
+            retriever = self._lookup(thread_id)
+            if retriever is not None:
+                return retriever
+            # Read before loading: a save landing mid-load then shows as stale.
+            version = self.version(thread_id) if self.version is not None else None
+            retriever = self.loader(thread_id)
+            if retriever is None:
+                return None
+            self.loads += 1
+            if thread_id in self._evicted:
+                self.reloads += 1
+            self.put(thread_id, retriever, version=version)
+            return retriever
+
+    def put(
+        self, thread_id: str, retriever: Any, nbytes: Optional[int] = None, version: Any = _SAVED_NOW
+    ) -> None:
+        """
+        Insert or refresh a thread's retriever, then evict down to the budget.
+        By default it is taken to match the index saved right now.
+        """
+        thread_id = str(thread_id)
+        if version is _SAVED_NOW:
+            version = self.version(thread_id) if self.version is not None else None
+        if nbytes is None:
+            nbytes = estimate_nbytes(retriever.vectorstore)
+            keyword_index = getattr(retriever, "keyword_index", None)
+            if keyword_index is not None:
+                nbytes += keyword_index.nbytes()
+        with self._lock:
+            previous = self._entries.pop(thread_id, None)
+            if previous is not None:
+                self.total_bytes -= previous[1]
+            self._entries[thread_id] = (retriever, nbytes, version)
+            self.total_bytes += nbytes
+            self._evicted.discard(thread_id)
+            # The entry just inserted is kept even if it alone exceeds the budget.
+            while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+                victim, (_, size, _) = self._entries.popitem(last=False)
+                self.total_bytes -= size
+                self._evicted.add(victim)
+                self.evictions += 1
+
+    def discard(self, thread_id: str) -> None:
+        with self._lock:
+            entry = self._entries.pop(str(thread_id), None)
+            if entry is not None:
+                self.total_bytes -= entry[1]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+                "budget_bytes": self.max_bytes,
+                "hits": self.hits,
+                "loads": self.loads,
+                "reloads": self.reloads,
+                "evictions": self.evictions,
+                "stale": self.stale,
+            }
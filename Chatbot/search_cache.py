@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import asyncio
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from langchain_core.tools import BaseTool, StructuredTool
+
+from sqlite_cache import RowCap
+
+_WHITESPACE = re.compile(r"\s+")
+# What DuckDuckGoSearchRun returns for an empty result page, and what a tool
+# with handle_tool_error set returns in place of raising.
+_NOT_AN_ANSWER = re.compile(r"no good duckduckgo search result|tool execution error|error:", re.I)
+
+
+def normalize_query(query: str) -> str:
+    return _WHITESPACE.sub(" ", query).strip().strip("?!.").lower()
+
+
+def is_cacheable(result: Any) -> bool:
+    """Only real results are kept; empty pages and errors are retried next time."""
+    return isinstance(result, str) and bool(result.strip()) and not _NOT_AN_ANSWER.match(result.lstrip())
+
+
+class SearchCache:
+    """
+    Bounded LRU + TTL cache in front of a search tool, optionally backed by a
+    sqlite file so results survive restarts and are shared between workers.
+    Concurrent identical queries share one upstream search.
+
+    The file holds at most ``max_entries`` rows too, dropping those closest
+    to expiry first. Results ``cacheable`` rejects (by default empty ones and
+    error messages) are returned but not kept.
+    """
+
+    def __init__(
+        self,
+        search: BaseTool,
+        ttl: float = 3600.0,
+        max_entries: int = 1024,
+        path: Optional[str] = None,
+        cacheable: Callable[[Any], bool] = is_cacheable,
+        busy_timeout: float = 30.0,
+    ):
+        self.search = search
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.cacheable = cacheable
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.latency_saved = 0.0
+        self._miss_seconds = 0.0
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        # The file has its own lock so lookups in memory never wait on disk.
+        self._db_lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._cap: Optional[RowCap] = None
+        if path:
+            self._conn = sqlite3.connect(path, timeout=busy_timeout, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS search_cache "
+                "(key TEXT PRIMARY KEY, result TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS search_cache_expires_at ON search_cache (expires_at)"
+            )
+            self._conn.commit()
+            # Rows closest to expiry, expired ones first, are evicted first.
+            self._cap = RowCap(self._conn, "search_cache", "expires_at", max_entries)
+
+    def _mean_miss_seconds(self) -> float:
+        return self._miss_seconds / self.misses if self.misses else 0.0
+
+    def _lookup(self, key: str) -> Optional[str]:
+        """Fresh result from memory. Caller holds the lock."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.time():
+                self._entries.move_to_end(key)
+                return entry[1]
+            del self._entries[key]
+        return None
+
+    def _load(self, key: str) -> Optional[Tuple[float, str]]:
+        """Fresh ``(expires_at, result)`` from the file, if there is one."""
+        if self._conn is None:
+            return None
+        with self._db_lock:
+            return self._conn.execute(
+                "SELECT expires_at, result FROM search_cache WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+
+    def _remember(self, key: str, result: str, expires_at: float) -> None:
+        self._entries[key] = (expires_at, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _store(self, key: str, result: str) -> None:
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._remember(key, result, expires_at)
+        if self._conn is None:
+            return
+        with self._db_lock:
+            # A replaced (expired) row is counted as new; the recount fixes that.
+            self._conn.execute(
+                "INSERT OR REPLACE INTO search_cache (key, result, expires_at) VALUES (?, ?, ?)",
+                (key, result, expires_at),
+            )
+            self._cap.added(1)
+            self._conn.commit()
+
+    def run(self, query: str) -> str:
+        key = normalize_query(query)
+        with self._lock:
+            cached = self._lookup(key)
+            if cached is not None:
+                self.hits += 1
+                self.latency_saved += self._mean_miss_seconds()
+                return cached
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+            else:
+                self.coalesced += 1
+
+        if not owner:
+            result = future.result()
+            with self._lock:
+                self.latency_saved += self._mean_miss_seconds()
+            return result
+
+        start = time.perf_counter()
+        try:
+            stored = self._load(key)
+            if stored is not None:
+                expires_at, result = stored
+                with self._lock:
+                    self._remember(key, result, expires_at)
+                    self.hits += 1
+                    self.latency_saved += self._mean_miss_seconds()
+                future.set_result(result)
+                return result
+            result = self.search.invoke(query)
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            with self._lock:
+                self.misses += 1
+                self._miss_seconds += time.perf_counter() - start
+            if self.cacheable(result):
+                self._store(key, result)
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    async def arun(self, query: str) -> str:
+        return await asyncio.to_thread(self.run, query)
+
+    def as_tool(self) -> BaseTool:
+        """A drop-in tool with the wrapped tool's name, description and schema."""
+        return StructuredTool.from_function(
+            func=self.run,
+            coroutine=self.arun,
+            name=self.search.name,
+            description=self.search.description,
+            args_schema=self.search.args_schema,
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses + self.coalesced
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": (self.hits + self.coalesced) / total if total else 0.0,
+            "latency_saved_seconds": round(self.latency_saved, 3),
+            "entries": len(self._entries),
+        }
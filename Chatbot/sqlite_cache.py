@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import sqlite3
+
+# Evicting down to this share of max_entries leaves room for many inserts
+# before the next eviction has to count the table again.
+_EVICT_TO = 0.9
+
+
+class RowCap:
+    """
+    Keeps a sqlite cache table (with a ``key`` column) at no more than
+    ``max_entries`` rows without counting it on every insert.
+
+    The row count is read once and then kept up to date by ``added``. Only
+    when it passes the cap is the table counted again, which also picks up
+    other processes' rows, and the first rows by ``evict_order`` are
+    deleted until 90% of the cap is left.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, table: str, evict_order: str, max_entries: int):
+        self.conn = conn
+        self.table = table
+        self.evict_order = evict_order
+        self.max_entries = max_entries
+        (self.count,) = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()
+
+    def added(self, rows: int) -> None:
+        """Count ``rows`` just inserted, evicting if needed. Run it inside the
+        inserting transaction, with whatever lock guards the connection."""
+        self.count += max(rows, 0)
+        if self.count <= self.max_entries:
+            return
+        (count,) = self.conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+        keep = int(self.max_entries * _EVICT_TO)
+        if count > keep:
+            self.conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN "
+                f"(SELECT key FROM {self.table} ORDER BY {self.evict_order} LIMIT ?)",
+                (count - keep,),
+            )
+        self.count = min(count, keep)
@@ -0,0 +1,12 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The backend reads its paths at import: keep the tests' database, indexes
+# and caches out of the working tree.
+os.environ["CHATBOT_DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="chatbot-tests-"), "chatbot.db")
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ["CHATBOT_RETENTION_KEEP"] = "0"
+os.environ["CHATBOT_METRICS_PORT"] = "0"
@@ -0,0 +1,58 @@
+import asyncio
+import json
+
+import api_server
+from benchmarks.fakes import synthetic_pdf
+
+
+def call(method, path, body=b"", query=b""):
+    """Run one request through the ASGI app; returns (status, JSON body)."""
+
+    async def run():
+        sent = []
+        chunks = [{"type": "http.request", "body": body, "more_body": False}]
+
+        async def receive():
+            if chunks:
+                return chunks.pop()
+            await asyncio.sleep(3600)
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "method": method, "path": path, "query_string": query}
+        await api_server.app(scope, receive, send)
+        payload = b"".join(m.get("body", b"") for m in sent if m["type"] == "http.response.body")
+        return sent[0]["status"], json.loads(payload)
+
+    return asyncio.run(run())
+
+
+def new_thread():
+    status, payload = call("POST", "/threads")
+    assert status == 201
+    return payload["thread_id"]
+
+
+def test_truncated_pdf_is_rejected_not_a_server_error():
+    thread_id = new_thread()
+    data = synthetic_pdf(3)
+    status, payload = call(
+        "POST", f"/threads/{thread_id}/documents", data[: len(data) // 2], b"filename=cut.pdf"
+    )
+    assert status == 422
+    assert "Could not read the PDF" in payload["error"]
+    status, payload = call("GET", f"/threads/{thread_id}")
+    assert status == 200
+    assert not payload["documents"]
+
+
+def test_non_pdf_body_is_rejected():
+    thread_id = new_thread()
+    status, _ = call("POST", f"/threads/{thread_id}/documents", b"hello", b"filename=a.pdf")
+    assert status == 415
+
+
+def test_unknown_thread_is_404():
+    status, _ = call("POST", "/threads/no-such-thread/documents", b"%PDF-1.4", b"filename=a.pdf")
+    assert status == 404
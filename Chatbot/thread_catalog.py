@@ -0,0 +1,320 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.base import get_checkpoint_metadata
+from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+TITLE_MAX_LEN = 40
+
+
+def make_title(messages: Iterable) -> Optional[str]:
+    """Sidebar title from the first user message, or None if there is none yet."""
+    for msg in messages:
+        if isinstance(msg, HumanMessage):
+            raw = msg.content.strip() if isinstance(msg.content, str) else ""
+            if not raw:
+                return None
+            return raw if len(raw) <= TITLE_MAX_LEN else raw[:TITLE_MAX_LEN] + "..."
+    return None
+
+
+class ThreadCatalogSaver(SqliteSaver):
+    """
+    SqliteSaver that also maintains a ``threads`` table, one row per thread,
+    updated in the same transaction as every root checkpoint write. Listing
+    threads is then a single indexed query instead of a scan that
+    deserializes every checkpoint.
+
+    A thread's title is derived from its first user message the first time
+    that message is checkpointed, and never recomputed after that.
+    """
+
+    def __init__(self, conn, **kwargs):
+        super().__init__(conn, **kwargs)
+        self._titled = set()
+        self._step = threading.local()
+        # SqliteSaver.setup sets is_setup before the threads table exists, so
+        # the catalog has its own flag, set once everything is in place.
+        self._catalog_ready = False
+
+    @contextmanager
+    def cursor(self, transaction: bool = True) -> Iterator[Any]:
+        # Inside put(), the checkpoint insert joins the write cursor that
+        # put() already holds, so checkpoint and catalog row commit together.
+        joined = getattr(self._step, "cursor", None)
+        if transaction and joined is not None:
+            yield joined
+            return
+        with self._open_cursor(transaction) as cur:
+            yield cur
+
+    def _open_cursor(self, transaction: bool):
+        return super().cursor(transaction)
+
+    def setup(self) -> None:
+        """Called with ``self.lock`` held."""
+        if self._catalog_ready:
+            return
+        super().setup()
+        self.conn.executescript(CREATE_THREADS_SQL)
+        # Databases written before this table existed: register their threads
+        # once, straight from the checkpoint keys, without deserializing anything.
+        (empty,) = self.conn.execute(THREADS_EMPTY_SQL).fetchone()
+        if empty:
+            now = time.time()
+            self.conn.execute(BACKFILL_THREADS_SQL, (now, now))
+        self.conn.commit()
+        self._catalog_ready = True
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        with self.cursor() as cur:
+            self._step.cursor = cur
+            try:
+                saved = super().put(config, checkpoint, metadata, new_versions)
+            finally:
+                self._step.cursor = None
+            params = catalog_params(config, checkpoint, self._titled)
+            if params is not None:
+                cur.execute(TOUCH_THREAD_SQL, params)
+        return saved
+
+    def set_title(self, thread_id: str, title: str) -> None:
+        now = time.time()
+        with self.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO threads (thread_id, title, created_at, updated_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (thread_id) DO UPDATE SET title = excluded.title
+                """,
+                (str(thread_id), title, now, now),
+            )
+        self._titled.add(str(thread_id))
+
+    def titles(self) -> Dict[str, Optional[str]]:
+        """Title of every thread (None where none is known yet) in one query."""
+        with self.cursor(transaction=False) as cur:
+            cur.execute("SELECT thread_id, title FROM threads")
+            return dict(cur.fetchall())
+
+    def delete_thread(self, thread_id: str) -> None:
+        super().delete_thread(thread_id)
+        with self.cursor() as cur:
+            cur.execute("DELETE FROM threads WHERE thread_id = ?", (str(thread_id),))
+
+    def create_thread(self, thread_id: str) -> None:
+        """Register a thread before its first checkpoint, so it is listed."""
+        now = time.time()
+        with self.cursor() as cur:
+            cur.execute(
+                "INSERT OR IGNORE INTO threads (thread_id, created_at, updated_at) VALUES (?, ?, ?)",
+                (str(thread_id), now, now),
+            )
+
+    def set_has_document(self, thread_id: str, has_document: bool = True) -> None:
+        now = time.time()
+        with self.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO threads (thread_id, created_at, updated_at, has_document)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (thread_id) DO UPDATE SET has_document = excluded.has_document
+                """,
+                (str(thread_id), now, now, int(has_document)),
+            )
+
+    def get_thread(self, thread_id: str) -> Optional[dict]:
+        with self.cursor(transaction=False) as cur:
+            cur.execute(f"SELECT {_COLUMNS} FROM threads WHERE thread_id = ?", (str(thread_id),))
+            row = cur.fetchone()
+        return _row_to_dict(row) if row else None
+
+    def list_threads(
+        self, limit: int = 50, cursor: Optional[Tuple[float, str]] = None
+    ) -> Tuple[List[dict], Optional[Tuple[float, str]]]:
+        """
+        One page of threads, most recently updated first.
+
+        ``cursor`` is the ``(updated_at, thread_id)`` of the last row of the
+        previous page. Returns the rows and the cursor for the next page, or
+        None when there are no more rows.
+        """
+        query = f"SELECT {_COLUMNS} FROM threads"
+        params: list = []
+        if cursor is not None:
+            query += " WHERE (updated_at, thread_id) < (?, ?)"
+            params.extend(cursor)
+        query += " ORDER BY updated_at DESC, thread_id DESC LIMIT ?"
+        params.append(limit)
+        with self.cursor(transaction=False) as cur:
+            cur.execute(query, params)
+            rows = [_row_to_dict(row) for row in cur.fetchall()]
+        next_cursor = (rows[-1]["updated_at"], rows[-1]["thread_id"]) if len(rows) == limit else None
+        return rows, next_cursor
+
+    def latest_checkpoint_id(self, thread_id: str) -> Optional[str]:
+        """The id of the thread's newest root checkpoint, read from the primary key alone."""
+        with self.cursor(transaction=False) as cur:
+            cur.execute(
+                "SELECT MAX(checkpoint_id) FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ''",
+                (str(thread_id),),
+            )
+            row = cur.fetchone()
+        return row[0] if row else None
+
+    def all_thread_ids(self) -> List[str]:
+        """Every thread id, least recently updated first."""
+        with self.cursor(transaction=False) as cur:
+            cur.execute("SELECT thread_id FROM threads ORDER BY updated_at, thread_id")
+            return [row[0] for row in cur.fetchall()]
+
+    def count_threads(self) -> int:
+        with self.cursor(transaction=False) as cur:
+            cur.execute("SELECT COUNT(*) FROM threads")
+            return cur.fetchone()[0]
+
+
+CREATE_THREADS_SQL = """
+CREATE TABLE IF NOT EXISTS threads (
+    thread_id TEXT PRIMARY KEY,
+    title TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    message_count INTEGER NOT NULL DEFAULT 0,
+    has_document INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS threads_updated_at ON threads (updated_at, thread_id);
+"""
+
+THREADS_EMPTY_SQL = "SELECT NOT EXISTS (SELECT 1 FROM threads)"
+
+BACKFILL_THREADS_SQL = (
+    "INSERT OR IGNORE INTO threads (thread_id, created_at, updated_at) "
+    "SELECT DISTINCT thread_id, ?, ? FROM checkpoints"
+)
+
+# As in SqliteSaver.put.
+INSERT_CHECKPOINT_SQL = (
+    "INSERT OR REPLACE INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, "
+    "parent_checkpoint_id, type, checkpoint, metadata) VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+
+TOUCH_THREAD_SQL = """
+INSERT INTO threads (thread_id, title, created_at, updated_at, message_count)
+VALUES (?, ?, ?, ?, COALESCE(?, 0))
+ON CONFLICT (thread_id) DO UPDATE SET
+    title = COALESCE(threads.title, excluded.title),
+    updated_at = excluded.updated_at,
+    message_count = COALESCE(?, threads.message_count)
+"""
+
+
+def catalog_params(config, checkpoint, titled: set) -> Optional[tuple]:
+    """
+    Parameters for TOUCH_THREAD_SQL after a checkpoint write, or None for
+    subgraph checkpoints. ``titled`` holds the threads whose title is already
+    stored, so the message scan for a title happens once per thread.
+    """
+    if config["configurable"].get("checkpoint_ns", "") != "":
+        return None
+    thread_id = str(config["configurable"]["thread_id"])
+    messages = checkpoint.get("channel_values", {}).get("messages")
+    title = None
+    if messages and thread_id not in titled:
+        title = make_title(messages)
+        if title is not None:
+            titled.add(thread_id)
+    count = len(messages) if messages is not None else None
+    now = time.time()
+    return (thread_id, title, now, now, count, count)
+
+
+_COLUMNS = "thread_id, title, created_at, updated_at, message_count, has_document"
+
+
+def _row_to_dict(row) -> dict:
+    thread_id, title, created_at, updated_at, message_count, has_document = row
+    return {
+        "thread_id": thread_id,
+        "title": title,
+        "created_at": created_at,
+        "updated_at": updated_at,
+        "message_count": message_count,
+        "has_document": bool(has_document),
+    }
+
+
+class AsyncThreadCatalogSaver(AsyncSqliteSaver):
+    """AsyncSqliteSaver that keeps the same ``threads`` table up to date."""
+
+    def __init__(self, conn, **kwargs):
+        super().__init__(conn, **kwargs)
+        self._titled = set()
+        self._catalog_ready = False
+
+    async def setup(self) -> None:
+        await super().setup()
+        if self._catalog_ready:
+            return
+        async with self.lock:
+            if self._catalog_ready:
+                return
+            await self.conn.executescript(CREATE_THREADS_SQL)
+            async with self.conn.execute(THREADS_EMPTY_SQL) as cur:
+                (empty,) = await cur.fetchone()
+            if empty:
+                now = time.time()
+                await self.conn.execute(BACKFILL_THREADS_SQL, (now, now))
+            await self.conn.commit()
+            self._catalog_ready = True
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        # AsyncSqliteSaver.aput commits on its own, so the insert is issued
+        # here, letting the catalog row share its transaction and commit.
+        await self.setup()
+        configurable = config["configurable"]
+        type_, serialized_checkpoint = self.serde.dumps_typed(checkpoint)
+        serialized_metadata = json.dumps(
+            get_checkpoint_metadata(config, metadata), ensure_ascii=False
+        ).encode("utf-8", "ignore")
+        params = catalog_params(config, checkpoint, self._titled)
+        async with self.lock:
+            try:
+                await self.conn.execute(
+                    INSERT_CHECKPOINT_SQL,
+                    (
+                        str(configurable["thread_id"]),
+                        configurable["checkpoint_ns"],
+                        checkpoint["id"],
+                        configurable.get("checkpoint_id"),
+                        type_,
+                        serialized_checkpoint,
+                        serialized_metadata,
+                    ),
+                )
+                if params is not None:
+                    await self.conn.execute(TOUCH_THREAD_SQL, params)
+                await self.conn.commit()
+            except BaseException:
+                await self.conn.rollback()
+                raise
+        return {
+            "configurable": {
+                "thread_id": configurable["thread_id"],
+                "checkpoint_ns": configurable["checkpoint_ns"],
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await super().adelete_thread(thread_id)
+        async with self.lock:
+            await self.conn.execute("DELETE FROM threads WHERE thread_id = ?", (str(thread_id),))
+            await self.conn.commit()
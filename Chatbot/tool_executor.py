@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence
+
+from langchain_core.messages import ToolMessage
+
+from metrics import TOOL_CALL_SECONDS
+
+
+def parse_timeouts(spec: str) -> Dict[str, float]:
+    """``"rag_tool=20,duckduckgo_search=8"`` -> ``{"rag_tool": 20.0, ...}``."""
+    timeouts = {}
+    for item in spec.split(","):
+        name, sep, seconds = item.partition("=")
+        if sep and name.strip():
+            timeouts[name.strip()] = float(seconds)
+    return timeouts
+
+
+class ToolExecutor:
+    """
+    Runs the tool calls of one model turn side by side, each under its own
+    time limit.
+
+    ToolNode already fans a turn's calls out over threads, but it waits for
+    every one of them, so a hung HTTP call holds the whole turn. Here each
+    call runs on a shared pool of ``max_workers`` threads and the node waits
+    at most ``timeouts[name]`` (else ``default_timeout``) seconds for it,
+    queueing time included. A call that runs out of time is answered with an
+    error ToolMessage the model can read; its thread finishes in the
+    background. The time each call took as seen by the turn goes to
+    ``chatbot_tool_call_seconds`` with status ok, error or timeout.
+
+    Pass ``wrap`` and ``awrap`` to ToolNode, or use ``tool_node``.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 16,
+        default_timeout: float = 30.0,
+        timeouts: Optional[Dict[str, float]] = None,
+    ):
+        self.max_workers = max(1, max_workers)
+        self.default_timeout = default_timeout
+        self.timeouts = dict(timeouts or {})
+        self.calls = 0
+        self.timed_out = 0
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def timeout_for(self, name: str) -> float:
+        return self.timeouts.get(name, self.default_timeout)
+
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(self.max_workers, thread_name_prefix="tool")
+            return self._pool
+
+    def _timeout_message(self, call: dict, timeout: float) -> ToolMessage:
+        self.timed_out += 1
+        content = {
+            "error": f"{call['name']} did not answer within {timeout:g} seconds.",
+            "tool": call["name"],
+            "timeout_seconds": timeout,
+        }
+        return ToolMessage(
+            content=json.dumps(content),
+            name=call["name"],
+            tool_call_id=call["id"],
+            status="error",
+        )
+
+    def _record(self, call: dict, start: float, result: Any) -> Any:
+        self.calls += 1
+        status = getattr(result, "status", "ok")
+        if status == "success":
+            status = "ok"
+        TOOL_CALL_SECONDS.observe(time.perf_counter() - start, tool=call["name"], status=status)
+        return result
+
+    def wrap(self, request: Any, execute: Callable[[Any], Any]) -> Any:
+        """ToolNode ``wrap_tool_call`` hook for the sync graph."""
+        call = request.tool_call
+        timeout = self.timeout_for(call["name"])
+        start = time.perf_counter()
+        # Callbacks and the stream writer live in context variables.
+        context = contextvars.copy_context()
+        future = self._executor().submit(context.run, execute, request)
+        try:
+            result = future.result(timeout=timeout)
+        except FutureTimeout:
+            future.cancel()
+            result = self._timeout_message(call, timeout)
+        return self._record(call, start, result)
+
+    async def awrap(self, request: Any, execute: Callable[[Any], Awaitable[Any]]) -> Any:
+        """ToolNode ``awrap_tool_call`` hook for the async graph; calls already run concurrently."""
+        call = request.tool_call
+        timeout = self.timeout_for(call["name"])
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(execute(request), timeout)
+        except asyncio.TimeoutError:
+            result = self._timeout_message(call, timeout)
+        return self._record(call, start, result)
+
+    def tool_node(self, tools: Sequence[Any], **kwargs: Any):
+        from langgraph.prebuilt import ToolNode
+
+        return ToolNode(tools, wrap_tool_call=self.wrap, awrap_tool_call=self.awrap, **kwargs)
+
+    def stats(self) -> dict:
+        return {"calls": self.calls, "timed_out": self.timed_out, "max_workers": self.max_workers}
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import threading
+from typing import Any, Dict, Optional
+
+
+class PromptUsageRecorder:
+    """
+    Aggregates token usage, provider prompt-cache reads and time-to-first-
+    token per chat model call, split by whether the call hit the prompt
+    cache, so the effect of a stable prompt prefix is visible.
+
+    Fed by ``metrics.MetricsCallback(usage=...)``, which times the calls and
+    reads their usage metadata.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.cache_hits = 0
+        self.input_tokens = 0
+        self.cached_tokens = 0
+        self.output_tokens = 0
+        self._ttft = {True: [0.0, 0], False: [0.0, 0]}
+        self._lock = threading.Lock()
+
+    def record(self, usage: Dict[str, Any], ttft: Optional[float]) -> None:
+        """One finished call: its ``usage_metadata`` (possibly empty) and seconds to the first token."""
+        cached = (usage.get("input_token_details") or {}).get("cache_read", 0) or 0
+        with self._lock:
+            self.calls += 1
+            self.input_tokens += usage.get("input_tokens", 0)
+            self.output_tokens += usage.get("output_tokens", 0)
+            self.cached_tokens += cached
+            hit = cached > 0
+            self.cache_hits += hit
+            if ttft is not None:
+                self._ttft[hit][0] += ttft
+                self._ttft[hit][1] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            def mean(hit: bool):
+                total, count = self._ttft[hit]
+                return round(total / count * 1000, 1) if count else None
+
+            return {
+                "calls": self.calls,
+                "cache_hit_calls": self.cache_hits,
+                "input_tokens": self.input_tokens,
+                "cached_input_tokens": self.cached_tokens,
+                "cached_token_ratio": self.cached_tokens / self.input_tokens if self.input_tokens else 0.0,
+                "output_tokens": self.output_tokens,
+                "ttft_ms_cache_hit": mean(True),
+                "ttft_ms_cache_miss": mean(False),
+            }